@@ -0,0 +1,239 @@
+# -------------------------------------------------------------------
+# BACKGROUND EXPERIMENT RUNNER
+# -------------------------------------------------------------------
+# Standalone process that owns runExperiment()/runTrial(). The Streamlit
+# dashboard only sends commands (start, pause, modify outline) through a
+# small SQLite job queue and reads the status file this runner writes, so
+# simulations keep going with no browser tab open and several viewers can
+# never launch the same trial twice.
+#
+# Usage (inside the gem5 container, from the archai folder):
+#   python archai_runner.py
+
+import fcntl
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from contextlib import closing
+from pathlib import Path
+
+from llm_backend import latencyStats
+
+ARCHAI_DIR = Path(__file__).parent
+QUEUE_FILE = ARCHAI_DIR / "runner.db"
+STATUS_FILE = ARCHAI_DIR / "runner_status.json"
+LOCK_FILE = ARCHAI_DIR / "runner.lock"
+
+# Seconds between queue polls while idle or paused
+POLL_INTERVAL = 2.0
+
+# A runner that has not written its status for this long is treated as dead
+STALE_AFTER = 120.0
+
+COMMANDS = ("start", "pause", "modify", "reload", "profile", "set")
+
+
+# -------------------------------------------------------------------
+# COMMAND QUEUE (used by the dashboard)
+# -------------------------------------------------------------------
+def connectQueue():
+    conn = sqlite3.connect(str(QUEUE_FILE), timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS commands ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "command TEXT NOT NULL, "
+        "payload TEXT NOT NULL, "
+        "created REAL NOT NULL, "
+        "handled REAL)"
+    )
+    return conn
+
+def sendCommand(command, payload=""):
+    """
+    Queues a command for the runner:
+      start  - reload params.json and run the experiment
+      pause  - stop launching trials after the current batch
+      modify - payload is passed to generateOutline() by the runner
+      reload - re-read params.json without changing the run state
+      profile - capture the workload's memory trace and narrow the cache
+                size ranges to its working set (main.profileWorkingSet())
+      set    - payload is a JSON {name: value} of runtime status settings
+               (search mode, early stop, ...) to change in place
+    """
+    if command not in COMMANDS:
+        raise ValueError("Unknown runner command: " + command)
+    with closing(connectQueue()) as conn:
+        with conn:
+            conn.execute(
+                "INSERT INTO commands (command, payload, created) VALUES (?, ?, ?)",
+                (command, payload, time.time())
+            )
+
+def takeCommands():
+    # Oldest first; each command is handed out exactly once
+    with closing(connectQueue()) as conn:
+        with conn:
+            rows = conn.execute(
+                "SELECT id, command, payload FROM commands WHERE handled IS NULL ORDER BY id"
+            ).fetchall()
+            conn.executemany(
+                "UPDATE commands SET handled = ? WHERE id = ?",
+                [(time.time(), row[0]) for row in rows]
+            )
+    return [(row[1], row[2]) for row in rows]
+
+def pendingCommands():
+    with closing(connectQueue()) as conn:
+        return conn.execute("SELECT COUNT(*) FROM commands WHERE handled IS NULL").fetchone()[0]
+
+# -------------------------------------------------------------------
+# STATUS FILE (read by the dashboard)
+# -------------------------------------------------------------------
+def readStatus():
+    try:
+        with open(STATUS_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"state": "stopped", "message": "Runner has not been started"}
+
+def writeStatus(status):
+    status["updated"] = time.time()
+    status["pid"] = os.getpid()
+    tmp_path = STATUS_FILE.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(status, f, indent=2)
+    os.replace(tmp_path, STATUS_FILE)
+
+def runnerAlive():
+    status = readStatus()
+    if "pid" not in status or time.time() - status.get("updated", 0) > STALE_AFTER:
+        return False
+    try:
+        os.kill(status["pid"], 0)
+    except OSError:
+        return False
+    return True
+
+# -------------------------------------------------------------------
+# RUNNER LOOP
+# -------------------------------------------------------------------
+def acquireLock():
+    # Only one runner per experiment directory; the lock dies with the process
+    lock = open(LOCK_FILE, "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+def runLoop():
+    lock = acquireLock()
+    if lock is None:
+        print("Another ARCHAI runner already owns " + str(ARCHAI_DIR))
+        sys.exit(1)
+
+    # Imported here so the dashboard can use the queue helpers above
+    # without pulling the experiment loop into its own process twice
+    import main
+
+    # Pick up exactly where a crashed or killed runner stopped
+    unfinished = main.resumeExperiment()
+    if len(unfinished) > 0:
+        print("Re-running trials interrupted by the last shutdown: " + ", ".join(unfinished))
+
+    # Keep running across restarts if the previous runner was mid-experiment
+    previous = readStatus().get("state")
+    state = "running" if previous == "running" else "paused"
+    status = {"state": state, "message": "Runner started"}
+    writeStatus(status)
+
+    # Outlines are streamed on their own thread, so phases can start running
+    # while Gemini is still writing the later ones
+    outlineThread = None
+
+    while True:
+        for command, payload in takeCommands():
+            if command == "start":
+                with main.paramsLock:
+                    main.reloadParams()
+                state = "running"
+                status["message"] = "Experiment started"
+            elif command == "pause":
+                state = "paused"
+                status["message"] = "Experiment paused"
+            elif command == "reload":
+                with main.paramsLock:
+                    main.reloadParams()
+                status["message"] = "Parameters reloaded"
+            elif command == "set":
+                # Only the named settings change, so trials recorded since
+                # the dashboard last read params.json are kept
+                with main.paramsLock:
+                    main.params["runtime"]["status"].update(json.loads(payload))
+                    main.storeParams()
+                status["message"] = "Settings updated"
+            elif command == "profile":
+                status["message"] = "Profiling working set"
+                writeStatus(dict(status, state=state))
+                with main.paramsLock:
+                    main.reloadParams()
+                try:
+                    status["message"] = "Working set profiled:\n" + main.profileWorkingSet()
+                except Exception:
+                    status["message"] = "Working set profiling failed:\n" + traceback.format_exc()
+                    print(status["message"])
+            elif command == "modify":
+                if outlineThread is not None:
+                    outlineThread.join()
+                status["message"] = "Updating outline"
+                writeStatus(dict(status, state=state))
+                outlineThread = threading.Thread(target=main.generateOutline, args=(payload,), daemon=True)
+                outlineThread.start()
+
+        if outlineThread is not None and not outlineThread.is_alive():
+            outlineThread = None
+            status["message"] = "Outline updated"
+
+        if state == "running":
+            status["phase"] = main.params["runtime"]["status"]["current_phase"]
+            status["trial"] = main.params["runtime"]["status"]["current_trial"]
+            writeStatus(dict(status, state=state))
+            try:
+                # runExperiment() takes paramsLock itself and lets the outline
+                # thread publish streamed phases while its trials simulate
+                result = main.runExperiment()
+                with main.paramsLock:
+                    finished = main.experimentFinished()
+            except Exception:
+                state = "paused"
+                status["message"] = "Runner error:\n" + traceback.format_exc()
+                print(status["message"])
+            else:
+                if result == "WAITING":
+                    # Waiting for the next phase of a streaming outline
+                    time.sleep(POLL_INTERVAL)
+                elif result == "NOT READY":
+                    state = "paused"
+                    status["message"] = "No outline yet; generate one and start again"
+                elif finished:
+                    state = "finished"
+                    status["message"] = "Experiment finished and report created"
+
+        status["phase"] = main.params["runtime"]["status"]["current_phase"]
+        status["trial"] = main.params["runtime"]["status"]["current_trial"]
+        status["state"] = state
+        # Gemini call latency, errors and retries of this runner
+        status["llm"] = latencyStats()
+        writeStatus(status)
+
+        if state != "running":
+            time.sleep(POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    runLoop()
@@ -0,0 +1,191 @@
+# -------------------------------------------------------------------
+# BAYESIAN OPTIMIZATION OVER THE PARAMETER SPACE
+# -------------------------------------------------------------------
+# Sequential model-based search used by the "bayes" search mode. Every
+# configuration simulated so far (any phase) trains a Gaussian process on
+# log sim time; the next trials are the candidates with the highest
+# expected improvement. Parameters are encoded to [0, 1] between
+# params["min"] and params["max"], sizes (and POW2_PARAMS) on a log2
+# scale like the power-of-two sweeps in runExperiment, categorical
+# parameters by their position in CATEGORIES.
+
+import itertools
+import math
+
+import numpy as np
+
+from trial_store import numericValue
+
+# Length scales tried when fitting the GP (encoded units)
+LENGTH_SCALES = (0.1, 0.2, 0.35, 0.5, 0.75, 1.0)
+
+# Observation noise relative to the normalized objective
+NOISE = 1e-3
+
+# Largest candidate set scored per proposal; bigger grids are subsampled
+MAX_CANDIDATES = 4000
+
+# Fewer observations than this and proposals are space-filling instead
+MIN_HISTORY = 2
+
+# Ordered choices of the categorical parameters (cpu_type, memory_type,
+# cache_hierarchy), roughly slowest first; min/max pick a slice of one list
+CATEGORIES = [
+    ["ATOMIC", "TIMING", "MINOR", "O3"],
+    ["DDR3_1600", "DDR4_2400", "LPDDR5_6400"],
+    ["private_l1_shared_l2", "mesi_three_level"],
+]
+
+# Integer parameters that only take powers of two (uarch_spec.py rounds
+# mem_channels down to one); swept and encoded like sizes
+POW2_PARAMS = ("mem_channels",)
+
+
+def categoryOf(value):
+    return next((choices for choices in CATEGORIES if str(value) in choices), None)
+
+def isSize(value):
+    return not str(value).isdigit() and categoryOf(value) is None
+
+def paramDomain(mini, maxi, name=None):
+    """
+    Every value between mini and maxi: integers step by one (by powers of
+    two for POW2_PARAMS), sizes ("16kB") by powers of two in the unit of
+    mini, categorical values by their order in CATEGORIES.
+    """
+    mini, maxi = str(mini), str(maxi)
+    choices = categoryOf(mini)
+    if choices is not None:
+        return choices[choices.index(mini):choices.index(maxi) + 1]
+    if not isSize(mini):
+        if name in POW2_PARAMS:
+            return [1 << e for e in range(int(mini).bit_length() - 1, int(maxi).bit_length())]
+        return list(range(int(mini), int(maxi) + 1))
+    unit = mini[-2:]
+    low = int(mini[:-2]).bit_length() - 1
+    high = int(maxi[:-2]).bit_length() - 1
+    return [str(1 << e) + unit for e in range(low, high + 1)]
+
+def encode(value, mini, maxi, name=None):
+    choices = categoryOf(mini)
+    if choices is not None:
+        low, high, v = choices.index(str(mini)), choices.index(str(maxi)), choices.index(str(value))
+        return 0.0 if high == low else (v - low) / (high - low)
+    low, high, v = numericValue(mini), numericValue(maxi), numericValue(value)
+    if isSize(mini) or name in POW2_PARAMS:
+        low, high, v = math.log2(low), math.log2(high), math.log2(v)
+    return 0.0 if high == low else (v - low) / (high - low)
+
+def encodeVars(trial_vars, bounds):
+    # bounds: {name: (min, max)} of every dimension the GP sees
+    return [encode(trial_vars[name], *bounds[name], name) for name in bounds]
+
+# -------------------------------------------------------------------
+# GAUSSIAN PROCESS
+# -------------------------------------------------------------------
+def rbf(a, b, length_scale):
+    d2 = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+    return np.exp(-0.5 * d2 / length_scale ** 2)
+
+def fitGP(X, y):
+    """Zero-mean GP on normalized y; the length scale maximizes the marginal likelihood."""
+    mean = y.mean()
+    std = y.std() if y.std() > 0 else 1.0
+    z = (y - mean) / std
+    best = None
+    for length_scale in LENGTH_SCALES:
+        K = rbf(X, X, length_scale) + NOISE * np.eye(len(X))
+        try:
+            L = np.linalg.cholesky(K)
+        except np.linalg.LinAlgError:
+            continue
+        alpha = np.linalg.solve(L.T, np.linalg.solve(L, z))
+        lml = -0.5 * z @ alpha - np.log(np.diag(L)).sum()
+        if best is None or lml > best["lml"]:
+            best = {"lml": lml, "length_scale": length_scale, "L": L, "alpha": alpha}
+    best.update({"X": X, "mean": mean, "std": std})
+    return best
+
+def predict(model, Xs):
+    Ks = rbf(Xs, model["X"], model["length_scale"])
+    mu = Ks @ model["alpha"]
+    v = np.linalg.solve(model["L"], Ks.T)
+    var = np.clip(1.0 - (v ** 2).sum(axis=0), 1e-12, None)
+    return mu * model["std"] + model["mean"], np.sqrt(var) * model["std"]
+
+def expectedImprovement(mu, sigma, best):
+    # Minimization: expected amount a candidate beats the best value so far
+    z = (best - mu) / sigma
+    cdf = 0.5 * (1 + np.vectorize(math.erf)(z / math.sqrt(2)))
+    pdf = np.exp(-0.5 * z ** 2) / math.sqrt(2 * math.pi)
+    return (best - mu) * cdf + sigma * pdf
+
+# -------------------------------------------------------------------
+# PROPOSALS
+# -------------------------------------------------------------------
+def varsKey(trial_vars):
+    return tuple(sorted((k, str(v)) for k, v in trial_vars.items()))
+
+def candidateVars(base_vars, space, rng):
+    # Every combination of the searched parameters, the rest from base_vars
+    names = list(space)
+    domains = [paramDomain(*space[name], name) for name in names]
+    total = math.prod(len(d) for d in domains)
+    if total <= MAX_CANDIDATES:
+        combos = itertools.product(*domains)
+    else:
+        combos = (tuple(d[rng.integers(len(d))] for d in domains) for _ in range(MAX_CANDIDATES))
+    candidates = []
+    for combo in combos:
+        trial_vars = dict(base_vars)
+        trial_vars.update(zip(names, combo))
+        candidates.append(trial_vars)
+    return candidates
+
+def propose(base_vars, space, bounds, history, count, seed=0):
+    """
+    Up to count new configurations to simulate.
+
+    space: {name: (min, max)} of the parameters this phase may change.
+    bounds: {name: (min, max)} of every parameter the GP models.
+    history: [(trial_vars, sim seconds), ...] of finished trials.
+
+    Batches use the kriging believer: each pick is added to the model with
+    its predicted value before the next one is chosen.
+    """
+    rng = np.random.default_rng(seed)
+    seen = {varsKey(v) for v, _ in history}
+    candidates = []
+    for trial_vars in candidateVars(base_vars, space, rng):
+        if varsKey(trial_vars) not in seen:
+            seen.add(varsKey(trial_vars))
+            candidates.append(trial_vars)
+    if len(candidates) == 0:
+        return []
+
+    C = np.array([encodeVars(v, bounds) for v in candidates])
+    X = [encodeVars(v, bounds) for v, _ in history]
+    y = [math.log(s) for _, s in history]
+
+    picks = []
+    available = np.ones(len(candidates), dtype=bool)
+    for _ in range(min(count, len(candidates))):
+        if len(y) < MIN_HISTORY:
+            # Space-filling: farthest candidate from everything chosen so far
+            if len(X) == 0:
+                scores = rng.random(len(candidates))
+            else:
+                scores = ((C[:, None, :] - np.array(X)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+            scores = np.where(available, scores, -np.inf)
+            i = int(np.argmax(scores))
+            X.append(list(C[i]))
+        else:
+            model = fitGP(np.array(X), np.array(y))
+            mu, sigma = predict(model, C)
+            scores = np.where(available, expectedImprovement(mu, sigma, min(y)), -np.inf)
+            i = int(np.argmax(scores))
+            X.append(list(C[i]))
+            y.append(float(mu[i]))
+        available[i] = False
+        picks.append(candidates[i])
+    return picks
@@ -0,0 +1,186 @@
+# -------------------------------------------------------------------
+# TRACE-DRIVEN CACHE SIMULATION
+# -------------------------------------------------------------------
+# A workload's memory reference stream does not depend on cache geometry,
+# so it is captured once per binary (gem5 "trace" mode: ATOMIC CPU, no
+# caches, MemoryAccess debug output from the stressor's checkpoint on) and
+# stored as a compact NumPy array of cache line addresses. Set-associative
+# LRU caches are then simulated on that array: one pass per distinct set
+# count yields every access's LRU stack position within its set, which
+# answers hit/miss for every associativity with that set count at once.
+# Private L1I/L1D caches see each core's own stream; the shared L2 sees the
+# time-ordered L1 misses (writebacks are not modelled).
+
+import re
+
+import numpy as np
+
+from trial_store import numericValue
+
+LINE_BYTES = 64
+
+# Parameters the trace can evaluate without gem5
+CACHE_PARAMS = ("l1i_size", "l1i_assoc", "l1d_size", "l1d_assoc", "l2_size", "l2_assoc")
+
+# Rough latencies (cycles) used to rank geometries by memory stall time
+L2_HIT_CYCLES = 20
+MEMORY_CYCLES = 200
+
+KIND_IFETCH = 0
+KIND_READ = 1
+KIND_WRITE = 2
+
+# gem5 AbstractMemory MemoryAccess line, e.g.
+# "1234: board.memory.mem_ctrl.dram: Read from board.processor.cores0.core.data of size 8 on address 0x8f3a0 ..."
+ACCESS_LINE = re.compile(r"(IFetch|Read|Write|Swap) from (\S+) of size \d+ on address (0x[0-9a-fA-F]+)")
+CORE_NAME = re.compile(r"cores(\d+)")
+
+
+def parseTrace(path, max_accesses=None):
+    """
+    Reads gem5 MemoryAccess debug output. Returns {"lines": uint64 cache
+    line addresses, "kind": uint8 KIND_*, "core": uint8 core index}.
+    """
+    lines, kinds, cores = [], [], []
+    with open(path, errors="replace") as f:
+        for text in f:
+            match = ACCESS_LINE.search(text)
+            if match is None:
+                continue
+            op, requestor, address = match.groups()
+            core = CORE_NAME.search(requestor)
+            lines.append(int(address, 16) // LINE_BYTES)
+            kinds.append(KIND_IFETCH if op == "IFetch" else KIND_WRITE if op in ("Write", "Swap") else KIND_READ)
+            cores.append(int(core.group(1)) if core else 0)
+            if max_accesses is not None and len(lines) >= max_accesses:
+                break
+    return {
+        "lines": np.array(lines, dtype=np.uint64),
+        "kind": np.array(kinds, dtype=np.uint8),
+        "core": np.array(cores, dtype=np.uint8),
+    }
+
+def saveTrace(trace, path):
+    np.savez_compressed(path, **trace)
+
+def loadTrace(path):
+    try:
+        with np.load(path) as data:
+            return {name: data[name] for name in ("lines", "kind", "core")}
+    except (OSError, ValueError, KeyError):
+        return None
+
+# -------------------------------------------------------------------
+# LRU SIMULATION
+# -------------------------------------------------------------------
+def lruPositions(lines, num_sets, ways):
+    """
+    LRU stack position (0 = most recent) of every access within its set,
+    or ways if the line is not among the set's ways most recent lines. An
+    A-way cache with num_sets sets hits exactly where the position is < A.
+
+    Sets are independent, so the r-th access of every set is processed in
+    the same vectorized step. An access to the line its set saw last is
+    always at position 0 and changes nothing, so those are resolved up
+    front and skipped.
+    """
+    positions = np.zeros(len(lines), dtype=np.int64)
+    if len(lines) == 0:
+        return positions
+    tags = lines.astype(np.int64)
+    sets = tags % num_sets
+    order = np.argsort(sets, kind="stable")
+    repeat = np.zeros(len(order), dtype=bool)
+    repeat[1:] = tags[order[1:]] == tags[order[:-1]]
+    order = order[~repeat]
+    counts = np.bincount(sets[order], minlength=num_sets)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    # Sets by access count, most first, so the active sets of a step are a prefix
+    by_count = np.argsort(-counts, kind="stable")
+    sorted_counts = counts[by_count]
+
+    stack = np.full((num_sets, ways), -1, dtype=np.int64)
+    cols = np.arange(ways)
+    for r in range(int(sorted_counts[0])):
+        active = by_count[:np.searchsorted(-sorted_counts, -r, side="left")]
+        acc = order[starts[active] + r]
+        tag = tags[acc]
+        rows = stack[active]
+        match = rows == tag[:, None]
+        hit = match.any(axis=1)
+        pos = np.where(hit, match.argmax(axis=1), ways - 1)
+        positions[acc] = np.where(hit, pos, ways)
+        # Move to front: entries above the hit (or the evicted LRU) shift down
+        shifted = np.concatenate([tag[:, None], rows[:, :-1]], axis=1)
+        stack[active] = np.where(cols[None, :] <= pos[:, None], shifted, rows)
+    return positions
+
+def numSets(size, assoc):
+    return max(1, int(numericValue(size)) // (int(assoc) * LINE_BYTES))
+
+def missMasks(lines, geometries):
+    """
+    {(size, assoc): boolean miss mask over lines} for every geometry, with
+    one lruPositions pass per distinct set count.
+    """
+    by_sets = {}
+    for size, assoc in set(geometries):
+        by_sets.setdefault(numSets(size, assoc), []).append((size, assoc))
+    masks = {}
+    for num_sets, group in by_sets.items():
+        positions = lruPositions(lines, num_sets, max(int(a) for _, a in group))
+        for size, assoc in group:
+            masks[(size, assoc)] = positions >= int(assoc)
+    return masks
+
+def privateMissMasks(trace, select, geometries):
+    # Private per-core caches: each core's accesses are simulated on their own
+    index = np.flatnonzero(select)
+    masks = {g: np.zeros(len(index), dtype=bool) for g in set(geometries)}
+    cores = trace["core"][index]
+    for core in np.unique(cores):
+        mine = cores == core
+        for g, mask in missMasks(trace["lines"][index[mine]], geometries).items():
+            masks[g][mine] = mask
+    return index, masks
+
+def levelStats(name, accesses, misses):
+    return {
+        name + ".accesses": int(accesses),
+        name + ".misses": int(misses),
+        name + ".missRate": float(misses) / accesses if accesses > 0 else 0.0,
+    }
+
+def evaluate(trace, configs):
+    """
+    Hit/miss statistics of every config ({"l1i_size", "l1i_assoc",
+    "l1d_size", "l1d_assoc", "l2_size", "l2_assoc"}) on a captured trace,
+    plus "stallCycles", an estimate of memory stall cycles used to rank
+    configs. Returns one stats dict per config.
+    """
+    inst = trace["kind"] == KIND_IFETCH
+    l1i = [(c["l1i_size"], c["l1i_assoc"]) for c in configs]
+    l1d = [(c["l1d_size"], c["l1d_assoc"]) for c in configs]
+    inst_index, inst_masks = privateMissMasks(trace, inst, l1i)
+    data_index, data_masks = privateMissMasks(trace, ~inst, l1d)
+
+    # The shared L2 sees the L1 misses of each (L1I, L1D) pair in time order
+    l2_masks = {}
+    for pair in set(zip(l1i, l1d)):
+        missed = np.zeros(len(trace["lines"]), dtype=bool)
+        missed[inst_index] = inst_masks[pair[0]]
+        missed[data_index] = data_masks[pair[1]]
+        l2 = [(c["l2_size"], c["l2_assoc"]) for c, i, d in zip(configs, l1i, l1d) if (i, d) == pair]
+        l2_masks[pair] = (int(missed.sum()), missMasks(trace["lines"][missed], l2))
+
+    results = []
+    for c, i_geom, d_geom in zip(configs, l1i, l1d):
+        l2_accesses, masks = l2_masks[(i_geom, d_geom)]
+        l2_misses = int(masks[(c["l2_size"], c["l2_assoc"])].sum())
+        stats = {}
+        stats.update(levelStats("l1i", len(inst_index), inst_masks[i_geom].sum()))
+        stats.update(levelStats("l1d", len(data_index), data_masks[d_geom].sum()))
+        stats.update(levelStats("l2", l2_accesses, l2_misses))
+        stats["stallCycles"] = l2_accesses * L2_HIT_CYCLES + l2_misses * MEMORY_CYCLES
+        results.append(stats)
+    return results
@@ -0,0 +1,124 @@
+# -------------------------------------------------------------------
+# WRITE-AHEAD EXPERIMENT JOURNAL
+# -------------------------------------------------------------------
+# params.json is the snapshot of the experiment state; every state
+# transition since that snapshot is appended (and fsynced) to
+# experiment.journal first. Writing a new snapshot is atomic (temp file +
+# os.replace) and compacts the journal, so a crash at any point leaves
+# either the old or the new snapshot plus the transitions that followed it.
+#
+# Events:
+#   phase_started    {"phase": p, "info": phase_history entry}
+#   trial_started    {"key": "trial_p_t", "vars": {...}}
+#   trial_finished   {"key": "trial_p_t"}
+#   phase_finished   {"phase": p}
+#   outline_modified {"outline": params["outline"]}
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+JOURNAL_FILE = Path(__file__).parent / "experiment.journal"
+
+# The runner streams outline changes on a second thread; appends and
+# snapshots must not interleave
+_lock = threading.RLock()
+
+
+def fsyncDir(path):
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomicWriteJson(path, data):
+    """Writes data to path so readers only ever see the old or new file."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsyncDir(path.parent)
+
+def readJournal():
+    """Returns all complete journal entries; a torn last line is ignored."""
+    entries = []
+    try:
+        with open(JOURNAL_FILE, "r") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+    except FileNotFoundError:
+        pass
+    return entries
+
+def resetJournal():
+    # Used when params.json is replaced by a different experiment
+    JOURNAL_FILE.unlink(missing_ok=True)
+
+def appendEvent(params, event, **data):
+    """
+    Durably records one state transition before it is applied. The sequence
+    number is kept in params so the next snapshot knows what it covers.
+    """
+    with _lock:
+        seq = params.get("journal_seq", 0) + 1
+        params["journal_seq"] = seq
+        entry = {"seq": seq, "time": time.time(), "event": event, "data": data}
+        with open(JOURNAL_FILE, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    return entry
+
+def compact(params, param_file):
+    """
+    Atomically writes the params snapshot, then drops the journal entries it
+    covers. A crash between the two steps only leaves already-applied
+    entries, which replay() skips by sequence number.
+    """
+    with _lock:
+        atomicWriteJson(param_file, params)
+        remaining = [e for e in readJournal() if e["seq"] > params.get("journal_seq", 0)]
+        tmp_path = JOURNAL_FILE.with_name(JOURNAL_FILE.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            for entry in remaining:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, JOURNAL_FILE)
+
+def replay(params):
+    """
+    Applies journal entries newer than the snapshot to params. Returns the
+    keys of trials that were started but never finished.
+    """
+    snapshot_seq = params.get("journal_seq", 0)
+    started = {}
+    for entry in readJournal():
+        if entry["seq"] <= snapshot_seq:
+            continue
+        data = entry["data"]
+        status = params["runtime"]["status"]
+        if entry["event"] == "phase_started":
+            params["runtime"]["phase_history"]["phase_" + str(data["phase"])] = data["info"]
+            status["current_phase"] = data["phase"]
+            status["current_trial"] = 0
+        elif entry["event"] == "phase_finished":
+            status["current_phase"] = data["phase"] + 1
+            status["current_trial"] = 0
+        elif entry["event"] == "outline_modified":
+            params["outline"] = data["outline"]
+        elif entry["event"] == "trial_started":
+            started[data["key"]] = data["vars"]
+        elif entry["event"] == "trial_finished":
+            started.pop(data["key"], None)
+        params["journal_seq"] = entry["seq"]
+    return list(started)
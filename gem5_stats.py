@@ -0,0 +1,176 @@
+# -------------------------------------------------------------------
+# GEM5 STATS.TXT PARSER
+# -------------------------------------------------------------------
+# Streams a gem5 stats.txt line by line and returns one {stat name: value}
+# mapping per dump block. An allowlist of names (glob patterns allowed)
+# keeps only the stats that are needed, so multi-megabyte stats files from
+# multi-core runs never get fully materialized.
+
+import fnmatch
+import re
+
+BEGIN_MARKER = "---------- Begin Simulation Statistics ----------"
+END_MARKER = "---------- End Simulation Statistics"
+
+# Stats recorded for every trial. Cache and core names differ between
+# hierarchies and core counts, so those are matched by pattern.
+TRIAL_STATS = [
+    "simSeconds",
+    "simTicks",
+    "simInsts",
+    "hostMemory",
+    "hostInstRate",
+    "*.ipc",
+    "*.cpi",
+    "*l1d*.overallMissRate::total",
+    "*l1i*.overallMissRate::total",
+    "*l2*.overallMissRate::total",
+    "*.dram.bwTotal::total",
+    "*.dram.bwRead::total",
+    "*.dram.bwWrite::total",
+    # Raw counters, so stats of a region between two dumps can be derived
+    "*.numCycles",
+    "*.overallMisses::total",
+    "*.overallAccesses::total",
+    "*.dram.bytesRead::total",
+    "*.dram.bytesWritten::total",
+]
+
+# Counters that accumulate over the run; regionStats() subtracts these
+REGION_COUNTERS = [
+    "simSeconds",
+    "simTicks",
+    "simInsts",
+    "*.numCycles",
+    "*.overallMisses::total",
+    "*.overallAccesses::total",
+    "*.dram.bytesRead::total",
+    "*.dram.bytesWritten::total",
+]
+
+
+def compileAllowlist(allowlist):
+    """
+    Turns a list of stat names / glob patterns into a fast membership test.
+    Exact names are checked with a set lookup and only the patterns fall
+    back to a single compiled regex.
+    """
+    if allowlist is None:
+        return lambda name: True
+
+    exact = set()
+    patterns = []
+    for name in allowlist:
+        if any(c in name for c in "*?["):
+            patterns.append(fnmatch.translate(name))
+        else:
+            exact.add(name)
+
+    if len(patterns) == 0:
+        return exact.__contains__
+
+    regex = re.compile("|".join(patterns))
+    return lambda name: name in exact or regex.match(name) is not None
+
+def parseValue(token):
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        value = float(token)
+    except ValueError:
+        return None
+    # Empty ratios are dumped as "nan"/"-nan"; store them as JSON null
+    return None if value != value else value
+
+def iterStatBlocks(path, allowlist=None):
+    """
+    Yields one {stat name: value} dict per "Begin/End Simulation Statistics"
+    block of a gem5 stats file, in dump order. Distribution and vector rows
+    keep their full "name::bucket" key; only the first value column is read.
+    """
+    wanted = compileAllowlist(allowlist)
+    block = None
+
+    with open(path, "r") as f:
+        for line in f:
+            if line.startswith("----------"):
+                if line.startswith(BEGIN_MARKER):
+                    block = {}
+                elif line.startswith(END_MARKER) and block is not None:
+                    yield block
+                    block = None
+                continue
+
+            if block is None:
+                continue
+
+            fields = line.split(None, 2)
+            if len(fields) < 2 or not wanted(fields[0]):
+                continue
+            block[fields[0]] = parseValue(fields[1])
+
+    # gem5 killed mid-dump: keep what was written
+    if block:
+        yield block
+
+def parseStatsFile(path, allowlist=None):
+    """Returns every dump block of a stats file as a list of dicts."""
+    return list(iterStatBlocks(path, allowlist))
+
+def finalStats(path, allowlist=TRIAL_STATS):
+    """
+    Returns the last dump block (the end-of-simulation stats), or {} if the
+    file is missing or empty.
+    """
+    last = {}
+    try:
+        for block in iterStatBlocks(path, allowlist):
+            last = block
+    except FileNotFoundError:
+        return {}
+    return last
+
+def regionStats(begin, end):
+    """
+    Stats of the region between two cumulative dumps (e.g. the work-begin
+    and work-end dumps around one stressor kernel). Counters are
+    subtracted; IPC, miss rates and DRAM bandwidth are recomputed from the
+    counter deltas, since ratios cannot be subtracted.
+    """
+    is_counter = compileAllowlist(REGION_COUNTERS)
+    region = {}
+    for name, value in end.items():
+        if is_counter(name) and isinstance(value, (int, float)) and isinstance(begin.get(name), (int, float)):
+            region[name] = value - begin[name]
+
+    cycles = [v for k, v in region.items() if k.endswith(".numCycles")]
+    if region.get("simInsts") is not None and len(cycles) > 0 and max(cycles) > 0:
+        region["ipc"] = region["simInsts"] / max(cycles)
+
+    for name in list(region):
+        if name.endswith(".overallMisses::total"):
+            accesses = region.get(name.replace("overallMisses", "overallAccesses"))
+            if accesses:
+                region[name.replace("overallMisses", "overallMissRate")] = region[name] / accesses
+
+    dram_bytes = sum(v for k, v in region.items() if k.endswith((".dram.bytesRead::total", ".dram.bytesWritten::total")))
+    if region.get("simSeconds"):
+        region["dramBandwidth"] = dram_bytes / region["simSeconds"]
+    return region
+
+def kernelScore(kernels, weights, stat="simSeconds"):
+    """
+    Weighted mean of one region stat over the kernels a trial ran.
+    weights: {kernel name: weight}; kernels without a weight are ignored.
+    Returns None if none of the weighted kernels were measured.
+    """
+    total = 0.0
+    weight = 0.0
+    for name, w in weights.items():
+        value = kernels.get(name, {}).get(stat)
+        if isinstance(value, (int, float)) and w > 0:
+            total += w * value
+            weight += w
+    return total / weight if weight > 0 else None
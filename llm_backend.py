@@ -0,0 +1,298 @@
+# -------------------------------------------------------------------
+# GEMINI BACKEND WITH RECORD / REPLAY CACHE
+# -------------------------------------------------------------------
+# Every generate_content call goes through generate(). Responses are
+# recorded on disk keyed by a hash of the model and the full request, so
+# identical prompts (re-clicking "Generate / Modify", re-running a saved
+# experiment) are answered from disk, and a recorded experiment can be
+# replayed offline without an API key.
+#
+# ARCHAI_LLM_MODE:
+#   record (default) - serve recorded responses, call Gemini on a miss and record it
+#   live             - always call Gemini, recording every response
+#   replay           - only serve recorded responses; a miss raises LLMReplayMiss
+#
+# Calls that do reach Gemini run on one asyncio loop in a background thread:
+# a token bucket keeps them under ARCHAI_LLM_RPM, 429/5xx errors are retried
+# with jittered exponential backoff, identical requests already in flight
+# share one call, and every call's latency is kept for latencyStats().
+#
+# Usage:
+#   python llm_backend.py stats    # entry count and size
+#   python llm_backend.py clear    # forget every recorded response
+
+import asyncio
+import collections
+import hashlib
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+ARCHAI_DIR = Path(__file__).parent
+LLM_CACHE_DIR = Path(os.environ.get("ARCHAI_LLM_CACHE_DIR", ARCHAI_DIR / "llm_cache"))
+
+LLM_MODES = ("record", "live", "replay")
+LLM_MODE = os.environ.get("ARCHAI_LLM_MODE", "record")
+
+# Request rate limit (requests per minute) and how many may go out at once
+LLM_RPM = float(os.environ.get("ARCHAI_LLM_RPM", 10))
+LLM_BURST = int(os.environ.get("ARCHAI_LLM_BURST", 3))
+
+# Retries of throttled (429) or failed (5xx) calls, with backoff in seconds
+LLM_MAX_RETRIES = int(os.environ.get("ARCHAI_LLM_RETRIES", 5))
+LLM_BACKOFF_BASE = 2.0
+LLM_BACKOFF_MAX = 60.0
+RETRY_CODES = (429, 500, 502, 503, 504)
+
+# Latency records of the most recent calls (cache hits included)
+METRICS = collections.deque(maxlen=1000)
+
+
+class LLMReplayMiss(KeyError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+class RecordedResponse:
+    # Stands in for a genai response; callers only read .text
+    def __init__(self, text):
+        self.text = text
+
+
+class TokenBucket:
+    """Allows bursts of up to burst requests, refilled at rate_per_minute."""
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        # Only used from the backend's event loop thread, so no lock needed
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+_client = None
+_bucket = TokenBucket(LLM_RPM, LLM_BURST)
+_inflight = {}
+_loop = None
+_loop_lock = threading.Lock()
+
+def getClient():
+    # Created on first use so replay runs need no GEMINI_API_KEY
+    global _client
+    if _client is None:
+        from google import genai
+        _client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
+    return _client
+
+def requestKey(model, contents):
+    h = hashlib.sha256()
+    h.update(json.dumps({"model": model, "contents": contents}, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+def entryPath(key):
+    return LLM_CACHE_DIR / key[:2] / (key + ".json")
+
+def lookup(key):
+    try:
+        with open(entryPath(key)) as f:
+            return json.load(f)["text"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def record(key, model, contents, text):
+    path = entryPath(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp" + str(os.getpid()))
+    with open(tmp_path, "w") as f:
+        json.dump({"model": model, "contents": contents, "text": text, "recorded": time.time()}, f)
+    os.replace(tmp_path, path)
+
+def backgroundLoop():
+    # One event loop for the whole process, so the rate limit and in-flight
+    # deduplication cover calls from every thread (runner, dashboard)
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="archai-llm", daemon=True).start()
+    return _loop
+
+def recordMetric(model, key, started, attempt, status):
+    METRICS.append({
+        "model": model,
+        "request": key[:16],
+        "latency": time.monotonic() - started,
+        "attempt": attempt,
+        "status": status,
+        "time": time.time(),
+    })
+
+async def callGemini(model, contents, key):
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await _bucket.acquire()
+        started = time.monotonic()
+        try:
+            response = await getClient().aio.models.generate_content(model=model, contents=contents)
+        except Exception as e:
+            code = getattr(e, "code", None)
+            recordMetric(model, key, started, attempt, "error " + str(code))
+            if code not in RETRY_CODES or attempt == LLM_MAX_RETRIES:
+                raise
+            delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            continue
+        recordMetric(model, key, started, attempt, "ok")
+        record(key, model, contents, response.text)
+        return response
+
+async def agenerate(model, contents, mode=None):
+    """
+    Async generate_content through the response cache, rate limiter and
+    retries. Returns an object with a .text attribute.
+    """
+    mode = mode or LLM_MODE
+    if mode not in LLM_MODES:
+        raise ValueError("Unknown ARCHAI_LLM_MODE: " + mode)
+    key = requestKey(model, contents)
+    if mode != "live":
+        started = time.monotonic()
+        text = lookup(key)
+        if text is not None:
+            recordMetric(model, key, started, 0, "cached")
+            return RecordedResponse(text)
+        if mode == "replay":
+            raise LLMReplayMiss("No recorded " + model + " response for request " + key[:16])
+
+    # Identical requests already in flight wait for the same call
+    if key not in _inflight:
+        task = asyncio.ensure_future(callGemini(model, contents, key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(_inflight[key])
+
+def generate(model, contents, mode=None):
+    """Blocking generate_content; see agenerate()."""
+    return asyncio.run_coroutine_threadsafe(agenerate(model, contents, mode), backgroundLoop()).result()
+
+async def astream(model, contents, mode=None):
+    """
+    Async iterator over the text chunks of a streamed response. Recorded
+    responses come back as one chunk; a call is only retried if it failed
+    before its first chunk arrived.
+    """
+    mode = mode or LLM_MODE
+    if mode not in LLM_MODES:
+        raise ValueError("Unknown ARCHAI_LLM_MODE: " + mode)
+    key = requestKey(model, contents)
+    if mode != "live":
+        started = time.monotonic()
+        text = lookup(key)
+        if text is not None:
+            recordMetric(model, key, started, 0, "cached")
+            yield text
+            return
+        if mode == "replay":
+            raise LLMReplayMiss("No recorded " + model + " response for request " + key[:16])
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await _bucket.acquire()
+        started = time.monotonic()
+        parts = []
+        try:
+            async for chunk in await getClient().aio.models.generate_content_stream(model=model, contents=contents):
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+        except Exception as e:
+            code = getattr(e, "code", None)
+            recordMetric(model, key, started, attempt, "error " + str(code))
+            if len(parts) > 0 or code not in RETRY_CODES or attempt == LLM_MAX_RETRIES:
+                raise
+            delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+            continue
+        recordMetric(model, key, started, attempt, "ok")
+        record(key, model, contents, "".join(parts))
+        return
+
+def streamText(model, contents, mode=None):
+    """Blocking iterator over the text chunks of a streamed response."""
+    chunks = queue.Queue()
+
+    async def pump():
+        try:
+            async for text in astream(model, contents, mode):
+                chunks.put(("text", text))
+            chunks.put(("done", None))
+        except Exception as e:
+            chunks.put(("error", e))
+
+    asyncio.run_coroutine_threadsafe(pump(), backgroundLoop())
+    while True:
+        kind, value = chunks.get()
+        if kind == "done":
+            return
+        if kind == "error":
+            raise value
+        yield value
+
+def latencyStats():
+    # Summary of the recent calls made by this process
+    calls = [m for m in METRICS if m["status"] != "cached"]
+    latencies = sorted(m["latency"] for m in calls if m["status"] == "ok")
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] if len(latencies) > 0 else None
+    return {
+        "calls": len(calls),
+        "cached": len(METRICS) - len(calls),
+        "errors": sum(1 for m in calls if m["status"] != "ok"),
+        "retries": sum(1 for m in calls if m["attempt"] > 0),
+        "mean_latency": sum(latencies) / len(latencies) if len(latencies) > 0 else None,
+        "p50_latency": percentile(0.5),
+        "p95_latency": percentile(0.95),
+    }
+
+def cacheEntries():
+    if not LLM_CACHE_DIR.exists():
+        return []
+    return [p for p in LLM_CACHE_DIR.glob("*/*.json") if p.is_file()]
+
+def clear():
+    removed = 0
+    for p in cacheEntries():
+        p.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+def cacheStats():
+    entries = cacheEntries()
+    return {
+        "entries": len(entries),
+        "bytes": sum(p.stat().st_size for p in entries),
+        "mode": LLM_MODE,
+        "dir": str(LLM_CACHE_DIR),
+    }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "clear":
+        print("Removed " + str(clear()) + " recorded responses")
+    elif command == "stats":
+        print(json.dumps(cacheStats(), indent=2))
+    else:
+        print("Usage: python llm_backend.py [stats|clear]")
+        sys.exit(1)
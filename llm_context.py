@@ -0,0 +1,154 @@
+# -------------------------------------------------------------------
+# COMPACT TRIAL CONTEXT FOR GEMINI PROMPTS
+# -------------------------------------------------------------------
+# Re-planning and report prompts used to carry every trial ever run as raw
+# JSON. This builds per-phase tables instead (one row per trial plus a
+# min/max/slope/knee summary per parameter) and degrades older phases to
+# summaries and then to one line each until the text fits a token budget.
+# Gemini can ask for raw logs of specific trials with a FETCH line.
+
+import json
+import os
+import re
+
+from trial_store import numericValue, splitTrialKey
+
+# Rough prompt budget for the trial context, in tokens (~4 characters each)
+TOKEN_BUDGET = int(os.environ.get("ARCHAI_PROMPT_TOKEN_BUDGET", 6000))
+
+# Budget for raw trial logs sent after a FETCH request
+FETCH_TOKEN_BUDGET = int(os.environ.get("ARCHAI_FETCH_TOKEN_BUDGET", 4000))
+
+FETCH_INSTRUCTION = (
+    "Trial logs above are summarized. If you need the raw stats of specific "
+    "trials before answering, reply with only one line of the form "
+    "'FETCH trial_P_T trial_P_T ...' and they will be sent to you."
+)
+
+FETCH_LINE = re.compile(r"^\s*FETCH((?:\s+trial_\d+_\d+)+)\s*$", re.MULTILINE)
+
+
+def estimateTokens(text):
+    return len(text) // 4 + 1
+
+def fmt(value):
+    if isinstance(value, float):
+        return "%.4g" % value
+    return "-" if value is None else str(value)
+
+def meanIpc(stats):
+    # Average over cores ("board.processor.cores0.core.ipc", ...)
+    values = [v for k, v in stats.items() if k.endswith(".ipc") and isinstance(v, (int, float))]
+    return sum(values) / len(values) if len(values) > 0 else None
+
+def trialRow(key, record):
+    pv = record.get("param_values", [])
+    values = ", ".join(str(pv[i]) + "=" + str(pv[i + 1]) for i in range(0, len(pv) - 1, 2))
+    stats = record.get("stats", {})
+    return "| " + " | ".join([
+        key,
+        values,
+        fmt(stats.get("simSeconds")),
+        fmt(meanIpc(stats)),
+        fmt(stats.get("hostMemory")),
+        record.get("fidelity", "full"),
+    ]) + " |"
+
+def paramSummary(param, trials):
+    """min/max of a parameter, sim time at both ends and the slope per step."""
+    points = []
+    for record in trials.values():
+        pv = record.get("param_values", [])
+        if param in pv:
+            points.append((pv[pv.index(param) + 1], record.get("stats", {}).get("simSeconds")))
+    points = sorted(points, key=lambda point: numericValue(point[0]) or 0)
+    measured = [point for point in points if isinstance(point[1], (int, float))]
+    if len(measured) == 0:
+        return "| " + param + " | - | - | - | - | - |"
+    first, last = measured[0], measured[-1]
+    slope = None
+    if len(measured) > 1 and first[1] != 0:
+        # Relative change of sim time per step of the sweep
+        slope = "%+.2f%%" % (100 * (last[1] - first[1]) / first[1] / (len(measured) - 1))
+    return "| " + " | ".join([
+        param, fmt(first[0]), fmt(last[0]), fmt(first[1]), fmt(last[1]), fmt(slope)
+    ]) + " |"
+
+def phaseSections(name, info, trials):
+    """The same phase at three levels of detail: rows, summary, one line."""
+    header = "### " + name + ": " + info.get("goal", "")
+    knee = info.get("knee")
+    knee_text = "" if knee is None else "Knee: " + str(knee["param"]) + " = " + str(knee["value"])
+    summary = [header, "Hypothesis: " + info.get("hypothesis", "")]
+    if knee_text:
+        summary.append(knee_text)
+    summary += [
+        "| param | from | to | simSeconds at from | simSeconds at to | slope per step |",
+        "|---|---|---|---|---|---|",
+    ]
+    summary += [paramSummary(par, trials) for par in info.get("params_changed", [])]
+    detail = summary + [
+        "",
+        "| trial | values | simSeconds | ipc | hostMemory | fidelity |",
+        "|---|---|---|---|---|---|",
+    ] + [trialRow(key, record) for key, record in trials.items()]
+    line = name + ": " + str(len(trials)) + " trials over " + ", ".join(info.get("params_changed", []))
+    if knee_text:
+        line += "; " + knee_text
+    return ["\n".join(detail), "\n".join(summary), line]
+
+def buildTrialContext(phase_history, trials, budget=TOKEN_BUDGET, focus_phase=None):
+    """
+    Compact Markdown view of all trials, grouped by phase, within budget
+    tokens. Older phases are shortened first; focus_phase (usually the
+    phase that just finished) keeps its rows longest.
+    """
+    by_phase = {}
+    for key, record in trials.items():
+        by_phase.setdefault(splitTrialKey(key)[0], {})[key] = record
+
+    phases = sorted(by_phase)
+    sections = {
+        p: phaseSections("phase_" + str(p), phase_history.get("phase_" + str(p), {}), by_phase[p])
+        for p in phases
+    }
+    level = {p: 0 for p in phases}
+
+    def render():
+        kept = [p for p in phases if level[p] < 3]
+        parts = []
+        if len(kept) < len(phases):
+            parts.append("(" + str(len(phases) - len(kept)) + " earlier phases omitted)")
+        parts += [sections[p][level[p]] for p in kept]
+        return "\n\n".join(parts)
+
+    # Shorten the oldest phase first, and the focus phase last
+    order = [p for p in phases if p != focus_phase] + [p for p in phases if p == focus_phase]
+    text = render()
+    for target in (1, 2, 3):
+        for p in order:
+            if estimateTokens(text) <= budget:
+                return text
+            level[p] = max(level[p], target)
+            text = render()
+    return text
+
+def fetchRequest(text):
+    """Trial keys Gemini asked for with a FETCH line, or [] if none."""
+    match = FETCH_LINE.search(text or "")
+    return [] if match is None else match.group(1).split()
+
+def trialLogs(keys, trials, budget=FETCH_TOKEN_BUDGET):
+    # Raw records of the requested trials, as many as fit in the budget
+    parts = []
+    used = 0
+    for key in keys:
+        if key not in trials:
+            continue
+        part = key + " -> " + json.dumps(trials[key])
+        used += estimateTokens(part)
+        if used > budget:
+            parts.append("(remaining requested trials omitted to stay within budget)")
+            break
+        parts.append(part)
+    return "\n".join(parts)
@@ -1,10 +1,25 @@
 import os
+import math
 import subprocess
-from google import genai
+import threading
+from contextlib import contextmanager
 import re
 import ctypes
 import json
 from pathlib import Path
+from trial_executor import runTrials, traceTrials, ensureTrace, resolveWorkloads, MAX_TRIAL_WORKERS
+from cache_sim import CACHE_PARAMS
+from mrc_profile import profileTrace, profileSummary, narrowRange
+from workload_build import buildAll, buildBinary
+from search_planner import searchMode, successiveHalving, fidelityOptions, trialScore, traceScore, promote, FIDELITIES, SEARCH_MODES, RANK_STAT, SCORE_STAT
+from bayes_opt import propose, paramDomain, categoryOf, POW2_PARAMS
+from surrogate import planSkips, predictionError, TOLERANCE
+from plateau import detectPlateau, kneeRecord, sweepPoints, bisectStep
+from llm_backend import generate, getClient, streamText
+from llm_context import buildTrialContext, fetchRequest, trialLogs, FETCH_INSTRUCTION
+from gem5_stats import finalStats, kernelScore, TRIAL_STATS
+from experiment_journal import appendEvent, compact, replay, resetJournal
+from trial_store import appendTrial, getTrials, clearStore, copyStore, migrateRawTrials, STORE_FILE, SAVED_STORE_FILE
 
 
 SYSTEM_INSTRUCTION = """You are ARCHAI, an autonomous pre-silicon microarchitecture research assistant.
@@ -27,20 +42,41 @@ def printS(message):
 # GEMINI CLIENT INITIALIZATION
 # -------------------------------------------------------------------
 
-# Initialize Gemini client using API key from environment variables
-client = genai.Client(api_key=os.environ["GEMINI_API_KEY"])
+# The Gemini client (API key from GEMINI_API_KEY) lives in llm_backend.py;
+# content generation goes through its record/replay response cache
+
+def geminiContents(prompt):
+    # One system + user turn with the ARCHAI system instruction
+    return [
+        {
+            "role": "system",
+            "parts": [{"text": SYSTEM_INSTRUCTION}]
+        },
+        {
+            "role": "user",
+            "parts": [{"text": prompt}]
+        }
+    ]
+
+def askGemini(prompt):
+    return generate(model="gemini-3-flash-preview", contents=geminiContents(prompt))
+
+def streamGemini(prompt):
+    # Text chunks of the response as Gemini produces them
+    return streamText(model="gemini-3-flash-preview", contents=geminiContents(prompt))
 
 # -------------------------------------------------------------------
 # COMMANDS USED THROUGHOUT THE PIPELINE
 # -------------------------------------------------------------------
-# 1. Compile C stressor into ARM static binary
+# 1. Compile C stressor into ARM static binary (with gem5 m5 ops for the
+#    post-initialization checkpoint; needs util/m5 built for arm64)
 # 2. Run gem5 simulation
 # 3. (Optional) Build shared library for runtime parameter manipulation
 
 commands = [
-    ["aarch64-linux-gnu-gcc", "uarch_stressor.c", "-static", "-o", "microbench.arm"],
+    ["aarch64-linux-gnu-gcc", "uarch_stressor.c", "-static", "-pthread", "-DARCHAI_M5OPS", "-I/gem5/include", "-o", "microbench.arm", "-L/gem5/util/m5/build/arm64/out", "-lm5"],
     ["build/ARM/gem5.opt", "configs/example/gem5_library/archai/uarch_spec.py"],
-    ["gcc", "-shared", "-fPIC", "uarch_stressor.c", "-o", "libstressor.so"]
+    ["gcc", "-shared", "-fPIC", "-pthread", "uarch_stressor.c", "-o", "libstressor.so"]
 ]
 
 # -------------------------------------------------------------------
@@ -51,20 +87,55 @@ PARAM_FILE = Path(__file__).parent / "params.json"
 with open(PARAM_FILE) as f:
     params = json.load(f)
 
+# Trials are kept in the trial store (trials.db), not in params.json;
+# move any trials left over from older params files into it
+params["runtime"]["raw_trials"] = migrateRawTrials(params["runtime"]["raw_trials"])
+
 # Extract tunable parameters (only int or string types)
 PARAMS = [
     k for k, v in params["vars"].items()
     if isinstance(v, (str, int))
 ]
 
+# Values uarch_spec.py falls back to for parameters a stored trial predates
+with open(Path(__file__).parent / "defaultparams.json") as f:
+    DEFAULT_VARS = json.load(f)["vars"]
+
+def recordVars(record):
+    # A trial's full vars, including parameters added after it was recorded
+    return dict(DEFAULT_VARS, **record["vars"])
+
 # Load C workload source code so Gemini can reason about algorithm behavior
 with open("/gem5/configs/example/gem5_library/archai/uarch_stressor.c", "r", encoding="utf-8") as f:
     c_program_contents = f.read()
 
+# Held by every thread that changes params: the runner streams outlines on
+# a second thread while runExperiment() updates the same dict.
+# runExperiment() holds it except while trials simulate (releasedParams()),
+# so streamed phases are published without waiting for a whole batch
+paramsLock = threading.RLock()
+experimentThread = threading.local()
+
+@contextmanager
+def releasedParams():
+    # Gives up runExperiment()'s hold on paramsLock for the duration; a no-op
+    # on any other thread (the speculative batch never holds it)
+    if not getattr(experimentThread, "locked", False):
+        yield
+        return
+    experimentThread.locked = False
+    paramsLock.release()
+    try:
+        yield
+    finally:
+        paramsLock.acquire()
+        experimentThread.locked = True
+
 # Persist updated parameters to disk
+# Atomic snapshot; also compacts the write-ahead journal it now covers
 def storeParams():
-    with open(PARAM_FILE, "w") as f:
-        json.dump(params, f, indent=2)
+    with paramsLock:
+        compact(params, PARAM_FILE)
 
 start_or_load_prompt = "\n\nClick **Start New Experiment** or **Load Existing Experiment**."
 
@@ -85,7 +156,67 @@ def update_start_or_load_prompt(buttonType):
 
 # Compile the stressor into ARM binary
 def assemblyProgram():
-    subprocess.run(commands[0], capture_output=True, text=True)
+    # Variant for the current params["stressor_c"] settings, from the build
+    # cache if it was compiled before
+    return buildBinary(workloadSpec(params["vars"]))
+
+def workloadSpec(trialVars):
+    """
+    Build settings of the stressor for one trial: params["stressor_c"]
+    (N, extra defines, "cflags"), with any of its keys that a trial's vars
+    also set (e.g. "N" added to vars/min/max to sweep the workload size)
+    taken from the trial.
+    """
+    spec = dict(params.get("stressor_c", {}))
+    for k in spec:
+        if k in trialVars:
+            spec[k] = trialVars[k]
+    return spec
+
+def workloadArgs(trialVars):
+    """
+    Run-time arguments of the stressor for one trial: params["workload"]
+    (kernels, n, footprint, stride, dim, block) without its "weights",
+    with keys a trial's vars also set taken from the trial, like
+    workloadSpec().
+    """
+    args = {k: v for k, v in params.get("workload", {}).items() if k != "weights"}
+    for k in args:
+        if k in trialVars:
+            args[k] = trialVars[k]
+    return args
+
+def workloadJobs(jobs):
+    # Jobs with each one's stressor variant and arguments in its sim options
+    return [
+        (job[0], job[1], dict(job[2] if len(job) > 2 else {}, workload=workloadSpec(job[1]), args=workloadArgs(job[1])))
+        for job in jobs
+    ]
+
+def scoreStat():
+    # The stat trialScore() ranks by: the weighted kernel score once
+    # params["workload"] has kernel weights, else the plain ranking stat
+    return SCORE_STAT if len(params.get("workload", {}).get("weights", {})) > 0 else RANK_STAT
+
+def simulateJobs(jobs, on_result=None, **kwargs):
+    """
+    runTrials with each job pointed at its stressor variant and arguments.
+    With kernel weights in params["workload"], every result's stats also
+    get the weighted multi-kernel score, which then ranks trials.
+    """
+    weights = params.get("workload", {}).get("weights", {})
+    def onResult(i, result):
+        score = kernelScore(result.get("kernels", {}), weights) if len(weights) > 0 else None
+        if score is not None:
+            result["stats"] = dict(result["stats"], **{SCORE_STAT: score})
+        if on_result is not None:
+            # Recording a trial journals it into params
+            with paramsLock:
+                on_result(i, result)
+
+    jobs = workloadJobs(jobs)
+    with releasedParams():
+        return runTrials(jobs, on_result=onResult, **kwargs)
 
 # -------------------------------------------------------------------
 # GEMINI DEEP RESEARCH PIPELINE
@@ -95,7 +226,7 @@ def startDeepResearch(query):
     with open(REPORT_PATH, "r", encoding="utf-8") as f:
         report_md = f.read()
 
-    interaction = client.interactions.create(
+    interaction = getClient().interactions.create(
         input="Here is a report of an experiment: " + report_md + " \n\n Here is the user query: "+query + "\n\nUsing the report and any online tools you have access to, generate a deep, thorough answer to the question.",
         agent="deep-research-pro-preview-12-2025",
         background=True,
@@ -105,7 +236,7 @@ def startDeepResearch(query):
 def pollDeepResearch():
     r = params["results"]["research_IDs"]
     if(len(r) > 0):
-        res = client.interactions.get(r[-1])   
+        res = getClient().interactions.get(r[-1])   
         if res.status == "completed":
             collected_text = []
 
@@ -152,6 +283,8 @@ def resetAll():
         params2 = json.load(f)
     for key in params2:
         params[key] = params2[key]
+    clearStore()
+    resetJournal()
     storeParams()
 
 def saveCurrent():
@@ -159,14 +292,66 @@ def saveCurrent():
         params = json.load(f)
     with open(Path(__file__).parent / "loadparams.json", "w") as f:
         json.dump(params, f, indent=2)
+    copyStore(STORE_FILE, SAVED_STORE_FILE)
 
 def loadPrev():
     with open(Path(__file__).parent / "loadparams.json") as f:
         params2 = json.load(f)
     for key in params2:
         params[key] = params2[key]
+    # Experiments saved before a parameter existed get its default value
+    # and (pinned) range
+    with open(Path(__file__).parent / "defaultparams.json") as f:
+        defaults = json.load(f)
+    for key in ("vars", "min", "max"):
+        params[key] = dict(defaults[key], **params[key])
+    if SAVED_STORE_FILE.exists():
+        copyStore(SAVED_STORE_FILE, STORE_FILE)
+    else:
+        clearStore()
+    resetJournal()
+    params["runtime"]["raw_trials"] = migrateRawTrials(params["runtime"]["raw_trials"])
     storeParams()
 
+def resumeExperiment():
+    """
+    Called once when the runner starts: replays journaled transitions on top
+    of the params.json snapshot and points current_trial at the first trial
+    of the running phase that is not in the trial store yet. Returns the
+    trials that were killed mid-simulation.
+    """
+    unfinished = replay(params)
+    p = params["runtime"]["status"]["current_phase"]
+    if(("phase_"+str(p)) in params["runtime"]["phase_history"]):
+        phaseInfo = params["runtime"]["phase_history"][("phase_"+str(p))]
+        done = getTrials(phase=p)
+        numTrials = phaseInfo["num_trials"]
+        if(phaseInfo.get("ended_early")):
+            params["runtime"]["status"]["current_trial"] = numTrials
+        elif(phaseInfo.get("search_mode") == "trace" and "confirmed" not in phaseInfo):
+            # Trace evaluation is cheap to redo, and confirmed trials that
+            # finished come back from the simulation cache
+            params["runtime"]["status"]["current_trial"] = 0
+        elif(phaseInfo.get("search_mode") == "halving" and "promotions" not in phaseInfo):
+            # Rankings span the whole phase; finished rungs come back from
+            # the simulation cache and are not recorded twice
+            params["runtime"]["status"]["current_trial"] = 0
+        else:
+            params["runtime"]["status"]["current_trial"] = next(
+                (t for t in range(numTrials) if ("trial_"+str(p)+"_"+str(t)) not in done),
+                numTrials
+            )
+    storeParams()
+    return unfinished
+
+def reloadParams():
+    # Pick up changes another process (the dashboard) wrote to params.json
+    with open(PARAM_FILE) as f:
+        params2 = json.load(f)
+    for key in params2:
+        params[key] = params2[key]
+    params["runtime"]["raw_trials"] = migrateRawTrials(params["runtime"]["raw_trials"])
+
 # -------------------------------------------------------------------
 # STATISTICS EXTRACTION
 # -------------------------------------------------------------------
@@ -176,12 +361,9 @@ def printTrialStats():
         content = f.read(3000)
     print(content)
 
-def extractTrialStats():
-    os.chdir("/gem5/m5out")
-    with open("stats.txt", "r") as f:
-        text = f.read()
-    numbers = re.findall(r'-?\d+(?:\.\d+)?', text)
-    return [float(n) if '.' in n else int(n) for n in numbers]
+def extractTrialStats(allowlist=TRIAL_STATS):
+    # {stat name: value} of the final dump in /gem5/m5out/stats.txt
+    return finalStats("/gem5/m5out/stats.txt", allowlist)
 
 currentOutline = ["1. Do this", "2. Do that"]
 
@@ -210,10 +392,20 @@ def parseOutlineResponse(outline_str):
 
     rows = []
 
-    # Split by lines, ignore empty ones
+    # Split by lines, ignore empty ones and anything that is not a phase
     lines = [l.strip() for l in outline_str.strip().splitlines() if l.strip()]
 
     for line in lines:
+        row = parseOutlineLine(line)
+        if row is not None:
+            rows.append(row)
+
+    return rows
+
+def parseOutlineLine(line):
+    # One outline row, or None for a line that is not a complete phase
+    # (prose, code fences, a FETCH request)
+    try:
         # Extract quoted strings
         quoted = re.findall(r'"([^"]*)"', line)
 
@@ -240,23 +432,80 @@ def parseOutlineResponse(outline_str):
             for i in range(num_params)
         ]
 
-
         num_trials = numbers[-1]
-
-        rows.append([
-            phase_goal,
-            phase_hypothesis,
-            params,
-            param_ranges,
-            num_trials
-        ])
-
-    return rows
+    except IndexError:
+        return None
+
+    if len(numbers) < 3 or num_params == 0:
+        return None
+
+    return [
+        phase_goal,
+        phase_hypothesis,
+        params,
+        param_ranges,
+        num_trials
+    ]
 
 # -------------------------------------------------------------------
 # OUTLINE GENERATION & MODIFICATION VIA GEMINI
 # -------------------------------------------------------------------
-def generateOutline(modification):
+def streamOutline(prompt, on_phase=None):
+    """
+    Streams an outline from Gemini and returns the full response text.
+    Every phase line is parsed as soon as it is complete and published to
+    params.json with the outline marked "streaming", so the runner can start
+    early phases while later ones are still being written. on_phase(rows),
+    if given, gets the phases parsed so far each time one is added.
+    """
+    previous = params["outline"]["phases"]
+    text = ""
+    published = 0
+    try:
+        for chunk in streamGemini(prompt):
+            text += chunk
+            complete = text[:text.rfind("\n") + 1]
+            lines = [l.strip() for l in complete.splitlines() if parseOutlineLine(l.strip()) is not None]
+            if len(lines) > published:
+                published = len(lines)
+                with paramsLock:
+                    params["outline"]["phases"] = "\n".join(lines)
+                    params["outline"]["streaming"] = True
+                    storeParams()
+                if on_phase is not None:
+                    on_phase(parseOutlineResponse("\n".join(lines)))
+    except Exception:
+        # Never leave a half-written outline behind
+        with paramsLock:
+            params["outline"]["phases"] = previous
+            params["outline"]["streaming"] = False
+            storeParams()
+        raise
+    return text
+
+def workingSetPrompt():
+    # Measured miss-ratio curves, once profileWorkingSet() has run
+    profile = params["runtime"].get("working_set")
+    if not profile:
+        return ""
+    return ("\n\nMeasured miss-ratio curves of the stressor's memory trace (fully associative LRU); "
+            "start cache size sweeps where the miss ratio actually changes:\n" + profileSummary(profile))
+
+def generateOutline(modification, on_phase=None):
+    """
+    Generates or modifies the outline and returns its dashboard cards. The
+    outline is never left marked "streaming" if a Gemini call fails after
+    it was streamed.
+    """
+    try:
+        return writeOutline(modification, on_phase)
+    finally:
+        with paramsLock:
+            if params["outline"].get("streaming"):
+                params["outline"]["streaming"] = False
+                storeParams()
+
+def writeOutline(modification, on_phase=None):
     
     # response = client.models.generate_content(
     #     model="gemini-3-flash-preview",
@@ -266,8 +515,9 @@ def generateOutline(modification):
 
     if(modification != "Generate" and params["outline"]["phases"] != ""):
         currentOutline.append(modification)  
-        if(modification not in params["outline"]["user_modifications"] and modification[0] != '&'):
-            params["outline"]["user_modifications"].append(modification)
+        with paramsLock:
+            if(modification not in params["outline"]["user_modifications"] and modification[0] != '&'):
+                params["outline"]["user_modifications"].append(modification)
 
         modify_prompt = "The C stressor program you are trying to optimize is: \n" + c_program_contents + "\n\nThink about the nature of the taskload, like how the stressor algorithm's use of memory might affect cache hit-rate/execution speed"
         modify_prompt += "\n\nFor each phase, specify a small goal, a hypothesis, the 1 to 3 parameters you want to change in that phase, the start and endpoint for each parameter you are changing, the number of steps (trials) you are going to take to reach from start to end" 
@@ -276,6 +526,7 @@ def generateOutline(modification):
         for i in PARAMS:
             if(params["min"][i] != params["max"][i]):
                 modify_prompt += ("\n" + str(i) + " in range " + str(params["min"][i]) + " to " + str(params["max"][i]))
+        modify_prompt += workingSetPrompt()
         
         modify_prompt += "\nYou already generated an initial outline of 4-6 phases, tailored to the context of optimizing microarchitecture params for the C program's execution\nWhen changing from one memory size to another, you can only go in powers of 2. So 16MB to 128MB should have: 16MB, 32MB, 64MB, 128MB, with the number of steps being 4"
         modify_prompt += "\n\n The Formatting is as follows:\n"
@@ -289,21 +540,16 @@ def generateOutline(modification):
         modify_prompt += "\n\nIMPORTANT, you need to modify parts of the outline based on this feedback request: " + modification
         modify_prompt += "\nReturn the output in the same format. Always start your answer from phase 0"
        
-        response = client.models.generate_content(
-            model="gemini-3-flash-preview",
-            contents=[
-                {
-                    "role": "system",
-                    "parts": [{"text": SYSTEM_INSTRUCTION}]
-                },
-                {
-                    "role": "user",
-                    "parts": [{"text": modify_prompt}]
-                }
-            ]
-        )
+        responseText = streamOutline(modify_prompt, on_phase)
+        # Runtime re-plans only carry trial summaries; send raw logs of the
+        # trials Gemini asks for and ask again
+        fetchKeys = fetchRequest(responseText)
+        if len(fetchKeys) > 0:
+            modify_prompt += "\n\nRaw logs of the trials you requested:\n" + trialLogs(fetchKeys, getTrials())
+            modify_prompt += "\nDo not request more logs; answer with the outline now."
+            responseText = streamOutline(modify_prompt, on_phase)
         print("Modify Prompt:", modify_prompt)
-        print("\n\nAI Modify Response:", response.text)
+        print("\n\nAI Modify Response:", responseText)
 
         summary_modified = ""
       
@@ -311,21 +557,9 @@ def generateOutline(modification):
         if(modification[0] == '*' or modification[0] == '&'):
             summary_prompt = "This was your original outline: " + params["outline"]["phases"]
             summary_prompt = "This was the modification I asked you to make: " + modification
-            summary_prompt += "\n\nThis is the new outline you generated: " + response.text
+            summary_prompt += "\n\nThis is the new outline you generated: " + responseText
             summary_prompt += "\n\nGive a 2 sentence response detailing how you incorporated my advice exactly in the modified outline, exactly what you modified. 1 sentence on how it can change performance of computer architecture."
-            response2 = client.models.generate_content(
-                model="gemini-3-flash-preview",
-                contents=[
-                    {
-                        "role": "system",
-                        "parts": [{"text": SYSTEM_INSTRUCTION}]
-                    },
-                    {
-                        "role": "user",
-                        "parts": [{"text": summary_prompt}]
-                    }
-                ]
-            )
+            response2 = askGemini(summary_prompt)
             summary_modified = response2.text
 
             print("summary modified")
@@ -339,12 +573,14 @@ def generateOutline(modification):
     # "Based on the Phase 0 results, which showed that simulation time remained constant at 0.000197s across all L1D sizes, I have maintained the upcoming phases to focus on instruction delivery (L1I) and system-level overhead (DDR) since data capacity is clearly not the bottleneck. I specifically kept the L1I exploration at the lower 1kB-16kB range and the DDR exploration at 16MB-64MB to determine the absolute minimum viable hardware footprint for this N=100 workload. Right-sizing microarchitectural structures to the specific working set of an application reduces power consumption and decreases access latency by avoiding the overhead of over-provisioned cache hierarchies.",
     # "I have updated the experiment plan to pivot toward **L1 Instruction Cache (L1I)** scaling in Phase 1 because the identical \"Sim Secs\" results across all Phase 0 trials prove that L1 Data Cache capacity is not the primary bottleneck for this sorting workload. I also incorporated memory footprint and core scaling checks in Phases 2 and 3 to rule out system-level constraints and verify the single-threaded nature of the recursive kernels.\n\nAddressing instruction-fetch efficiency through L1I optimization can significantly improve performance by reducing frontend stalls and pipeline bubbles, ensuring that the execution units are consistently utilized regardless of data cache size."
 
-            if(modification[0] == '*' and (summary_modified not in params["outline"]["modif_summary"])):
-                params["outline"]["modif_summary"].append(summary_modified)
-            elif(modification[0] == '&' and (summary_modified not in params["outline"]["runtime_modifications"])):
-                params["outline"]["runtime_modifications"].append(summary_modified)
+            with paramsLock:
+                if(modification[0] == '*' and (summary_modified not in params["outline"]["modif_summary"])):
+                    params["outline"]["modif_summary"].append(summary_modified)
+                elif(modification[0] == '&' and (summary_modified not in params["outline"]["runtime_modifications"])):
+                    params["outline"]["runtime_modifications"].append(summary_modified)
 
-        params["outline"]["phases"] = response.text
+        with paramsLock:
+            params["outline"]["phases"] = responseText
 
     elif params["outline"]["phases"] == "":
         initial_prompt = "The C stressor program you are trying to optimize is: \n" + c_program_contents + "\n\nThink about the nature of the taskload, like how the stressor algorithm's use of memory might affect cache hit-rate/execution speed"
@@ -353,6 +589,7 @@ def generateOutline(modification):
         for i in PARAMS:
             if(params["min"][i] != params["max"][i]):
                 initial_prompt += ("\n" + str(i) + " in range " + str(params["min"][i]) + " to " + str(params["max"][i]))
+        initial_prompt += workingSetPrompt()
         
         initial_prompt += "\n\nFor each phase, specify a small goal, a hypothesis, the 1 to 3 parameters you want to change in that phase, the start and endpoint for each parameter you are changing, the number of steps (trials) you are going to take to reach from start to end" 
         initial_prompt += "\n\nRemember, you are not simply maximizing the cache size or number of cores as that would obviously result in maximum speed. Instead, you can slowly linearly interpolate a parameter over 10-20 trials, and identify exactly when a bottleneck is reached, when no further progress is made even though cache size is increasing and making microarchitecture more costly.\nWhen changing from one memory size to another, you can only go in powers of 2. So 16MB to 128MB should have: 16MB, 32MB, 64MB, 128MB, with the number of steps being 4"
@@ -384,11 +621,19 @@ def generateOutline(modification):
     1 "Evaluate L1I capacity requirements for recursive kernels and library overhead" "The instruction footprint includes recursion logic and C standard library calls (malloc, printf, rand); IPC will improve initially but hit a plateau early (likely around 16kB-32kB) as the core loops are small" 1 "l1i_size" "1kB" "64kB" 15
     2 "Optimize L1I associativity to mitigate conflict misses during deep recursion" "The recursive nature of Quick Sort and Merge Sort involves frequent jumps between the sorting logic and the partition/merge subroutines; higher associativity will reduce conflict misses in the instruction cache, stabilizing IPC" 1 "l1i_assoc" "3" "7" 5
     3 "Assess DDR capacity impact on execution time to identify the minimum viable memory footprint" "Since the workload is primarily CPU and cache-bound with a small data footprint (N=100), increasing DDR size beyond the initial threshold will yield negligible performance gains, allowing for cost-reduction" 1 "DDR_memory_size" "16MB" "128MB" 8"""
-        params["outline"]["phases"] = out
+        with paramsLock:
+            params["outline"]["phases"] = out
     
-    storeParams()
+    with paramsLock:
+        params["outline"]["streaming"] = False
+        appendEvent(params, "outline_modified", outline=params["outline"])
+        storeParams()
+        phases = params["outline"]["phases"]
     
-    parsedOutline = parseOutlineResponse(params["outline"]["phases"])
+    return outlineCards(parseOutlineResponse(phases))
+
+def outlineCards(parsedOutline):
+    # One text card per phase for the dashboard
     frontEndPrinting = []
     num = 0
     for p in parsedOutline:
@@ -431,8 +676,13 @@ def setDynamicUpdates(num):
 # -------------------------------------------------------------------
 def createReport():
     report_prompt = """You are ARCHAI, a pre-silicon microarchitecture research analyst. You completed an experiment in phases which have goals, hypotheses, and trials. Generate a full structured performance report in Markdown that can be converted into a PDF. Here is are the logs:\n"""
+    # Experiment setup and phase history as JSON; trials and previous
+    # results (old reports, research answers) would grow without bound
     for key in params:
-        report_prompt += "\n" + key + " -> " + json.dumps(params[key])
+        if key not in ("runtime", "results"):
+            report_prompt += "\n" + key + " -> " + json.dumps(params[key])
+    report_prompt += "\nphase_history -> " + json.dumps(params["runtime"]["phase_history"])
+    report_prompt += "\ntrials ->\n" + buildTrialContext(params["runtime"]["phase_history"], getTrials())
     report_prompt += """
         Sections needed:
         1. Title Page
@@ -454,7 +704,7 @@ def createReport():
         - No HTML tags
         - No emojis
         """
-    response = client.models.generate_content(
+    response = generate(
         model="gemini-3-flash-preview",
         contents=report_prompt
     )
@@ -464,12 +714,388 @@ def createReport():
         f.write(report_md)
 
 
+# -------------------------------------------------------------------
+# PHASE TRIAL CONFIGURATION
+# -------------------------------------------------------------------
+def phaseTrialVars(phaseInfo, t):
+    """
+    Computes the full "vars" for trial t of a phase without touching
+    params["vars"], so every trial of a phase can be prepared up front.
+
+    Returns (trialVars, arrayToLog) where arrayToLog alternates parameter
+    names and the values used for this trial.
+    """
+    trialVars = dict(params["vars"])
+    arrayToLog = []
+    for par in phaseInfo["params_changed"]:
+        mini = str(params["min"][par])
+        maxi = str(params["max"][par])
+        arrayToLog.append(par)
+        if(categoryOf(mini) is not None):
+            # Categorical (cpu_type, memory_type, ...): step through the choices
+            domain = paramDomain(mini, maxi, par)
+            trialVars[par] = domain[lerp(t, 0, phaseInfo["num_trials"]-1, 0, len(domain)-1)]
+        elif(mini.isdigit() and par in POW2_PARAMS):
+            # Only powers of two are simulated, so step through those
+            trialVars[par] = 1 << lerp(t, 0, phaseInfo["num_trials"]-1, log2_int(int(mini)), log2_int(int(maxi)))
+        elif(mini.isdigit()):
+            trialVars[par] = lerp(t, 0, phaseInfo["num_trials"], maybeInt(mini), maybeInt(maxi))
+        else:
+            unit = mini[-2:]
+            mini = mini[:-2]
+            maxi = maxi[:-2]
+
+            trialVars[par] = str(1 << lerp(t, 0, phaseInfo["num_trials"]-1, log2_int(maybeInt(mini)), log2_int(maybeInt(maxi)))) + unit
+        arrayToLog.append(trialVars[par])
+    return trialVars, arrayToLog
+
+def recordTrial(key, trialVars, arrayToLog, result, fidelity="full", extra=None):
+    # Store and journal one finished trial; fidelity names the rung of the
+    # search_planner ladder that produced the result, or "predicted"
+    appendTrial(key, dict(extra or {}, **{
+        "vars" : trialVars,
+        "param_values" : arrayToLog,
+        "results" : trialResults(result["stats"]),
+        "stats" : result["stats"],
+        "kernels" : result.get("kernels", {}),
+        "cached" : result["cached"],
+        "fidelity" : fidelity
+    }))
+    appendEvent(params, "trial_finished", key=key)
+
+def runPhaseTrials(jobs, logs):
+    """
+    Simulates a phase's (trial_key, trial_vars) jobs in parallel and returns
+    their stats in job order. With surrogate skipping on, trials the
+    surrogate predicts confidently are recorded from the model instead,
+    unless one of its verification runs misses by more than TOLERANCE.
+    """
+    plan = [None] * len(jobs)
+    if(params["runtime"]["status"].get("surrogate_skipping", 0) == 1):
+        history = [
+            (recordVars(record), record["stats"]) for record in getTrials().values()
+            if "vars" in record and record.get("fidelity", "full") == "full"
+        ]
+        plan = planSkips(history, varyingBounds(), [job[1] for job in jobs])
+    simulate = [i for i in range(len(jobs)) if plan[i] is None or plan[i]["action"] != "predict"]
+    predicted = [i for i in range(len(jobs)) if i not in simulate]
+    stats = [None] * len(jobs)
+
+    # Store and journal every trial the moment it finishes
+    def onResult(indices):
+        def record(j, result):
+            i = indices[j]
+            extra = {}
+            if plan[i] is not None and plan[i]["action"] == "verify":
+                extra["surrogate_check"] = {
+                    "predicted": plan[i]["stats"],
+                    "error": predictionError(plan[i]["stats"], result["stats"])
+                }
+            stats[i] = result["stats"]
+            recordTrial(jobs[i][0], jobs[i][1], logs[i], result, extra=extra)
+        return record
+
+    simulateJobs([jobs[i] for i in simulate], on_result=onResult(simulate))
+
+    verified = all(
+        predictionError(plan[i]["stats"], stats[i]) <= TOLERANCE
+        for i in simulate if plan[i] is not None and plan[i]["action"] == "verify"
+    )
+    if verified:
+        for i in predicted:
+            stats[i] = plan[i]["stats"]
+            result = {"stats": plan[i]["stats"], "cached": False}
+            recordTrial(jobs[i][0], jobs[i][1], logs[i], result, "predicted", {"uncertainty": plan[i]["uncertainty"]})
+    else:
+        # The surrogate failed a check, so simulate what it wanted to skip
+        simulateJobs([jobs[i] for i in predicted], on_result=onResult(predicted))
+    return stats
+
+def runHalvingPhase(p, phaseInfo):
+    """
+    Successive halving over every trial point of phase p: all of them are
+    simulated on the cheapest fidelity, and only the best fraction is
+    promoted to each next rung. Every trial keeps the result of the highest
+    rung it reached. Returns the phase's jobs.
+    """
+    ladder = [name for name, _ in FIDELITIES]
+    done = getTrials(phase=p)
+    jobs = []
+    logs = {}
+    for trial in range(phaseInfo["num_trials"]):
+        key = "trial_"+str(p)+"_"+str(trial)
+        trialVars, arrayToLog = phaseTrialVars(phaseInfo, trial)
+        jobs.append((key, trialVars))
+        logs[key] = arrayToLog
+
+    def runRung(fidelity, rungJobs):
+        level = ladder.index(fidelity)
+        simJobs = [(key, trialVars, fidelityOptions(fidelity)) for key, trialVars in rungJobs]
+        # Only record trials whose stored result comes from a lower rung
+        fresh = set()
+        for key, trialVars, _ in simJobs:
+            if key not in done or ladder.index(done[key].get("fidelity", "full")) < level:
+                fresh.add(key)
+                appendEvent(params, "trial_started", key=key, vars=trialVars)
+
+        def onResult(i, result):
+            key = simJobs[i][0]
+            if key in fresh:
+                recordTrial(key, simJobs[i][1], logs[key], result, fidelity)
+
+        return [result["stats"] for result in simulateJobs(simJobs, on_result=onResult)]
+
+    phaseInfo["promotions"] = successiveHalving(jobs, runRung)
+    return jobs
+
+def isTracePhase(phaseInfo):
+    # Only cache geometry changes, so the memory trace can stand in for gem5
+    return phaseInfo.get("search_mode") == "trace" and all(par in CACHE_PARAMS for par in phaseInfo["params_changed"])
+
+def runTracePhase(p, phaseInfo):
+    """
+    Evaluates every trial point of a cache-only phase on the workload's
+    memory trace (recorded with fidelity "trace"), then simulates the best
+    1/HALVING_ETA by estimated stall cycles in gem5. Returns the confirmed
+    jobs, best first.
+    """
+    jobs = []
+    logs = []
+    for trial in range(phaseInfo["num_trials"]):
+        trialVars, arrayToLog = phaseTrialVars(phaseInfo, trial)
+        jobs.append(("trial_"+str(p)+"_"+str(trial), trialVars))
+        logs.append(arrayToLog)
+
+    traceJobs = workloadJobs(jobs)
+    with releasedParams():
+        traced = traceTrials(traceJobs)
+    for job, arrayToLog, stats in zip(jobs, logs, traced):
+        recordTrial(job[0], job[1], arrayToLog, {"stats": stats, "cached": False}, "trace")
+
+    best = promote([traceScore(stats) for stats in traced])
+    for i in best:
+        appendEvent(params, "trial_started", key=jobs[i][0], vars=jobs[i][1])
+    runPhaseTrials([jobs[i] for i in best], [logs[i] for i in best])
+    phaseInfo["confirmed"] = [jobs[i][0] for i in best]
+    return [jobs[i] for i in best]
+
+def profileWorkingSet(apply_ranges=True):
+    """
+    Miss-ratio curves of the current workload's memory trace, kept in
+    params["runtime"]["working_set"] for the outline prompts. With
+    apply_ranges, every cache size the experiment varies has its min/max
+    narrowed (never widened) to the capacities where its miss ratio
+    changes; a size whose narrowed range would collapse is left alone.
+    Run by the runner ("profile" command).
+    """
+    with paramsLock:
+        job = workloadJobs([("working_set", dict(params["vars"]))])[0]
+    profile = profileTrace(ensureTrace(resolveWorkloads([job])[0]))
+    with paramsLock:
+        params["runtime"]["working_set"] = profile
+        if apply_ranges:
+            for par, entry in profile.items():
+                narrowed = narrowRange(entry["range"], params["min"][par], params["max"][par])
+                if narrowed is not None:
+                    params["min"][par], params["max"][par] = narrowed
+        storeParams()
+    return profileSummary(profile)
+
+def varyingBounds():
+    # Every parameter the experiment is allowed to change
+    return {
+        par: (params["min"][par], params["max"][par])
+        for par in params["min"]
+        if str(params["min"][par]) != str(params["max"][par])
+    }
+
+def runBayesBatch(p, phaseInfo):
+    """
+    Simulates the next batch (one trial per worker) of a "bayes" phase.
+    Every full-fidelity trial so far trains the model. With the outline
+    prior on, only the phase's parameters are searched within its ranges;
+    otherwise the whole min/max space is. Returns the batch's jobs.
+    """
+    t = params["runtime"]["status"]["current_trial"]
+    bounds = varyingBounds()
+    if(params["runtime"]["status"].get("bayes_outline_prior", 1) == 1):
+        space = {par: tuple(rng) for par, rng in zip(phaseInfo["params_changed"], phaseInfo["param_ranges"])}
+    else:
+        space = bounds
+    for par in space:
+        bounds.setdefault(par, space[par])
+
+    history = []
+    for record in getTrials().values():
+        score = trialScore(record["stats"])
+        if "vars" in record and record.get("fidelity", "full") == "full" and 0 < score < math.inf:
+            history.append((recordVars(record), score))
+
+    count = min(MAX_TRIAL_WORKERS, phaseInfo["num_trials"] - t)
+    proposals = propose(params["vars"], space, bounds, history, count, seed=p * 1000 + t)
+
+    jobs = []
+    logs = []
+    for i, trialVars in enumerate(proposals):
+        key = "trial_"+str(p)+"_"+str(t + i)
+        jobs.append((key, trialVars))
+        logs.append([x for par in space for x in (par, trialVars[par])])
+        appendEvent(params, "trial_started", key=key, vars=trialVars)
+
+    def onResult(i, result):
+        recordTrial(jobs[i][0], jobs[i][1], logs[i], result)
+
+    simulateJobs(jobs, on_result=onResult)
+    return jobs
+
+def runBisectRound(p, phaseInfo):
+    """
+    One round of a "bisect" phase: simulates the endpoints of the parameter's
+    domain (powers of two for sizes, like phaseTrialVars), then the midpoint
+    of the bracket around the knee. When the knee is bracketed to one domain
+    step or the trial budget is spent, the bracket is recorded in
+    phase_history and the phase ends. Returns the round's jobs.
+    """
+    par = phaseInfo["params_changed"][0]
+    domain = paramDomain(params["min"][par], params["max"][par], par)
+    t = params["runtime"]["status"]["current_trial"]
+
+    names = [str(v) for v in domain]
+    def measured():
+        values = {}
+        for value, metric in sweepPoints(getTrials(phase=p), par, scoreStat()):
+            if str(value) in names:
+                values[names.index(str(value))] = metric
+        return values
+
+    budget = min(MAX_TRIAL_WORKERS, phaseInfo["num_trials"] - t)
+    probes, _ = bisectStep(measured(), len(domain), budget)
+
+    jobs = []
+    for i, index in enumerate(probes):
+        key = "trial_"+str(p)+"_"+str(t + i)
+        trialVars = dict(params["vars"], **{par: domain[index]})
+        jobs.append((key, trialVars))
+        appendEvent(params, "trial_started", key=key, vars=trialVars)
+
+    def onResult(i, result):
+        recordTrial(jobs[i][0], jobs[i][1], [par, jobs[i][1][par]], result)
+
+    simulateJobs(jobs, on_result=onResult)
+    params["runtime"]["status"]["current_trial"] = t + len(jobs)
+
+    if len(jobs) == 0 or t + len(jobs) >= phaseInfo["num_trials"]:
+        # Best bracket the trials run so far allow, including this round's
+        values = measured()
+        _, bracket = bisectStep(values, len(domain), 0)
+        if bracket is not None:
+            lo, hi = bracket
+            phaseInfo["knee"] = {
+                "param": par,
+                "value": domain[hi],
+                "metric": scoreStat(),
+                "plateau_level": values[len(domain) - 1],
+                "bracket": [None if lo is None else domain[lo], domain[hi]],
+            }
+            # Later phases start from the smallest value already on the plateau
+            params["vars"][par] = domain[hi]
+        if params["runtime"]["status"]["current_trial"] < phaseInfo["num_trials"]:
+            phaseInfo["ended_early"] = True
+        params["runtime"]["status"]["current_trial"] = phaseInfo["num_trials"]
+    return jobs
+
+def checkPlateau(p, phaseInfo, earlyStop):
+    """
+    Looks for a plateau of the trial score (scoreStat()) over the
+    single-parameter sweep run so far. A detected knee is recorded in
+    phase_history; with early stopping on, the remaining trials of the
+    phase are skipped.
+    """
+    if len(phaseInfo["params_changed"]) != 1:
+        return
+    par = phaseInfo["params_changed"][0]
+    points = sweepPoints(getTrials(phase=p), par, scoreStat())
+    knee = detectPlateau(points)
+    if knee is None:
+        return
+    phaseInfo["knee"] = kneeRecord(points, knee, par, scoreStat())
+    remaining = phaseInfo["num_trials"] - params["runtime"]["status"]["current_trial"]
+    if earlyStop and remaining > 0:
+        phaseInfo["ended_early"] = True
+        phaseInfo["knee"]["skipped_trials"] = remaining
+        params["runtime"]["status"]["current_trial"] = phaseInfo["num_trials"]
+
+def trialResults(stats):
+    # Summary columns shown on the dashboard; a failed gem5 run leaves no
+    # stats.txt, so missing values are logged as None instead of crashing
+    return ["Sim Secs", stats.get("simSeconds"), "Used Memory Bytes", stats.get("hostMemory"), "Instr Rate", stats.get("hostInstRate")]
+
+def phaseInfoFromRow(row):
+    # phase_history entry for one parsed outline row
+    return {
+        "goal": row[0],
+        "hypothesis": row[1],
+        "params_changed": row[2],
+        "num_trials": row[4],
+        "param_ranges": row[3],
+        "search_mode": searchMode(params),
+        "embedding_branch_decision": ""
+    }
+
+def speculativeJobs(p):
+    """
+    Jobs for the first round of phase p as the current outline describes
+    it: the first wave of a linear phase (the whole phase without early
+    stopping), the screening rung of a halving phase or the endpoints of a
+    bisect phase. Bayes phases depend on results and are not speculated,
+    nor are trace phases, whose gem5 trials depend on the trace ranking.
+    """
+    parsedOutline = parseOutlineResponse(params["outline"]["phases"])
+    if(p >= len(parsedOutline)):
+        return []
+    phaseInfo = phaseInfoFromRow(parsedOutline[p])
+    mode = phaseInfo["search_mode"]
+    if(mode == "bayes" or isTracePhase(phaseInfo)):
+        return []
+    if(mode == "bisect" and len(phaseInfo["params_changed"]) == 1):
+        par = phaseInfo["params_changed"][0]
+        domain = paramDomain(params["min"][par], params["max"][par], par)
+        return [
+            ("spec_"+str(p)+"_"+str(i), dict(params["vars"], **{par: domain[i]}))
+            for i in sorted({0, len(domain) - 1})
+        ]
+    numTrials = phaseInfo["num_trials"]
+    if(mode == "lerp" and params["runtime"]["status"].get("early_stop", 0) == 1):
+        numTrials = min(numTrials, MAX_TRIAL_WORKERS)
+    jobs = [("spec_"+str(p)+"_"+str(t), phaseTrialVars(phaseInfo, t)[0]) for t in range(numTrials)]
+    if(mode == "halving"):
+        jobs = [(key, trialVars, fidelityOptions(FIDELITIES[0][0])) for key, trialVars in jobs]
+    return jobs
+
+def experimentFinished():
+    # createReport() bumps current_phase past the last outline phase
+    if(params["outline"]["phases"] == "" or params["outline"].get("streaming")):
+        return False
+    return params["runtime"]["status"]["current_phase"] > len(parseOutlineResponse(params["outline"]["phases"]))
+
 # -------------------------------------------------------------------
 # MAIN EXPERIMENT EXECUTION LOOP
 # -------------------------------------------------------------------
 def runExperiment():
+    """
+    Advances the experiment by one step (a phase transition or a batch of
+    trials). Holds paramsLock throughout, except while trials simulate.
+    """
+    with paramsLock:
+        experimentThread.locked = True
+        try:
+            return experimentStep()
+        finally:
+            experimentThread.locked = False
+
+def experimentStep():
     if(params["outline"]["phases"] == ""):
-        return "NOT READY"
+        return "WAITING" if params["outline"].get("streaming") else "NOT READY"
     
     p = params["runtime"]["status"]["current_phase"]
     t = params["runtime"]["status"]["current_trial"]
@@ -479,56 +1105,118 @@ def runExperiment():
         if(phaseInfo["num_trials"] == t):
             if(params["runtime"]["status"]["dynamic_result_interpretation"] == 1):
                 modif_prompt = "&You just finished running phase " + str(p) +" with the following info: " + json.dumps(params["runtime"]["phase_history"]["phase_" + str(p)], indent=2)
-                modif_prompt += "\n\nHere are raw trial logs: " + str(params["runtime"]["raw_trials"])
+                modif_prompt += "\n\nHere are the trial logs so far:\n" + buildTrialContext(params["runtime"]["phase_history"], getTrials(), focus_phase=p)
+                modif_prompt += "\n\n" + FETCH_INSTRUCTION
                 modif_prompt += "\n\nTrial logs are in the format 'trial_phasenumber_trialnumber'. Analyze all the trials of the phase you just ran and identify if the hypothesis was correct. If correct, don't modify the outline much. If incorrect, update the outline from the next phase onward to improve the experiment dynammically now that you see what the experiment results are producing."
-                generateOutline(modif_prompt)
+                # Simulate the start of the next phase of the current outline
+                # while Gemini re-plans; results land in the simulation cache,
+                # so the real phase gets them back for free if it is unchanged
+                speculative = speculativeJobs(p + 1)
+                cancel = threading.Event()
+                speculation = threading.Thread(target=simulateJobs, args=(speculative,), kwargs={"cancel": cancel})
+                speculation.start()
+                kept = False
+                try:
+                    generateOutline(modif_prompt)
+                    kept = speculativeJobs(p + 1) == speculative
+                finally:
+                    if not kept:
+                        # Drop queued speculative trials; running ones finish
+                        # in the background without holding up the next phase
+                        cancel.set()
+                    speculation.join()
+                phaseInfo["speculation"] = {"trials": len(speculative), "kept": kept}
                 params["runtime"]["phase_history"]["phase_" + str(p)]["embedding_branch_decision"] = params["outline"]["runtime_modifications"][-1]
+            appendEvent(params, "phase_finished", phase=p)
             params["runtime"]["status"]["current_phase"] += 1
             params["runtime"]["status"]["current_trial"] = 0
             storeParams()
+        elif(phaseInfo.get("search_mode") == "bisect" and len(phaseInfo["params_changed"]) == 1):
+            runBisectRound(p, phaseInfo)
+            storeParams()
+            return [record["stats"] for record in getTrials(phase=p).values()]
+        elif(phaseInfo.get("search_mode") == "bayes"):
+            jobs = runBayesBatch(p, phaseInfo)
+            if len(jobs) == 0:
+                # Every configuration in the search space was already simulated
+                params["runtime"]["status"]["current_trial"] = phaseInfo["num_trials"]
+            else:
+                params["runtime"]["status"]["current_trial"] += len(jobs)
+            if(params["runtime"]["status"]["current_trial"] >= phaseInfo["num_trials"]):
+                # Later phases start from the best configuration found so far
+                best = min(
+                    (r for r in getTrials().values() if "vars" in r and r.get("fidelity", "full") == "full"),
+                    key=lambda r: trialScore(r["stats"]),
+                    default=None
+                )
+                if best is not None:
+                    params["vars"] = dict(params["vars"], **best["vars"])
+                    phaseInfo["best_vars"] = best["vars"]
+            storeParams()
+            return [record["stats"] for record in getTrials(phase=p).values()]
+        elif(isTracePhase(phaseInfo)):
+            jobs = runTracePhase(p, phaseInfo)
+            # Later phases start from the best configuration gem5 confirmed
+            done = getTrials(phase=p)
+            params["vars"] = min(jobs, key=lambda job: trialScore(done[job[0]]["stats"]))[1]
+            params["runtime"]["status"]["current_trial"] = phaseInfo["num_trials"]
+            storeParams()
+            return [record["stats"] for record in getTrials(phase=p).values()]
+        elif(phaseInfo.get("search_mode") == "halving"):
+            jobs = runHalvingPhase(p, phaseInfo)
+            params["vars"] = jobs[-1][1]
+            params["runtime"]["status"]["current_trial"] = phaseInfo["num_trials"]
+            storeParams()
+            return [record["stats"] for record in getTrials(phase=p).values()]
         else:
-            ind = 0
-            arrayToLog = []
-            for par in phaseInfo["params_changed"]:
-                mini = str(params["min"][par])
-                maxi = str(params["max"][par])
-                arrayToLog.append(par)
-                if(mini.isdigit()):
-                    params["vars"][par] = lerp(t, 0, phaseInfo["num_trials"], maybeInt(mini), maybeInt(maxi))
-                    arrayToLog.append(params["vars"][par])
-                else:
-                    unit = mini[-2:]
-                    mini = mini[:-2]
-                    maxi = maxi[:-2]
-
-                    params["vars"][par] = str(1 << lerp(t, 0, phaseInfo["num_trials"]-1, log2_int(maybeInt(mini)), log2_int(maybeInt(maxi)))) + unit
-                    arrayToLog.append(params["vars"][par])
-                ind += 1
+            # Every remaining trial of the phase is independent, so build all of
+            # their configs up front and simulate them in parallel. Trials that
+            # already reached the store (before a restart) are not re-run.
+            # With early stopping on, trials run one wave (one per worker) per
+            # call so the sweep can end as soon as the metric plateaus.
+            earlyStop = params["runtime"]["status"].get("early_stop", 0) == 1
+            done = getTrials(phase=p)
+            jobs = []
+            logs = []
+            last = t
+            for trial in range(t, phaseInfo["num_trials"]):
+                if earlyStop and len(jobs) == MAX_TRIAL_WORKERS:
+                    break
+                last = trial + 1
+                key = "trial_"+str(p)+"_"+str(trial)
+                if key in done:
+                    continue
+                trialVars, arrayToLog = phaseTrialVars(phaseInfo, trial)
+                jobs.append((key, trialVars))
+                logs.append(arrayToLog)
+                appendEvent(params, "trial_started", key=key, vars=trialVars)
+
+            results = runPhaseTrials(jobs, logs)
+
+            if len(jobs) > 0:
+                params["vars"] = jobs[-1][1]
+            params["runtime"]["status"]["current_trial"] = last
+            checkPlateau(p, phaseInfo, earlyStop)
             storeParams()
-            runTrial()
-            stats = extractTrialStats()
-            params["runtime"]["raw_trials"][("trial_"+str(p)+"_"+str(t))] = {
-                "param_values" : arrayToLog,
-                "results" : ["Sim Secs", stats[0], "Used Memory Bytes", stats[6], "Instr Rate", stats[9]]
-            }
-            params["runtime"]["status"]["current_trial"] += 1
-            return stats
+            return results
     else:
         outline = params["outline"]["phases"]
         parsedOutline = parseOutlineResponse(outline)
-        if(p == len(parsedOutline)):
+        if(p >= len(parsedOutline) and params["outline"].get("streaming")):
+            # The next phase has not been streamed in yet (a re-streamed
+            # outline restarts from phase 0, so it can be behind current_phase)
+            return "WAITING"
+        elif(p >= len(parsedOutline)):
             createReport()
-            params["runtime"]["status"]["current_phase"] += 1
+            params["runtime"]["status"]["current_phase"] = len(parsedOutline) + 1
         else:
-            row = parsedOutline[p]
-            params["runtime"]["phase_history"][("phase_"+str(p))] = {
-                "goal": row[0],
-                "hypothesis": row[1],
-                "params_changed": row[2],
-                "num_trials": row[4],
-                "param_ranges": row[3],
-                "embedding_branch_decision": ""
-            }
+            phaseInfo = phaseInfoFromRow(parsedOutline[p])
+            if(phaseInfo["search_mode"] != "bayes"):
+                # Compile every workload variant the phase sweeps before its
+                # first trial, all at once
+                buildAll([workloadSpec(phaseTrialVars(phaseInfo, trial)[0]) for trial in range(phaseInfo["num_trials"])])
+            appendEvent(params, "phase_started", phase=p, info=phaseInfo)
+            params["runtime"]["phase_history"][("phase_"+str(p))] = phaseInfo
             params["runtime"]["status"]["current_trial"] = 0
     storeParams()
 
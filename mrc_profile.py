@@ -0,0 +1,230 @@
+# -------------------------------------------------------------------
+# ONE-PASS MISS-RATIO CURVES
+# -------------------------------------------------------------------
+# The LRU stack distance of an access is the number of distinct lines
+# touched since the previous access to the same line. A fully associative
+# LRU cache of C lines misses exactly the accesses whose distance is >= C,
+# so one pass over a captured trace (cache_sim format) gives the miss ratio
+# at every capacity at once. Distances are counted with a Fenwick tree over
+# each line's last-use position. Long traces are spatially sampled: only
+# lines whose hash falls under the sampling rate are tracked, and their
+# distances are scaled by 1 / rate, which keeps reuse within a line exact.
+#
+# The capacities where a curve drops sharply are the workload's working
+# sets. Between the capacity where the curve starts to fall and the one
+# where it flattens out is the only region a cache size sweep can learn
+# anything from; main.profileWorkingSet() narrows params["min"] /
+# params["max"] to it and tells Gemini about the knees.
+#
+# Usage:
+#   python mrc_profile.py TRACE.npz    # curves, knees and ranges as JSON
+
+import json
+import os
+import sys
+
+import numpy as np
+
+from cache_sim import LINE_BYTES, KIND_IFETCH, loadTrace
+from trial_store import numericValue
+
+# Tracked accesses per stream before spatial sampling starts
+MRC_MAX_ACCESSES = int(os.environ.get("ARCHAI_MRC_MAX_ACCESSES", 500000))
+
+# A capacity is still "before" or already "after" the working set while its
+# miss ratio is within this fraction of the curve's total drop of the end
+MRC_TOLERANCE = float(os.environ.get("ARCHAI_MRC_TOLERANCE", 0.05))
+
+# Drops between neighbouring capacities above this fraction of the total
+# drop are reported as knees
+KNEE_FRACTION = 0.1
+
+# Curves that fall by less than this miss ratio overall are flat
+MIN_DROP = 0.001
+
+# Capacities (bytes, powers of two) profiled for each cache size parameter
+CAPACITY_RANGES = {
+    "l1i_size": (1 << 10, 1 << 20),
+    "l1d_size": (1 << 10, 1 << 20),
+    "l2_size": (64 << 10, 64 << 20),
+}
+
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def sampleRate(num_accesses, max_accesses=MRC_MAX_ACCESSES):
+    return 1.0 if num_accesses <= max_accesses else max_accesses / num_accesses
+
+def sampledLines(lines, rate):
+    # Keeps every access of a pseudo-random rate fraction of the lines
+    if rate >= 1.0:
+        return lines
+    hashed = (lines.astype(np.uint64) * HASH_MULTIPLIER) >> np.uint64(40)
+    return lines[hashed < int(rate * (1 << 24))]
+
+def previousUse(lines):
+    # Index of the previous access to the same line, or -1
+    prev = np.full(len(lines), -1, dtype=np.int64)
+    order = np.argsort(lines, kind="stable")
+    same = lines[order[1:]] == lines[order[:-1]]
+    prev[order[1:][same]] = order[:-1][same]
+    return prev
+
+def stackDistances(lines):
+    """
+    LRU stack distance of every access in lines, -1 for the first access
+    to a line. Each line's last use is marked in a Fenwick tree; the
+    distance is the number of marks after the line's previous use.
+    """
+    n = len(lines)
+    distances = np.full(n, -1, dtype=np.int64)
+    tree = [0] * (n + 1)
+    distinct = 0
+    out = distances.tolist()
+    for i, p in enumerate(previousUse(lines).tolist()):
+        if p >= 0:
+            # Marks at positions <= p
+            seen, j = 0, p + 1
+            while j > 0:
+                seen += tree[j]
+                j &= j - 1
+            out[i] = distinct - seen
+            j = p + 1
+            while j <= n:
+                tree[j] -= 1
+                j += j & -j
+        else:
+            distinct += 1
+        j = i + 1
+        while j <= n:
+            tree[j] += 1
+            j += j & -j
+    return np.array(out, dtype=np.int64)
+
+def capacities(param):
+    low, high = CAPACITY_RANGES[param]
+    return [1 << e for e in range(low.bit_length() - 1, high.bit_length())]
+
+def missRatioCurve(lines, sizes, max_accesses=MRC_MAX_ACCESSES):
+    """
+    Fully associative LRU miss ratio of the line stream at every capacity
+    in sizes (bytes). Returns (miss ratios, sampling rate).
+    """
+    if len(lines) == 0:
+        return [0.0] * len(sizes), 1.0
+    # Back-to-back accesses to one line hit at any capacity
+    distinct_run = np.ones(len(lines), dtype=bool)
+    distinct_run[1:] = lines[1:] != lines[:-1]
+    runs = lines[distinct_run]
+    rate = sampleRate(len(runs), max_accesses)
+    distances = stackDistances(sampledLines(runs, rate)).astype(np.float64)
+    distances[distances < 0] = np.inf
+    distances = np.sort(distances / rate)
+    ratios = []
+    for size in sizes:
+        misses = len(distances) - np.searchsorted(distances, size // LINE_BYTES, side="left")
+        ratios.append(float(misses / rate / len(lines)))
+    return ratios, rate
+
+def curveKnees(curve):
+    # Capacities right after a sharp drop: the working set fits from there on
+    ratios = [ratio for _, ratio in curve]
+    drop = ratios[0] - ratios[-1]
+    if drop < MIN_DROP:
+        return []
+    return [curve[i][0] for i in range(1, len(curve)) if ratios[i - 1] - ratios[i] > KNEE_FRACTION * drop]
+
+def sweepRange(curve, tolerance=MRC_TOLERANCE):
+    """
+    (lo, hi) capacities bracketing the part of the curve that changes: lo
+    is the largest capacity still at the small-cache miss ratio, hi the
+    smallest one already at the large-cache miss ratio. None if flat.
+    """
+    ratios = [ratio for _, ratio in curve]
+    drop = ratios[0] - ratios[-1]
+    if drop < MIN_DROP:
+        return None
+    lo = max(i for i in range(len(curve)) if ratios[0] - ratios[i] <= tolerance * drop)
+    hi = min(i for i in range(len(curve)) if ratios[i] - ratios[-1] <= tolerance * drop)
+    return curve[lo][0], curve[hi][0]
+
+def streamProfile(streams, sizes):
+    # Summed over independent streams (one per private cache)
+    total = sum(len(s) for s in streams)
+    misses = np.zeros(len(sizes))
+    rate = 1.0
+    for lines in streams:
+        ratios, r = missRatioCurve(lines, sizes)
+        misses += np.array(ratios) * len(lines)
+        rate = min(rate, r)
+    curve = [[size, float(m / total) if total > 0 else 0.0] for size, m in zip(sizes, misses)]
+    return {
+        "curve": curve,
+        "knees": curveKnees(curve),
+        "range": sweepRange(curve),
+        "accesses": int(total),
+        "sample_rate": rate,
+    }
+
+def profileTrace(trace):
+    """
+    Miss-ratio curve, knees and suggested sweep range (bytes) for each of
+    l1i_size, l1d_size and l2_size. L1 curves are per core and summed; the
+    shared L2 curve is taken over every access in time order, which is its
+    global miss ratio once the L2 is larger than the L1s.
+    """
+    inst = trace["kind"] == KIND_IFETCH
+    cores = np.unique(trace["core"])
+    def perCore(select):
+        return [trace["lines"][select & (trace["core"] == core)] for core in cores]
+    return {
+        "l1i_size": streamProfile(perCore(inst), capacities("l1i_size")),
+        "l1d_size": streamProfile(perCore(~inst), capacities("l1d_size")),
+        "l2_size": streamProfile([trace["lines"]], capacities("l2_size")),
+    }
+
+def sizeText(size):
+    # Always in kB, since a range's min and max must share a unit
+    return str(max(1, size >> 10)) + "kB"
+
+def narrowRange(sweep, mini, maxi):
+    """
+    (min, max) in kB for a cache size currently swept from mini to maxi,
+    cut down to a profile's sweep range. None if the size is not being
+    swept, the curve is flat, or the two ranges overlap in one point or
+    less, so a range is never widened and never collapsed.
+    """
+    low, high = numericValue(mini), numericValue(maxi)
+    if sweep is None or low is None or high is None or low >= high:
+        return None
+    lo, hi = max(sweep[0], int(low)), min(sweep[1], int(high))
+    if lo >= hi:
+        return None
+    return sizeText(lo), sizeText(hi)
+
+def profileSummary(profile):
+    """One line per cache for the outline prompts."""
+    lines = []
+    for param, entry in profile.items():
+        curve = entry["curve"]
+        text = (param + ": miss ratio " + "%.3f" % curve[0][1] + " at " + sizeText(curve[0][0])
+                + ", " + "%.3f" % curve[-1][1] + " at " + sizeText(curve[-1][0]))
+        if len(entry["knees"]) > 0:
+            text += "; working-set knees at " + ", ".join(sizeText(k) for k in entry["knees"])
+        if entry["range"] is None:
+            text += "; flat, the size barely matters"
+        else:
+            text += "; miss ratio changes between " + sizeText(entry["range"][0]) + " and " + sizeText(entry["range"][1])
+        lines.append(text)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python mrc_profile.py TRACE.npz")
+        sys.exit(1)
+    trace = loadTrace(sys.argv[1])
+    if trace is None:
+        print("Could not read " + sys.argv[1])
+        sys.exit(1)
+    print(json.dumps(profileTrace(trace), indent=2))
@@ -0,0 +1,104 @@
+# -------------------------------------------------------------------
+# PLATEAU / KNEE DETECTION
+# -------------------------------------------------------------------
+# Linear phases sweep one parameter from min to max. Once the metric has
+# stayed flat for PLATEAU_WINDOW consecutive parameter values, the rest of
+# the sweep is not expected to change the conclusion: the phase ends early
+# and the first value of the plateau is recorded as the knee. Lerp rounding
+# repeats values (e.g. four 2kB trials at the start of a 2kB-32kB sweep), so
+# trials are collapsed to one point per distinct value first.
+
+import os
+
+from trial_store import numericValue
+
+# Points within this relative distance of the plateau level count as flat
+PLATEAU_TOLERANCE = float(os.environ.get("ARCHAI_PLATEAU_TOLERANCE", 0.02))
+
+# Flat points (knee included) needed before a phase is cut short
+PLATEAU_WINDOW = int(os.environ.get("ARCHAI_PLATEAU_WINDOW", 3))
+
+
+def isFlat(values, tolerance=PLATEAU_TOLERANCE):
+    level = sum(values) / len(values)
+    if level == 0:
+        return all(v == 0 for v in values)
+    return all(abs(v - level) <= tolerance * abs(level) for v in values)
+
+def detectPlateau(points, tolerance=PLATEAU_TOLERANCE, window=PLATEAU_WINDOW):
+    """
+    points: [(param value, metric), ...] in sweep order with distinct
+    values (see sweepPoints()), metric None for failed trials. Returns the
+    index of the knee (first point of the flat tail) if the tail is at
+    least window points long, else None.
+    """
+    values = [m for _, m in points]
+    if len(values) < window or any(v is None for v in values[-window:]):
+        return None
+    knee = None
+    for start in range(len(values) - window, -1, -1):
+        tail = values[start:]
+        if any(v is None for v in tail) or not isFlat(tail, tolerance):
+            break
+        knee = start
+    return knee
+
+def kneeRecord(points, knee, param, metric):
+    # Entry stored in phase_history["phase_N"]["knee"]
+    return {
+        "param": param,
+        "value": points[knee][0],
+        "metric": metric,
+        "plateau_level": points[knee][1],
+        "flat_points": len(points) - knee,
+    }
+
+def sweepPoints(trials, param, metric):
+    """
+    (value of param, mean stats[metric]) for each distinct value of param in
+    the trial records, in sweep order. The mean skips failed trials and is
+    None if every trial of that value failed.
+    """
+    measured = {}
+    for record in trials.values():
+        pv = record["param_values"]
+        value = pv[pv.index(param) + 1] if param in pv else None
+        metrics = measured.setdefault(value, [])
+        if record["stats"].get(metric) is not None:
+            metrics.append(record["stats"][metric])
+    points = [(value, sum(m) / len(m) if len(m) > 0 else None) for value, m in measured.items()]
+    return sorted(points, key=lambda point: numericValue(point[0]) or 0)
+
+# -------------------------------------------------------------------
+# BISECTION
+# -------------------------------------------------------------------
+def bisectStep(values, size, count, tolerance=PLATEAU_TOLERANCE):
+    """
+    One round of the "bisect" search mode over an ordered domain of size
+    points, assuming the metric levels off towards the end of the domain.
+
+    values: {domain index: metric or None} of the points simulated so far.
+    Returns (probes, bracket). probes are up to count domain indices to
+    simulate next: the endpoints first, then the midpoint of the bracket
+    around the knee, so every round halves it. bracket is the current
+    (lo, hi), with hi the first index known to be on the plateau and lo
+    None if the whole domain is flat; it is None until both endpoints are
+    known. Nothing is left to probe once hi - lo <= 1 (or count is 0).
+    """
+    ends = [i for i in (0, size - 1) if i not in values]
+    if len(ends) > 0:
+        return ends[:count], None
+
+    level = values[size - 1]
+    def flat(i):
+        v = values[i]
+        if v is None or level is None:
+            return False
+        return abs(v - level) <= tolerance * abs(level) if level != 0 else v == 0
+
+    hi = min(i for i in values if flat(i) or i == size - 1)
+    below = [i for i in values if i < hi and not flat(i)]
+    lo = max(below) if len(below) > 0 else None
+    if lo is None or hi - lo <= 1 or count <= 0:
+        return [], (lo, hi)
+    return [(lo + hi) // 2], (lo, hi)
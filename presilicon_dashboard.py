@@ -9,6 +9,9 @@ import matplotlib.pyplot as plt
 import html
 import json
 from main import *
+from trial_store import getTrials
+from archai_runner import sendCommand, readStatus, runnerAlive
+from experiment_journal import atomicWriteJson
 from pathlib import Path
 from streamlit_autorefresh import st_autorefresh
 import random
@@ -190,8 +193,17 @@ PARAMS = [
 ]
 
 def storeParams():
-    with open(PARAM_FILE, "w") as f:
-        json.dump(params, f, indent=2)
+    atomicWriteJson(PARAM_FILE, params)
+
+def setStatus(name, value):
+    # main's params were loaded once when this process imported it and must
+    # never be written back. A live runner owns params.json and applies the
+    # setting itself; otherwise nothing else writes the file
+    params["runtime"]["status"][name] = value
+    if runnerAlive():
+        sendCommand("set", json.dumps({name: value}))
+    else:
+        storeParams()
 
 # --------------------------------------------------
 # Session state initialization
@@ -313,8 +325,7 @@ if st.session_state.current_phase == "Pre-Experiment":
                     }
                     printS(st.session_state.param_ranges[param])
                     
-                    intParams = ["l1i_assoc", "l1d_assoc", "l2_assoc", "num_cores"]
-                    if(param in intParams):
+                    if(isinstance(params["vars"][param], int)):
                         if(min_val != ""):
                             min_val = int(min_val)
                         if(max_val != ""):
@@ -324,8 +335,18 @@ if st.session_state.current_phase == "Pre-Experiment":
                         params["min"][param] = min_val
                     if(max_val != ""):
                         params["max"][param] = max_val
-                    with open(PARAM_FILE, "w") as f:
-                        json.dump(params, f, indent=2)
+                    storeParams()
+
+    st.info(
+        "Profile the working set to capture the stressor's memory trace once and compute its miss-ratio curves. The ranges of the selected cache sizes are narrowed to where the miss ratio actually changes, and Gemini sees the working-set knees when planning."
+    )
+    if st.button("Profile Working Set"):
+        # The runner reloads params.json, captures the trace and writes the
+        # new ranges back; they show up here once it is done
+        sendCommand("profile")
+        st.success("Profiling requested" + ("" if runnerAlive() else "; start archai_runner.py to run it"))
+    if params["runtime"].get("working_set"):
+        st.code(profileSummary(params["runtime"]["working_set"]))
 
     st.divider()
 
@@ -338,7 +359,7 @@ if st.session_state.current_phase == "Pre-Experiment":
     )
 
     #Outline
-    for msg in st.session_state.outline_messages:
+    def outlineCard(msg):
         safe_msg = html.escape(msg)
         st.markdown(
             f"""<div style="
@@ -354,6 +375,9 @@ if st.session_state.current_phase == "Pre-Experiment":
             unsafe_allow_html=True
         )
 
+    for msg in st.session_state.outline_messages:
+        outlineCard(msg)
+
 
    # ---- Clear input if requested (must happen BEFORE widget) ----
     if st.session_state.pop("__clear_outline_input__", False):
@@ -368,7 +392,13 @@ if st.session_state.current_phase == "Pre-Experiment":
 
     if st.button("Generate / Modify"):
         msg = st.session_state.user_outline_input.strip() or "Generate"
-        outline = generateOutline(msg)
+        # Show phases as Gemini streams them in
+        live_outline = st.empty()
+        def showPhases(rows):
+            with live_outline.container():
+                for card in outlineCards(rows):
+                    outlineCard(card)
+        outline = generateOutline(msg, on_phase=showPhases)
         st.session_state.outline_messages = outline
         st.session_state["__clear_outline_input__"] = True
         st.rerun()
@@ -388,15 +418,59 @@ if st.session_state.current_phase == "Pre-Experiment":
     with col1:
         if st.button("Enable"):
             st.success("Enabled")
-            setDynamicUpdates(1)
+            setStatus("dynamic_result_interpretation", 1)
     with col2:
         if st.button("Disable"):
             st.success("Disabled")
-            setDynamicUpdates(0)
+            setStatus("dynamic_result_interpretation", 0)
+
+    st.divider()
+
+    st.write(
+        "### Trial Search Strategy"
+    )
+    st.info(
+        "Linear runs every trial of a phase as a full TIMING simulation. Successive halving screens every trial on the fast ATOMIC CPU first and only promotes the best third to full TIMING runs, which cuts simulation time on wide sweeps. Bayesian optimization picks every next trial from all results so far, optionally keeping each phase to the parameters and ranges of its outline. Bisection finds where a single-parameter phase stops improving in a logarithmic number of trials."
+    )
+
+    search_labels = {"lerp": "Linear (every trial at full fidelity)", "halving": "Successive halving", "bayes": "Bayesian optimization", "bisect": "Bisection (find the knee)", "trace": "Trace-driven cache simulation (gem5 confirms the best)"}
+    current_mode = params["runtime"]["status"].get("search_mode", "lerp")
+    chosen_mode = st.selectbox(
+        "Search strategy",
+        SEARCH_MODES,
+        index=SEARCH_MODES.index(current_mode),
+        format_func=lambda mode: search_labels[mode]
+    )
+    if chosen_mode != current_mode:
+        setStatus("search_mode", chosen_mode)
+        st.success("Search strategy set to " + search_labels[chosen_mode])
+
+    early_stop = st.checkbox(
+        "End linear phases early once the sim time plateaus",
+        value=params["runtime"]["status"].get("early_stop", 0) == 1
+    )
+    if early_stop != (params["runtime"]["status"].get("early_stop", 0) == 1):
+        setStatus("early_stop", 1 if early_stop else 0)
+
+    skip_trials = st.checkbox(
+        "Skip trials the surrogate model can predict confidently (linear phases)",
+        value=params["runtime"]["status"].get("surrogate_skipping", 0) == 1
+    )
+    if skip_trials != (params["runtime"]["status"].get("surrogate_skipping", 0) == 1):
+        setStatus("surrogate_skipping", 1 if skip_trials else 0)
+
+    if chosen_mode == "bayes":
+        use_prior = st.checkbox(
+            "Use the outline phases as a prior",
+            value=params["runtime"]["status"].get("bayes_outline_prior", 1) == 1
+        )
+        if use_prior != (params["runtime"]["status"].get("bayes_outline_prior", 1) == 1):
+            setStatus("bayes_outline_prior", 1 if use_prior else 0)
 
     st.divider()
 
     if st.button("Submit Experiment Configuration"):
+        sendCommand("start")
         st.success("Experiment started")
         st.session_state.experiment_started = True
         st.session_state.current_phase = "Testing"
@@ -423,12 +497,29 @@ if st.session_state.current_phase == "Testing":
     # )
     # st.session_state.ipc_data["IPC"].append(ipc_value)
 
-    runExperiment()
+    # Trials are run by archai_runner.py; this tab only shows its progress
+    # runExperiment()
     # runTrial()
     # print(extractTrialStats())
 
     st.title("Stress Testing")
 
+    runner_status = readStatus()
+    if not runnerAlive():
+        st.warning("The experiment runner is not running. Start it in the container with: python archai_runner.py")
+    else:
+        st.info("Runner " + runner_status.get("state", "unknown") + ": " + runner_status.get("message", ""))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Pause"):
+            sendCommand("pause")
+            st.success("Pause requested")
+    with col2:
+        if st.button("Resume"):
+            sendCommand("start")
+            st.success("Resume requested")
+
     # ---------------- Graph Input ----------------
     # st.subheader("Manual IPC Input")
 
@@ -485,42 +576,83 @@ if st.session_state.current_phase == "Testing":
     sim_times = []
     mem_use = []
     params_list = []
+    fidelities = []
+    sim_errors = []
+    mem_errors = []
+    stall_cycles = []
 
     col1, col2 = st.columns(2)
 
-    for trial in params["runtime"]["raw_trials"]:
-        if trial != "trial_template":
-            _, p2, t2 = trial.split("_")
-            p2 = int(p2)
-            t2 = int(t2)
-
-            if ((t==0) and (p2 == p-1)) or ((t>0) and (p2 == p)):
-                sim_times.append(
-                    params["runtime"]["raw_trials"][trial]["results"][1]
-                )
-                mem_use.append(
-                    params["runtime"]["raw_trials"][trial]["results"][3]
-                )
-                params_list.append(
-                    params["runtime"]["raw_trials"][trial]["param_values"][1]
-                )
-                xAxisName = params["runtime"]["raw_trials"][trial]["param_values"][0]
+    # Show the running phase, or the previous one until the first trial lands
+    trials = getTrials(phase=(p-1 if t == 0 else p))
+    for trial in trials:
+        sim_times.append(
+            trials[trial]["results"][1]
+        )
+        mem_use.append(
+            trials[trial]["results"][3]
+        )
+        params_list.append(
+            trials[trial]["param_values"][1]
+        )
+        fidelities.append(
+            trials[trial].get("fidelity", "full")
+        )
+        # Relative ~95% interval of surrogate predictions (0 when simulated)
+        uncertainty = trials[trial].get("uncertainty", {})
+        sim_errors.append(uncertainty.get("simSeconds", 0.0))
+        mem_errors.append(uncertainty.get("hostMemory", 0.0))
+        # Trace-evaluated trials have no sim time, only estimated stalls
+        stall_cycles.append(trials[trial]["stats"].get("stallCycles"))
+        xAxisName = trials[trial]["param_values"][0]
 
     if len(sim_times) > 0:
         df = pd.DataFrame({
             "Sim Time": sim_times,
             "Memory Use": mem_use,
-            "param": params_list
+            "param": params_list,
+            "fidelity": fidelities,
+            "Sim Time err": sim_errors,
+            "Memory Use err": mem_errors,
+            "Stall Cycles": stall_cycles
         })
     else:
         df["Sim Time"] = g1yc
         df["Memory Use"] = g2yc
         df["param"] = g1xc
+        df["fidelity"] = "full"
+        df["Sim Time err"] = 0.0
+        df["Memory Use err"] = 0.0
+        df["Stall Cycles"] = None
         xAxisName = "Trial No."
 
+    def plotTrials(ax, column):
+        # Simulated trials form the line. Trials that were only screened
+        # (successive halving, ATOMIC CPU) are hollow circles, and surrogate
+        # predictions that never ran in gem5 are diamonds with error bars.
+        # Trials evaluated on the memory trace only have estimated stall
+        # cycles, drawn as crosses on a second axis of the runtime chart.
+        full = df["fidelity"] == "full"
+        screened = df["fidelity"] == "atomic"
+        predicted = df["fidelity"] == "predicted"
+        ax.plot(df["param"][full], df[column][full], marker="o")
+        if screened.any():
+            ax.scatter(df["param"][screened], df[column][screened], facecolors="none", edgecolors="#9ca3af", label="screened (ATOMIC)")
+        if predicted.any():
+            yerr = df[column][predicted] * df[column + " err"][predicted]
+            ax.errorbar(df["param"][predicted], df[column][predicted], yerr=yerr, fmt="D", color="#f59e0b", label="predicted (not simulated)")
+        if screened.any() or predicted.any():
+            ax.legend()
+        traced = df["fidelity"] == "trace"
+        if column == "Sim Time" and traced.any():
+            stalls = ax.twinx()
+            stalls.scatter(df["param"][traced], df["Stall Cycles"][traced], marker="x", color="#a78bfa", label="trace estimate")
+            stalls.set_ylabel("Stall Cycles (trace)")
+            stalls.legend(loc="upper right")
+
     with col1:
         fig1, ax1 = plt.subplots(figsize=(5, 3))
-        ax1.plot(df["param"], df["Sim Time"], marker="o")
+        plotTrials(ax1, "Sim Time")
         ax1.set_xlabel(xAxisName)
         ax1.set_ylabel("Sim Time (seconds)")
         ax1.set_title("Simulation Runtime")
@@ -533,7 +665,7 @@ if st.session_state.current_phase == "Testing":
 
     with col2:
         fig1, ax1 = plt.subplots(figsize=(5, 3))
-        ax1.plot(df["param"], df["Memory Use"], marker="o")
+        plotTrials(ax1, "Memory Use")
         ax1.set_xlabel(xAxisName)
         ax1.set_ylabel("Memory (Bytes)")
         ax1.set_title("DDR Memory Usage")
@@ -589,7 +721,8 @@ if st.session_state.current_phase == "Testing":
 
     if st.button("Update"):
         if user_message.strip():
-            generateOutline("*"+user_message+" You are already on phase " + str(params["runtime"]["status"]["current_phase"]) + " so start any updates from phase " + str(params["runtime"]["status"]["current_phase"] + 1))
+            sendCommand("modify", "*"+user_message+" You are already on phase " + str(params["runtime"]["status"]["current_phase"]) + " so start any updates from phase " + str(params["runtime"]["status"]["current_phase"] + 1))
+            st.info("Update sent to the runner")
             
 
     if(len(params["outline"]["modif_summary"]) > 0):
@@ -0,0 +1,193 @@
+# -------------------------------------------------------------------
+# SAMPLED SIMULATION (SIMPOINT-STYLE)
+# -------------------------------------------------------------------
+# A profiling run (ATOMIC CPU with gem5's SimPoint probe) writes one basic
+# block vector (BBV) per fixed-length instruction interval. The vectors are
+# clustered once per binary; one representative interval per cluster is then
+# simulated in detail, and whole-program sim time is extrapolated from the
+# weighted samples together with an error estimate.
+
+import gzip
+import json
+import math
+import re
+
+import numpy as np
+
+# Dimensions BBVs are randomly projected to before clustering (as SimPoint does)
+PROJECTED_DIMS = 15
+
+# Largest number of clusters (= detailed intervals) tried per binary
+MAX_CLUSTERS = 10
+
+# Pick the smallest k whose BIC reaches this fraction of the best k's
+BIC_THRESHOLD = 0.9
+
+BBV_ENTRY = re.compile(r":(\d+):(\d+)")
+
+
+def readBBVs(bbv_path):
+    """
+    Parses gem5's simpoint.bb.gz: one line per interval, "T:bb:count ..."
+    Returns a (num_intervals, num_blocks) array of row-normalized counts.
+    """
+    rows = []
+    num_blocks = 0
+    opener = gzip.open if str(bbv_path).endswith(".gz") else open
+    with opener(bbv_path, "rt") as f:
+        for line in f:
+            if not line.startswith("T"):
+                continue
+            counts = {int(bb): int(n) for bb, n in BBV_ENTRY.findall(line)}
+            if len(counts) == 0:
+                continue
+            num_blocks = max(num_blocks, max(counts) + 1)
+            rows.append(counts)
+
+    bbvs = np.zeros((len(rows), num_blocks))
+    for i, counts in enumerate(rows):
+        for bb, n in counts.items():
+            bbvs[i, bb] = n
+    totals = bbvs.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1
+    return bbvs / totals
+
+def kMeans(points, k, rng, iterations=100):
+    # k-means++ seeding followed by Lloyd iterations
+    centers = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        d2 = np.min(((points[:, None, :] - np.array(centers)[None, :, :]) ** 2).sum(axis=2), axis=1)
+        if d2.sum() == 0:
+            centers.append(points[rng.integers(len(points))])
+        else:
+            centers.append(points[rng.choice(len(points), p=d2 / d2.sum())])
+    centers = np.array(centers)
+
+    for _ in range(iterations):
+        dist = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels = dist.argmin(axis=1)
+        moved = np.array([
+            points[labels == c].mean(axis=0) if np.any(labels == c) else centers[c]
+            for c in range(k)
+        ])
+        if np.allclose(moved, centers):
+            break
+        centers = moved
+
+    dist = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    return centers, dist.argmin(axis=1), dist
+
+def bicScore(points, labels, centers):
+    # BIC of a spherical-Gaussian mixture, as used by X-means / SimPoint
+    R, M = points.shape
+    K = len(centers)
+    sse = sum(((points[labels == c] - centers[c]) ** 2).sum() for c in range(K))
+    if R <= K or sse == 0:
+        return math.inf
+    variance = sse / (M * (R - K))
+    loglik = -R * M / 2 * math.log(2 * math.pi * variance) - sse / (2 * variance)
+    for c in range(K):
+        Rn = np.sum(labels == c)
+        if Rn > 0:
+            loglik += Rn * math.log(Rn / R)
+    free_params = (K - 1) + M * K + 1
+    return loglik - free_params / 2 * math.log(R)
+
+def pickSimpoints(bbvs, max_clusters=MAX_CLUSTERS, seed=0):
+    """
+    Clusters interval BBVs and returns [(interval index, weight), ...] with
+    one representative interval (closest to its centroid) per cluster.
+    """
+    rng = np.random.default_rng(seed)
+    projection = rng.uniform(-1, 1, size=(bbvs.shape[1], PROJECTED_DIMS))
+    points = bbvs @ projection
+
+    runs = []
+    for k in range(1, min(max_clusters, len(points)) + 1):
+        centers, labels, dist = kMeans(points, k, rng)
+        runs.append((bicScore(points, labels, centers), k, labels, dist))
+
+    scores = [r[0] for r in runs if math.isfinite(r[0])]
+    if len(scores) == 0:
+        chosen = runs[0]
+    else:
+        low, high = min(scores), max(scores)
+        cutoff = low + BIC_THRESHOLD * (high - low)
+        chosen = next(r for r in runs if not math.isfinite(r[0]) or r[0] >= cutoff)
+
+    _, k, labels, dist = chosen
+    simpoints = []
+    for c in range(k):
+        members = np.flatnonzero(labels == c)
+        if len(members) == 0:
+            continue
+        representative = members[np.argmin(dist[members, c])]
+        simpoints.append((int(representative), len(members) / len(points)))
+    return sorted(simpoints)
+
+def buildPlan(bbv_path, interval_length, warmup_length, total_insts):
+    """Sampling plan stored per binary and passed to uarch_spec.py."""
+    bbvs = readBBVs(bbv_path)
+    # Programs shorter than one interval have nothing to sample
+    points = pickSimpoints(bbvs) if len(bbvs) > 0 else []
+    return {
+        "interval_length": interval_length,
+        "warmup_length": warmup_length,
+        "num_intervals": len(bbvs),
+        "total_insts": total_insts,
+        "points": [{"interval": i, "weight": w} for i, w in points],
+    }
+
+def savePlan(plan, path):
+    with open(path, "w") as f:
+        json.dump(plan, f, indent=2)
+
+def loadPlan(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def extrapolate(blocks, plan):
+    """
+    Turns the per-interval stat dumps of a sampled run into whole-program
+    trial stats. blocks[i] is the dump of plan["points"][i] (any trailing
+    end-of-simulation dump is ignored).
+
+    simSeconds is total_insts x the weighted seconds-per-instruction of the
+    samples; simSecondsError is the standard error of that estimate from the
+    weighted spread of the samples. Rate stats (IPC, miss rates, bandwidth)
+    are weighted averages.
+    """
+    points = plan["points"]
+    samples = blocks[:len(points)]
+    if len(samples) < len(points) or len(points) == 0:
+        return {}
+
+    weights = np.array([p["weight"] for p in points])
+    weights = weights / weights.sum()
+    secs_per_inst = np.array([
+        (b.get("simSeconds") or 0.0) / plan["interval_length"] for b in samples
+    ])
+
+    mean = float(np.dot(weights, secs_per_inst))
+    variance = float(np.dot(weights, (secs_per_inst - mean) ** 2))
+    stderr = math.sqrt(variance / len(points))
+
+    stats = {}
+    for name in set().union(*samples):
+        values = [b.get(name) for b in samples]
+        if all(isinstance(v, (int, float)) for v in values):
+            stats[name] = float(np.dot(weights, values))
+
+    stats["simSeconds"] = mean * plan["total_insts"]
+    stats["simSecondsError"] = stderr * plan["total_insts"]
+    stats["simInsts"] = plan["total_insts"]
+    stats["sampledIntervals"] = len(points)
+    stats["sampledFraction"] = len(points) / max(plan["num_intervals"], 1)
+    # Host stats describe the (short) sampled run itself, keep the last sample's
+    for name in ("hostMemory", "hostInstRate"):
+        if name in samples[-1]:
+            stats[name] = samples[-1][name]
+    return stats
@@ -0,0 +1,103 @@
+# -------------------------------------------------------------------
+# TRIAL SEARCH STRATEGIES
+# -------------------------------------------------------------------
+# How the trials of a phase are simulated. "lerp" runs every trial point of
+# the outline at full fidelity. "halving" screens all of them on a cheap
+# fidelity first and promotes only the best fraction up the fidelity
+# ladder (successive halving, one Hyperband bracket per phase). "bayes"
+# lets bayes_opt.py propose each batch of trials from all results so far.
+# "bisect" brackets the knee of a single-parameter phase by probing the
+# domain endpoints and then the middle of the bracket (plateau.py).
+# "trace" evaluates every trial point of a cache-only phase on a captured
+# memory trace (cache_sim.py) and confirms only the best fraction in gem5.
+
+import math
+import os
+
+from cache_sim import L2_HIT_CYCLES, MEMORY_CYCLES
+
+SEARCH_MODES = ("lerp", "halving", "bayes", "bisect", "trace")
+DEFAULT_SEARCH_MODE = "lerp"
+
+# Fidelity ladder, cheapest first. Each rung is a name and the "sim"
+# options passed to uarch_spec.py; the last rung is the full TIMING run.
+FIDELITIES = [
+    ("atomic", {"cpu_type": "ATOMIC"}),
+    ("full", {}),
+]
+
+# Keep the best 1/HALVING_ETA of the trials at every promotion
+HALVING_ETA = int(os.environ.get("ARCHAI_HALVING_ETA", 3))
+
+# Stat that ranks trials (lower is better)
+RANK_STAT = "simSeconds"
+
+# Weighted multi-kernel score added to a trial's stats when the workload
+# sets kernel weights; it ranks trials instead of RANK_STAT
+SCORE_STAT = "kernelScore"
+
+
+def searchMode(params):
+    return params["runtime"]["status"].get("search_mode", DEFAULT_SEARCH_MODE)
+
+def fidelityOptions(name):
+    return dict(FIDELITIES)[name]
+
+def trialScore(stats):
+    # Failed runs have no stats and are never promoted
+    value = stats.get(SCORE_STAT, stats.get(RANK_STAT))
+    return math.inf if value is None else value
+
+def missScore(stats):
+    """
+    Memory stall cycles estimated from the cache miss counters, the way
+    cache_sim.py ranks trace-evaluated trials. ATOMIC runs model no cache
+    or memory latency, so their sim time ties across cache sizes while
+    their miss counts still tell the sizes apart. Falls back to trialScore()
+    for hierarchies without classic miss counters.
+    """
+    l1_misses = sum(v for k, v in stats.items() if "l1" in k and k.endswith(".overallMisses::total"))
+    l2_misses = sum(v for k, v in stats.items() if "l2" in k and k.endswith(".overallMisses::total"))
+    if not any(k.endswith(".overallMisses::total") for k in stats):
+        return trialScore(stats)
+    return l1_misses * L2_HIT_CYCLES + l2_misses * MEMORY_CYCLES
+
+# How each rung below the top ranks its trials for promotion
+RUNG_SCORES = {"atomic": missScore}
+
+def rungScore(name, stats):
+    return RUNG_SCORES.get(name, trialScore)(stats)
+
+def promote(scores, eta=HALVING_ETA):
+    """
+    Indices of the best ceil(n / eta) scores (at least one), best first.
+    Failed trials (infinite score) are only promoted if nothing else ran.
+    """
+    if len(scores) == 0:
+        return []
+    keep = max(1, math.ceil(len(scores) / eta))
+    ranked = sorted(range(len(scores)), key=lambda i: scores[i])
+    finite = [i for i in ranked if math.isfinite(scores[i])]
+    return (finite or ranked)[:keep]
+
+def traceScore(stats):
+    # Estimated memory stall cycles of a trace-evaluated trial
+    value = stats.get("stallCycles")
+    return math.inf if value is None else value
+
+def successiveHalving(jobs, run_rung, eta=HALVING_ETA):
+    """
+    Runs (trial_key, trial_vars) jobs up the fidelity ladder.
+
+    run_rung(fidelity_name, jobs) simulates the jobs at that fidelity and
+    returns their stats in job order. Returns the promotions made per rung.
+    """
+    promotions = []
+    survivors = list(jobs)
+    for rung, (name, _) in enumerate(FIDELITIES):
+        stats = run_rung(name, survivors)
+        if rung == len(FIDELITIES) - 1:
+            break
+        survivors = [survivors[i] for i in promote([rungScore(name, s) for s in stats], eta)]
+        promotions.append({"from": name, "to": FIDELITIES[rung + 1][0], "trials": [job[0] for job in survivors]})
+    return promotions
@@ -0,0 +1,140 @@
+# -------------------------------------------------------------------
+# CONTENT-ADDRESSED SIMULATION RESULT CACHE
+# -------------------------------------------------------------------
+# Stores gem5 trial measurements (final and per-kernel stats) on disk
+# keyed by a hash of the simulated "vars", the workload binary and the
+# gem5 config script. Identical configurations
+# (from lerp rounding, repeated phases or reloaded experiments) are served
+# from disk instead of being re-simulated.
+#
+# Usage:
+#   python sim_cache.py stats    # entry count and size
+#   python sim_cache.py clear    # invalidate every cached result
+#   python sim_cache.py prune    # evict down to the size limit
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+ARCHAI_DIR = Path(__file__).parent
+CACHE_DIR = Path(os.environ.get("ARCHAI_CACHE_DIR", ARCHAI_DIR / "sim_cache"))
+
+# Least recently used entries are evicted once the cache grows past this
+CACHE_MAX_BYTES = int(os.environ.get("ARCHAI_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Bumped whenever the shape of the cached stats changes
+CACHE_FORMAT = 3
+
+# Files whose contents change what a simulation produces
+BINARY_FILE = ARCHAI_DIR / "microbench.arm"
+SPEC_FILE = ARCHAI_DIR / "uarch_spec.py"
+
+
+def fileDigest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cacheKey(trial_vars, binary_digest, spec_digest, sim_options=None):
+    """
+    Hash of the sorted (name, value) tuple of trial_vars together with the
+    digests of the workload binary and the gem5 config script. Simulation
+    settings that change what gets measured (sim_options) are hashed too.
+    """
+    vars_tuple = sorted((k, str(v)) for k, v in trial_vars.items())
+    h = hashlib.sha256()
+    h.update(str(CACHE_FORMAT).encode("utf-8"))
+    h.update(json.dumps(vars_tuple).encode("utf-8"))
+    h.update(json.dumps(sim_options or {}, sort_keys=True).encode("utf-8"))
+    h.update(binary_digest.encode("utf-8"))
+    h.update(spec_digest.encode("utf-8"))
+    return h.hexdigest()
+
+def currentDigests():
+    # (binary digest, config script digest) for the files on disk right now
+    return fileDigest(BINARY_FILE), fileDigest(SPEC_FILE)
+
+def entryPath(key):
+    return CACHE_DIR / key[:2] / (key + ".json")
+
+def lookup(key):
+    """
+    Returns the cached measurement for key ({"stats": ..., "kernels": ...}),
+    or None on a miss.
+    """
+    path = entryPath(key)
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Touch so eviction sees this entry as recently used
+    os.utime(path, None)
+    return entry["measurement"]
+
+def store(key, trial_vars, measurement):
+    path = entryPath(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"vars": trial_vars, "measurement": measurement}, f)
+    os.replace(tmp_path, path)
+    evict()
+
+def cacheEntries():
+    if not CACHE_DIR.exists():
+        return []
+    return [p for p in CACHE_DIR.glob("*/*.json") if p.is_file()]
+
+def evict(max_bytes=CACHE_MAX_BYTES):
+    """Deletes least recently used entries until the cache fits max_bytes."""
+    entries = []
+    total = 0
+    for p in cacheEntries():
+        st = p.stat()
+        entries.append((st.st_mtime, st.st_size, p))
+        total += st.st_size
+
+    entries.sort()
+    removed = 0
+    for _, size, p in entries:
+        if total <= max_bytes:
+            break
+        p.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
+
+def clear():
+    """Invalidates every cached result. Returns the number of entries removed."""
+    removed = 0
+    for p in cacheEntries():
+        p.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+def cacheStats():
+    entries = cacheEntries()
+    return {
+        "entries": len(entries),
+        "bytes": sum(p.stat().st_size for p in entries),
+        "max_bytes": CACHE_MAX_BYTES,
+        "dir": str(CACHE_DIR),
+    }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "clear":
+        print("Removed " + str(clear()) + " cached results")
+    elif command == "prune":
+        print("Evicted " + str(evict()) + " cached results")
+    elif command == "stats":
+        print(json.dumps(cacheStats(), indent=2))
+    else:
+        print("Usage: python sim_cache.py [stats|clear|prune]")
+        sys.exit(1)
@@ -0,0 +1,88 @@
+# -------------------------------------------------------------------
+# SURROGATE TRIAL SKIPPING
+# -------------------------------------------------------------------
+# Before a phase's trials are launched, a Gaussian process per summary stat
+# (trained on every full-fidelity trial so far) predicts each pending
+# configuration. Trials whose predictions are all tight enough are not
+# simulated; their predicted stats are recorded with fidelity "predicted".
+# Every VERIFY_EVERY-th confident trial is simulated anyway and compared to
+# its prediction; if any of those checks misses, nothing is skipped.
+
+import math
+import os
+
+import numpy as np
+
+from bayes_opt import encodeVars, fitGP, predict
+
+# Stats predicted for skipped trials (modelled in log space, all positive)
+SURROGATE_STATS = ["simSeconds", "hostMemory", "hostInstRate"]
+
+# A trial is skipped when the ~95% interval of every stat is within this
+# relative error of the prediction
+TOLERANCE = float(os.environ.get("ARCHAI_SURROGATE_TOLERANCE", 0.05))
+
+# Simulate one in this many confident trials to check the surrogate
+VERIFY_EVERY = int(os.environ.get("ARCHAI_SURROGATE_VERIFY_EVERY", 4))
+
+# Trials needed before any prediction is trusted
+MIN_HISTORY = 5
+
+
+def buildSurrogate(history, bounds):
+    """
+    history: [(trial_vars, stats), ...]; bounds: {name: (min, max)}.
+    Returns {stat: GP model}, or None with too little history.
+    """
+    rows = [
+        (encodeVars(v, bounds), [math.log(stats[name]) for name in SURROGATE_STATS])
+        for v, stats in history
+        if all(isinstance(stats.get(name), (int, float)) and stats[name] > 0 for name in SURROGATE_STATS)
+    ]
+    if len(rows) < MIN_HISTORY:
+        return None
+    X = np.array([r[0] for r in rows])
+    Y = np.array([r[1] for r in rows])
+    return {name: fitGP(X, Y[:, i]) for i, name in enumerate(SURROGATE_STATS)}
+
+def predictStats(surrogate, trial_vars, bounds):
+    """Predicted {stat: value} and {stat: relative ~95% half-width}."""
+    x = np.array([encodeVars(trial_vars, bounds)])
+    stats = {}
+    uncertainty = {}
+    for name, model in surrogate.items():
+        mu, sigma = predict(model, x)
+        stats[name] = float(math.exp(mu[0]))
+        uncertainty[name] = float(math.exp(2 * sigma[0]) - 1)
+    return stats, uncertainty
+
+def planSkips(history, bounds, pending_vars):
+    """
+    Decides per pending configuration: "predict" (skip gem5), "verify"
+    (simulate and compare) or "simulate". Returns one
+    {"action", "stats", "uncertainty"} dict per configuration.
+    """
+    surrogate = buildSurrogate(history, bounds)
+    plan = []
+    confident = 0
+    for trial_vars in pending_vars:
+        if surrogate is None:
+            plan.append({"action": "simulate", "stats": {}, "uncertainty": {}})
+            continue
+        stats, uncertainty = predictStats(surrogate, trial_vars, bounds)
+        action = "simulate"
+        if max(uncertainty.values()) <= TOLERANCE:
+            action = "verify" if confident % VERIFY_EVERY == 0 else "predict"
+            confident += 1
+        plan.append({"action": action, "stats": stats, "uncertainty": uncertainty})
+    return plan
+
+def predictionError(predicted, stats):
+    # Largest relative miss over the predicted stats (inf if gem5 failed)
+    errors = []
+    for name, value in predicted.items():
+        actual = stats.get(name)
+        if not isinstance(actual, (int, float)) or actual == 0:
+            return math.inf
+        errors.append(abs(value - actual) / abs(actual))
+    return max(errors, default=0.0)
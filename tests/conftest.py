@@ -0,0 +1,5 @@
+# The modules under test live at the top level of the repository
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,36 @@
+from bayes_opt import encode, encodeVars, paramDomain, propose, varsKey
+
+
+def test_domains():
+    assert paramDomain("16kB", "128kB") == ["16kB", "32kB", "64kB", "128kB"]
+    assert paramDomain(1, 3) == [1, 2, 3]
+    assert paramDomain("TIMING", "O3") == ["TIMING", "MINOR", "O3"]
+
+def test_channels_step_by_powers_of_two():
+    assert paramDomain(1, 4, "mem_channels") == [1, 2, 4]
+    assert paramDomain(1, 3, "mem_channels") == [1, 2]
+
+def test_encoding():
+    assert encode("32kB", "16kB", "64kB") == 0.5
+    assert encode(2, 1, 4, "mem_channels") == 0.5
+    assert encode("MINOR", "ATOMIC", "O3") == 2 / 3
+    assert encodeVars({"l1d_size": "16kB", "num_cores": 3}, {"l1d_size": ("16kB", "64kB"), "num_cores": (1, 3)}) == [0.0, 1.0]
+
+def test_proposals_are_new_and_in_range():
+    base = {"l1d_size": "16kB", "num_cores": 1}
+    space = {"l1d_size": ("16kB", "128kB"), "num_cores": (1, 2)}
+    history = [
+        ({"l1d_size": "16kB", "num_cores": 1}, 3.0),
+        ({"l1d_size": "128kB", "num_cores": 2}, 1.0),
+    ]
+    picks = propose(base, space, space, history, 4, seed=1)
+    assert len(picks) == 4
+    seen = {varsKey(v) for v, _ in history}
+    assert all(varsKey(v) not in seen for v in picks)
+    assert len({varsKey(v) for v in picks}) == 4
+    assert all(v["l1d_size"] in paramDomain("16kB", "128kB") and v["num_cores"] in (1, 2) for v in picks)
+
+def test_exhausted_space():
+    space = {"num_cores": (1, 2)}
+    history = [({"num_cores": 1}, 2.0), ({"num_cores": 2}, 1.0)]
+    assert propose({"num_cores": 1}, space, space, history, 2) == []
@@ -0,0 +1,68 @@
+import collections
+
+import numpy as np
+
+from cache_sim import KIND_IFETCH, KIND_READ, KIND_WRITE, evaluate, lruPositions, missMasks, parseTrace
+
+
+def naiveMisses(lines, num_sets, ways):
+    # Reference set-associative LRU cache
+    sets = collections.defaultdict(collections.OrderedDict)
+    misses = []
+    for line in lines.tolist():
+        lru = sets[line % num_sets]
+        if line in lru:
+            lru.move_to_end(line)
+            misses.append(False)
+        else:
+            misses.append(True)
+            lru[line] = True
+            if len(lru) > ways:
+                lru.popitem(last=False)
+    return np.array(misses)
+
+def randomLines(n, span, seed=0):
+    rng = np.random.default_rng(seed)
+    # Mix of a hot set, repeats and a wide random tail
+    lines = np.concatenate([rng.integers(0, 40, n // 2), rng.integers(0, span, n // 2)])
+    rng.shuffle(lines)
+    return np.repeat(lines, rng.integers(1, 3, len(lines))).astype(np.uint64)
+
+
+def test_lru_positions_match_reference():
+    lines = randomLines(4000, 2000)
+    for num_sets in (1, 4, 16):
+        positions = lruPositions(lines, num_sets, 8)
+        for ways in (1, 2, 4, 8):
+            assert np.array_equal(positions >= ways, naiveMisses(lines, num_sets, ways))
+
+def test_miss_masks_per_geometry():
+    lines = randomLines(2000, 500, seed=1)
+    masks = missMasks(lines, [("4kB", 2), ("4kB", 4), ("8kB", 4)])
+    for (size, assoc), mask in masks.items():
+        num_sets = int(size[:-2]) * 1024 // (assoc * 64)
+        assert np.array_equal(mask, naiveMisses(lines, num_sets, assoc))
+
+def test_parse_trace(tmp_path):
+    path = tmp_path / "memtrace.out"
+    path.write_text(
+        "100: board.memory: IFetch from board.processor.cores0.core.inst of size 4 on address 0x1000 data\n"
+        "200: board.memory: Read from board.processor.cores1.core.data of size 8 on address 0x2040 data\n"
+        "300: unrelated line\n"
+        "400: board.memory: Write from board.processor.cores1.core.data of size 8 on address 0x2048 data\n"
+    )
+    trace = parseTrace(path)
+    assert trace["lines"].tolist() == [0x1000 // 64, 0x2040 // 64, 0x2048 // 64]
+    assert trace["kind"].tolist() == [KIND_IFETCH, KIND_READ, KIND_WRITE]
+    assert trace["core"].tolist() == [0, 1, 1]
+    assert len(parseTrace(path, max_accesses=2)["lines"]) == 2
+
+def test_bigger_caches_never_miss_more():
+    lines = randomLines(6000, 3000, seed=2)
+    kind = np.where(np.arange(len(lines)) % 4 == 0, KIND_IFETCH, KIND_READ).astype(np.uint8)
+    trace = {"lines": lines, "kind": kind, "core": np.zeros(len(lines), dtype=np.uint8)}
+    config = {"l1i_size": "1kB", "l1i_assoc": 2, "l1d_size": "1kB", "l1d_assoc": 2, "l2_size": "16kB", "l2_assoc": 8}
+    small, big = evaluate(trace, [config, dict(config, l1d_size="8kB", l2_size="64kB")])
+    assert small["l1i.accesses"] + small["l1d.accesses"] == len(lines)
+    assert big["l1d.misses"] <= small["l1d.misses"]
+    assert big["stallCycles"] <= small["stallCycles"]
@@ -0,0 +1,51 @@
+import json
+
+import experiment_journal
+from experiment_journal import appendEvent, compact, readJournal, replay
+
+
+def freshParams():
+    return {
+        "outline": "old",
+        "runtime": {
+            "status": {"current_phase": 1, "current_trial": 0},
+            "phase_history": {},
+        },
+    }
+
+def test_replay_applies_transitions_after_the_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(experiment_journal, "JOURNAL_FILE", tmp_path / "experiment.journal")
+    params = freshParams()
+    appendEvent(params, "phase_started", phase=1, info={"name": "L1 sweep"})
+    appendEvent(params, "trial_started", key="trial_1_0", vars={"l1d_size": "16kB"})
+    appendEvent(params, "trial_finished", key="trial_1_0")
+    appendEvent(params, "trial_started", key="trial_1_1", vars={"l1d_size": "32kB"})
+    appendEvent(params, "outline_modified", outline="new")
+
+    restored = freshParams()
+    assert replay(restored) == ["trial_1_1"]
+    assert restored["outline"] == "new"
+    assert restored["runtime"]["phase_history"]["phase_1"] == {"name": "L1 sweep"}
+    assert restored["journal_seq"] == 5
+
+def test_compaction_drops_covered_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(experiment_journal, "JOURNAL_FILE", tmp_path / "experiment.journal")
+    param_file = tmp_path / "params.json"
+    params = freshParams()
+    appendEvent(params, "phase_started", phase=1, info={})
+    compact(params, param_file)
+    assert readJournal() == []
+
+    appendEvent(params, "phase_finished", phase=1)
+    with open(param_file) as f:
+        snapshot = json.load(f)
+    assert replay(snapshot) == []
+    assert snapshot["runtime"]["status"]["current_phase"] == 2
+
+def test_torn_last_line_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(experiment_journal, "JOURNAL_FILE", tmp_path / "experiment.journal")
+    params = freshParams()
+    appendEvent(params, "phase_finished", phase=1)
+    with open(experiment_journal.JOURNAL_FILE, "a") as f:
+        f.write('{"seq": 2, "event": "phase_fin')
+    assert [e["seq"] for e in readJournal()] == [1]
@@ -0,0 +1,57 @@
+from gem5_stats import finalStats, kernelScore, parseStatsFile, regionStats
+from search_planner import trialScore, SCORE_STAT
+
+STATS = """
+---------- Begin Simulation Statistics ----------
+simSeconds                                   0.001000                       # Number of seconds simulated
+simInsts                                         1000                       # Number of instructions simulated
+board.cache.overallMisses::total                   10                       # misses
+---------- End Simulation Statistics   ----------
+
+---------- Begin Simulation Statistics ----------
+simSeconds                                   0.003000                       # Number of seconds simulated
+simInsts                                         5000                       # Number of instructions simulated
+board.processor.cores0.core.numCycles            8000                       # cycles
+board.cache.overallMisses::total                   30                       # misses
+board.cache.overallAccesses::total                400                       # accesses
+board.processor.cores0.core.cpi                   nan                       # empty ratio
+---------- End Simulation Statistics   ----------
+"""
+
+
+def statsFile(tmp_path):
+    path = tmp_path / "stats.txt"
+    path.write_text(STATS)
+    return path
+
+
+def test_blocks_in_dump_order(tmp_path):
+    blocks = parseStatsFile(statsFile(tmp_path))
+    assert [b["simInsts"] for b in blocks] == [1000, 5000]
+    assert blocks[1]["board.processor.cores0.core.cpi"] is None
+
+def test_final_stats_allowlist(tmp_path):
+    assert finalStats(statsFile(tmp_path), ["simSeconds", "*.numCycles"]) == {
+        "simSeconds": 0.003,
+        "board.processor.cores0.core.numCycles": 8000,
+    }
+    assert finalStats(tmp_path / "missing.txt") == {}
+
+def test_region_subtracts_counters(tmp_path):
+    begin, end = parseStatsFile(statsFile(tmp_path))
+    region = regionStats(begin, end)
+    assert region["simInsts"] == 4000
+    assert region["board.cache.overallMisses::total"] == 20
+    assert abs(region["simSeconds"] - 0.002) < 1e-12
+
+def test_kernel_score_is_weighted_mean():
+    kernels = {"matmul": {"simSeconds": 2.0}, "stream_copy": {"simSeconds": 4.0}}
+    assert kernelScore(kernels, {"matmul": 3, "stream_copy": 1}) == 2.5
+    # Unmeasured or unweighted kernels are ignored
+    assert kernelScore(kernels, {"matmul": 1, "hash_probe": 5}) == 2.0
+    assert kernelScore(kernels, {"hash_probe": 1}) is None
+
+def test_trial_score_prefers_kernel_score():
+    assert trialScore({"simSeconds": 1.0, SCORE_STAT: 0.5}) == 0.5
+    assert trialScore({"simSeconds": 1.0}) == 1.0
+    assert trialScore({}) == float("inf")
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+import llm_backend
+from llm_backend import LLMReplayMiss, generate, record, requestKey
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_backend, "LLM_CACHE_DIR", tmp_path)
+    return tmp_path
+
+def test_request_key_covers_model_and_contents():
+    key = requestKey("gemini-2.5-flash", "Plan phase 1")
+    assert key == requestKey("gemini-2.5-flash", "Plan phase 1")
+    assert key != requestKey("gemini-2.5-pro", "Plan phase 1")
+    assert key != requestKey("gemini-2.5-flash", "Plan phase 2")
+
+def test_replay_serves_recorded_responses(cache_dir):
+    key = requestKey("gemini-2.5-flash", "Plan phase 1")
+    record(key, "gemini-2.5-flash", "Plan phase 1", "| Phase | Goal |")
+    assert generate("gemini-2.5-flash", "Plan phase 1", mode="replay").text == "| Phase | Goal |"
+    assert generate("gemini-2.5-flash", "Plan phase 1", mode="record").text == "| Phase | Goal |"
+    assert llm_backend.cacheStats()["entries"] == 1
+
+def test_replay_miss_never_calls_gemini(cache_dir):
+    with pytest.raises(LLMReplayMiss):
+        generate("gemini-2.5-flash", "Never recorded", mode="replay")
+    with pytest.raises(ValueError):
+        generate("gemini-2.5-flash", "Never recorded", mode="offline")
+
+def test_token_bucket_allows_a_burst_then_waits(monkeypatch):
+    now = [100.0]
+    slept = []
+    monkeypatch.setattr(llm_backend.time, "monotonic", lambda: now[0])
+    async def fakeSleep(seconds):
+        slept.append(seconds)
+        now[0] += seconds
+    monkeypatch.setattr(llm_backend.asyncio, "sleep", fakeSleep)
+
+    bucket = llm_backend.TokenBucket(rate_per_minute=6, burst=2)
+    async def acquireAll(n):
+        for _ in range(n):
+            await bucket.acquire()
+    asyncio.run(acquireAll(3))
+    # Two tokens up front, the third one refills after 60 / 6 seconds
+    assert slept == [pytest.approx(10.0)]
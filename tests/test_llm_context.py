@@ -0,0 +1,38 @@
+from llm_context import buildTrialContext, estimateTokens, fetchRequest, trialLogs
+
+
+def trial(value, sim_seconds):
+    return {"param_values": ["l1d_size", value], "stats": {"simSeconds": sim_seconds}, "fidelity": "full"}
+
+def history(num_phases, trials_per_phase):
+    phase_history = {}
+    trials = {}
+    for p in range(num_phases):
+        phase_history["phase_" + str(p)] = {"goal": "goal " + str(p), "hypothesis": "", "params_changed": ["l1d_size"]}
+        for t in range(trials_per_phase):
+            trials["trial_" + str(p) + "_" + str(t)] = trial(str(1 << t) + "kB", 1.0 / (t + 1))
+    return phase_history, trials
+
+
+def test_small_history_keeps_every_row():
+    phase_history, trials = history(2, 3)
+    text = buildTrialContext(phase_history, trials, budget=10000)
+    for key in trials:
+        assert key in text
+
+def test_budget_shortens_older_phases_first():
+    phase_history, trials = history(6, 20)
+    text = buildTrialContext(phase_history, trials, budget=600, focus_phase=5)
+    assert estimateTokens(text) <= 600
+    # The focus phase is shortened last
+    assert "### phase_5" in text
+    assert "trial_0_0 |" not in text
+
+def test_fetch_request():
+    assert fetchRequest("FETCH trial_1_2 trial_3_4") == ["trial_1_2", "trial_3_4"]
+    assert fetchRequest("0 \"goal\" ...") == []
+
+def test_trial_logs_skip_unknown_keys():
+    _, trials = history(1, 2)
+    text = trialLogs(["trial_0_1", "trial_9_9"], trials)
+    assert "trial_0_1" in text and "trial_9_9" not in text
@@ -0,0 +1,78 @@
+import collections
+
+import numpy as np
+
+from mrc_profile import curveKnees, missRatioCurve, narrowRange, stackDistances, sweepRange
+
+
+def naiveDistances(lines):
+    # Reference LRU stack: position of the line before it moves to the top
+    stack = []
+    out = []
+    for line in lines.tolist():
+        if line in stack:
+            out.append(stack.index(line))
+            stack.remove(line)
+        else:
+            out.append(-1)
+        stack.insert(0, line)
+    return out
+
+def naiveMissRatio(lines, capacity):
+    lru = collections.OrderedDict()
+    misses = 0
+    for line in lines.tolist():
+        if line in lru:
+            lru.move_to_end(line)
+        else:
+            misses += 1
+            lru[line] = True
+            if len(lru) > capacity:
+                lru.popitem(last=False)
+    return misses / len(lines)
+
+def randomLines(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lines = np.concatenate([rng.integers(0, 20, n // 2), rng.integers(0, 400, n // 2)])
+    rng.shuffle(lines)
+    return lines.astype(np.uint64)
+
+
+def test_stack_distances_match_reference():
+    lines = randomLines(2000)
+    assert stackDistances(lines).tolist() == naiveDistances(lines)
+
+def test_miss_ratio_curve_is_exact_without_sampling():
+    lines = randomLines(5000, seed=1)
+    sizes = [1 << e for e in range(6, 16)]
+    ratios, rate = missRatioCurve(lines, sizes)
+    assert rate == 1.0
+    for size, ratio in zip(sizes, ratios):
+        assert abs(ratio - naiveMissRatio(lines, size // 64)) < 1e-12
+
+def test_sampled_curve_stays_close():
+    # Spatial sampling needs many distinct lines to be representative
+    rng = np.random.default_rng(2)
+    lines = np.concatenate([rng.integers(0, 1000, 20000), rng.integers(0, 20000, 20000)])
+    rng.shuffle(lines)
+    lines = lines.astype(np.uint64)
+    sizes = [1 << e for e in range(12, 22)]
+    exact, _ = missRatioCurve(lines, sizes)
+    sampled, rate = missRatioCurve(lines, sizes, max_accesses=8000)
+    assert rate < 1.0
+    assert max(abs(a - b) for a, b in zip(exact, sampled)) < 0.05
+
+def test_knees_and_range():
+    curve = [[1024, 0.9], [2048, 0.9], [4096, 0.5], [8192, 0.1], [16384, 0.1]]
+    assert curveKnees(curve) == [4096, 8192]
+    assert sweepRange(curve) == (2048, 8192)
+    assert sweepRange([[1024, 0.2], [2048, 0.2]]) is None
+
+def test_narrow_range_never_widens_or_collapses():
+    assert narrowRange((2048, 1 << 20), "16kB", "128kB") == ("16kB", "128kB")
+    assert narrowRange((32 << 10, 64 << 10), "16kB", "128kB") == ("32kB", "64kB")
+    # Overlap of a single point would stop the parameter varying
+    assert narrowRange((128 << 10, 1 << 20), "16kB", "128kB") is None
+    # Pinned parameters and flat curves are left alone
+    assert narrowRange((2048, 8192), "16kB", "16kB") is None
+    assert narrowRange(None, "16kB", "128kB") is None
@@ -0,0 +1,83 @@
+from plateau import bisectStep, detectPlateau, isFlat, sweepPoints
+
+
+def metric(i):
+    # Sim time falling until domain index 5, flat from there on
+    return 10.0 - i if i < 5 else 5.0
+
+def runBisect(size, num_trials, workers):
+    """Drives bisectStep like main.runBisectRound. Returns (trials, bracket)."""
+    values = {}
+    t = 0
+    while True:
+        probes, _ = bisectStep(values, size, min(workers, num_trials - t))
+        for i in probes:
+            values[i] = metric(i)
+        t += len(probes)
+        if len(probes) == 0 or t >= num_trials:
+            return t, bisectStep(values, size, 0)[1]
+
+
+def test_endpoints_come_first():
+    assert bisectStep({}, 8, 32) == ([0, 7], None)
+    assert bisectStep({}, 8, 1) == ([0], None)
+
+def test_one_midpoint_per_round():
+    probes, bracket = bisectStep({0: metric(0), 7: metric(7)}, 8, 32)
+    assert probes == [3]
+    assert bracket == (0, 7)
+
+def test_finds_knee_in_log_rounds():
+    trials, bracket = runBisect(64, 100, 32)
+    assert bracket == (4, 5)
+    # Endpoints plus one probe per halving of the 64-point domain
+    assert trials <= 2 + 6
+
+def test_bracket_when_budget_runs_out():
+    # Many workers and a budget that ends mid-search still leave a bracket
+    trials, bracket = runBisect(8, 3, 32)
+    assert trials == 3
+    assert bracket == (3, 7)
+
+def test_flat_domain():
+    values = {0: 5.0, 7: 5.0}
+    assert bisectStep(values, 8, 4) == ([], (None, 0))
+
+def test_is_flat_uses_relative_tolerance():
+    assert isFlat([100.0, 101.0, 99.5], tolerance=0.02)
+    assert not isFlat([100.0, 110.0], tolerance=0.02)
+    assert isFlat([0.0, 0.0])
+
+def test_plateau_knee_is_first_flat_point():
+    points = [(v, m) for v, m in zip(["1kB", "2kB", "4kB", "8kB", "16kB"], [9.0, 7.0, 5.0, 5.02, 4.99])]
+    assert detectPlateau(points, tolerance=0.02, window=3) == 2
+
+def test_no_plateau_until_window_is_flat():
+    assert detectPlateau([(1, 9.0), (2, 7.0), (3, 5.0)], window=3) is None
+    # A failed trial inside the window blocks detection
+    assert detectPlateau([(1, 5.0), (2, None), (3, 5.0)], window=3) is None
+
+def lerpTrials(values, metrics):
+    return {
+        "trial_1_" + str(t): {"param_values": ["l1d_size", v], "stats": {"simSeconds": m}}
+        for t, (v, m) in enumerate(zip(values, metrics))
+    }
+
+def test_repeated_lerp_values_are_not_a_plateau():
+    # A 2kB-32kB sweep over 15 trials starts with four 2kB trials
+    values = ["2kB"] * 4 + ["4kB"] * 2
+    metrics = [9.0, 9.01, 8.99, 9.0, 7.0, 7.0]
+    first_wave = sweepPoints(lerpTrials(values[:4], metrics[:4]), "l1d_size", "simSeconds")
+    assert first_wave == [("2kB", 9.0)]
+    assert detectPlateau(first_wave, window=3) is None
+    points = sweepPoints(lerpTrials(values, metrics), "l1d_size", "simSeconds")
+    assert points == [("2kB", 9.0), ("4kB", 7.0)]
+    assert detectPlateau(points, window=3) is None
+
+def test_plateau_needs_window_distinct_values():
+    values = ["2kB"] * 4 + ["4kB"] * 2 + ["8kB", "16kB", "16kB", "32kB"]
+    metrics = [9.0, 9.0, 9.0, 9.0, 7.0, 7.0, 5.0, 5.0, None, 5.01]
+    points = sweepPoints(lerpTrials(values, metrics), "l1d_size", "simSeconds")
+    assert [v for v, _ in points] == ["2kB", "4kB", "8kB", "16kB", "32kB"]
+    assert points[3] == ("16kB", 5.0)
+    assert detectPlateau(points, window=3) == 2
@@ -0,0 +1,32 @@
+import pytest
+
+import archai_runner
+
+
+def test_commands_are_handed_out_once_in_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(archai_runner, "QUEUE_FILE", tmp_path / "runner.db")
+    archai_runner.sendCommand("start")
+    archai_runner.sendCommand("modify", "Add a phase sweeping l2_size")
+    archai_runner.sendCommand("pause")
+    assert archai_runner.pendingCommands() == 3
+    assert archai_runner.takeCommands() == [
+        ("start", ""),
+        ("modify", "Add a phase sweeping l2_size"),
+        ("pause", ""),
+    ]
+    assert archai_runner.pendingCommands() == 0
+    assert archai_runner.takeCommands() == []
+
+def test_unknown_commands_are_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(archai_runner, "QUEUE_FILE", tmp_path / "runner.db")
+    with pytest.raises(ValueError):
+        archai_runner.sendCommand("stop")
+    assert archai_runner.pendingCommands() == 0
+
+def test_missing_status_means_stopped(tmp_path, monkeypatch):
+    monkeypatch.setattr(archai_runner, "STATUS_FILE", tmp_path / "runner_status.json")
+    assert archai_runner.readStatus()["state"] == "stopped"
+    assert not archai_runner.runnerAlive()
+    archai_runner.writeStatus({"state": "idle"})
+    assert archai_runner.readStatus()["state"] == "idle"
+    assert archai_runner.runnerAlive()
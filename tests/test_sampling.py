@@ -0,0 +1,57 @@
+import gzip
+
+import numpy as np
+import pytest
+
+from sampling import buildPlan, extrapolate, pickSimpoints, readBBVs
+
+
+def plan(weights, total_insts=1000, interval_length=100, num_intervals=10):
+    return {
+        "interval_length": interval_length,
+        "warmup_length": 0,
+        "num_intervals": num_intervals,
+        "total_insts": total_insts,
+        "points": [{"interval": i, "weight": w} for i, w in enumerate(weights)],
+    }
+
+def test_extrapolation_weights_seconds_per_instruction():
+    blocks = [
+        {"simSeconds": 1e-6, "ipc": 1.0},
+        {"simSeconds": 3e-6, "ipc": 0.5},
+        {"simSeconds": 99.0},  # end-of-simulation dump
+    ]
+    stats = extrapolate(blocks, plan([0.75, 0.25]))
+    assert stats["simSeconds"] == pytest.approx((0.75 * 1e-8 + 0.25 * 3e-8) * 1000)
+    assert stats["ipc"] == pytest.approx(0.875)
+    assert stats["simSecondsError"] > 0
+    assert stats["simInsts"] == 1000
+    assert stats["sampledFraction"] == pytest.approx(0.2)
+
+def test_identical_samples_have_no_error():
+    blocks = [{"simSeconds": 2e-6}, {"simSeconds": 2e-6}]
+    stats = extrapolate(blocks, plan([0.5, 0.5]))
+    assert stats["simSeconds"] == pytest.approx(2e-8 * 1000)
+    assert stats["simSecondsError"] == 0
+
+def test_missing_samples_give_no_stats():
+    assert extrapolate([{"simSeconds": 1e-6}], plan([0.5, 0.5])) == {}
+    assert extrapolate([], plan([])) == {}
+
+def test_plan_weights_cover_every_phase(tmp_path):
+    # Two program phases touching disjoint basic blocks
+    bbv_path = tmp_path / "simpoint.bb.gz"
+    with gzip.open(bbv_path, "wt") as f:
+        for i in range(12):
+            first, second = (1, 2) if i < 8 else (3, 4)
+            f.write("T:%d:%d :%d:50\n" % (first, 40 + 5 * (i % 3), second))
+    bbvs = readBBVs(bbv_path)
+    assert bbvs.shape == (12, 5)
+    assert np.allclose(bbvs.sum(axis=1), 1.0)
+    points = pickSimpoints(bbvs)
+    # Every phase is represented with the share of intervals it covers
+    assert sum(w for i, w in points if i < 8) == pytest.approx(8 / 12)
+    assert sum(w for i, w in points if i >= 8) == pytest.approx(4 / 12)
+    built = buildPlan(bbv_path, 100, 10, 1200)
+    assert built["num_intervals"] == 12
+    assert sum(p["weight"] for p in built["points"]) == pytest.approx(1.0)
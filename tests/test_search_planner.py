@@ -0,0 +1,36 @@
+import math
+
+from search_planner import missScore, promote, rungScore, successiveHalving
+
+
+def atomicStats(l1_misses, l2_misses):
+    # ATOMIC sim time does not depend on the cache sizes
+    return {
+        "simSeconds": 0.01,
+        "board.cache_hierarchy.l1d-cache-0.overallMisses::total": l1_misses,
+        "board.cache_hierarchy.l2-cache.overallMisses::total": l2_misses,
+    }
+
+def test_promote_keeps_the_best_fraction():
+    assert promote([3.0, 1.0, 2.0, 5.0, 4.0, 0.5], eta=3) == [5, 1]
+    assert promote([math.inf, 2.0], eta=3) == [1]
+    assert promote([math.inf, math.inf], eta=3) == [0]
+
+def test_atomic_rung_ranks_by_misses():
+    assert missScore(atomicStats(100, 10)) > missScore(atomicStats(100, 5))
+    assert rungScore("atomic", atomicStats(0, 0)) == 0
+    assert rungScore("full", atomicStats(0, 0)) == 0.01
+    assert missScore({"simSeconds": 0.02}) == 0.02
+
+def test_halving_promotes_larger_caches_past_the_atomic_rung():
+    jobs = [("trial_1_" + str(i), {"l2_size": str(256 << i) + "kB"}) for i in range(6)]
+    misses = {"atomic": [60, 50, 40, 30, 20, 10]}
+    seen = {}
+    def runRung(name, rungJobs):
+        seen[name] = [key for key, _ in rungJobs]
+        if name == "atomic":
+            return [atomicStats(1000, misses["atomic"][int(key[-1])]) for key, _ in rungJobs]
+        return [{"simSeconds": 1.0} for _ in rungJobs]
+    promotions = successiveHalving(jobs, runRung, eta=3)
+    assert seen["full"] == ["trial_1_5", "trial_1_4"]
+    assert promotions == [{"from": "atomic", "to": "full", "trials": ["trial_1_5", "trial_1_4"]}]
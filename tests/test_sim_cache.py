@@ -0,0 +1,49 @@
+import sim_cache
+import trial_executor
+
+
+def test_key_ignores_var_order_but_not_values():
+    a = sim_cache.cacheKey({"l1d_size": "32kB", "num_cores": 2}, "bin", "spec")
+    b = sim_cache.cacheKey({"num_cores": 2, "l1d_size": "32kB"}, "bin", "spec")
+    assert a == b
+    assert a != sim_cache.cacheKey({"l1d_size": "64kB", "num_cores": 2}, "bin", "spec")
+
+def test_key_covers_digests_and_sim_options():
+    trial_vars = {"l1d_size": "32kB"}
+    key = sim_cache.cacheKey(trial_vars, "bin", "spec")
+    assert key != sim_cache.cacheKey(trial_vars, "other", "spec")
+    assert key != sim_cache.cacheKey(trial_vars, "bin", "other")
+    assert key != sim_cache.cacheKey(trial_vars, "bin", "spec", {"mode": "sampled"})
+    assert key == sim_cache.cacheKey(trial_vars, "bin", "spec", {})
+
+def test_store_lookup_and_evict(tmp_path, monkeypatch):
+    monkeypatch.setattr(sim_cache, "CACHE_DIR", tmp_path)
+    assert sim_cache.lookup("ab" * 32) is None
+    measurement = {"stats": {"simSeconds": 0.5}, "kernels": {}}
+    sim_cache.store("ab" * 32, {"l1d_size": "32kB"}, measurement)
+    assert sim_cache.lookup("ab" * 32) == measurement
+    sim_cache.store("cd" * 32, {"l1d_size": "64kB"}, measurement)
+    assert sim_cache.evict(max_bytes=0) == 2
+    assert sim_cache.cacheStats()["entries"] == 0
+
+def test_duplicate_jobs_simulate_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(sim_cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(sim_cache, "currentDigests", lambda: ("bin", "spec"))
+    monkeypatch.setattr(trial_executor, "USE_SAMPLING", False)
+    monkeypatch.setattr(trial_executor, "USE_CHECKPOINTS", False)
+    runs = []
+    def fakeRun(job):
+        runs.append(job[0])
+        return {"trial": job[0], "returncode": 0, "stats": {"simSeconds": 1.0}, "kernels": {}}
+    monkeypatch.setattr(trial_executor, "runTrialJob", fakeRun)
+
+    jobs = [("t0", {"l1d_size": "32kB"}), ("t1", {"l1d_size": "32kB"}), ("t2", {"l1d_size": "64kB"})]
+    results = trial_executor.runTrials(jobs, max_workers=1)
+    assert runs == ["t0", "t2"]
+    assert [r["trial"] for r in results] == ["t0", "t1", "t2"]
+    assert [r["cached"] for r in results] == [False, True, False]
+
+    # A second batch is served from disk
+    results = trial_executor.runTrials(jobs, max_workers=1)
+    assert runs == ["t0", "t2"]
+    assert all(r["cached"] for r in results)
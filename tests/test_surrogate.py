@@ -0,0 +1,33 @@
+import math
+
+import pytest
+
+from surrogate import MIN_HISTORY, VERIFY_EVERY, planSkips, predictionError
+
+BOUNDS = {"l1d_size": ("16kB", "256kB")}
+SIZES = ["16kB", "32kB", "64kB", "128kB", "256kB"]
+
+
+def stats(seconds):
+    return {"simSeconds": seconds, "hostMemory": 1000.0, "hostInstRate": 5e5}
+
+def test_too_little_history_simulates_everything():
+    history = [({"l1d_size": size}, stats(1.0)) for size in SIZES[:MIN_HISTORY - 1]]
+    plan = planSkips(history, BOUNDS, [{"l1d_size": "32kB"}])
+    assert [p["action"] for p in plan] == ["simulate"]
+
+def test_confident_predictions_are_skipped_and_spot_checked():
+    # Every size measured twice with the same flat result
+    history = [({"l1d_size": size}, stats(2.0)) for size in SIZES for _ in range(2)]
+    pending = [{"l1d_size": size} for size in SIZES[1:]]
+    plan = planSkips(history, BOUNDS, pending)
+    actions = [p["action"] for p in plan]
+    assert actions[0] == "verify"
+    assert actions.count("verify") == math.ceil(len(pending) / VERIFY_EVERY)
+    assert set(actions) == {"verify", "predict"}
+    assert all(abs(p["stats"]["simSeconds"] - 2.0) < 0.1 for p in plan)
+
+def test_prediction_error():
+    assert predictionError({"simSeconds": 1.1}, {"simSeconds": 1.0}) == pytest.approx(0.1)
+    assert predictionError({"simSeconds": 1.0}, {}) == math.inf
+    assert predictionError({}, {"simSeconds": 1.0}) == 0.0
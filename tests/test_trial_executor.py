@@ -0,0 +1,22 @@
+import threading
+import time
+
+import trial_executor
+
+
+def slowRun(job):
+    time.sleep(3 if job[0] != "fast" else 0)
+    return {"trial": job[0], "returncode": 0, "stats": {"simSeconds": 1.0}, "kernels": {}}
+
+def test_cancel_returns_without_waiting_for_running_trials(monkeypatch):
+    monkeypatch.setattr(trial_executor, "runTrialJob", slowRun)
+    monkeypatch.setattr(trial_executor, "USE_SAMPLING", False)
+    monkeypatch.setattr(trial_executor, "USE_CHECKPOINTS", False)
+    jobs = [("fast", {"l1d_size": "16kB"})] + [("spec_" + str(i), {"l1d_size": str(32 << i) + "kB"}) for i in range(5)]
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    started = time.monotonic()
+    results = trial_executor.runTrials(jobs, max_workers=2, use_cache=False, cancel=cancel)
+    assert time.monotonic() - started < 2.5
+    assert results[0]["trial"] == "fast"
+    assert all(r is None for r in results[1:])
@@ -0,0 +1,47 @@
+from trial_store import appendTrial, findTrials, getTrial, getTrials, migrateRawTrials, numericValue, trialCount
+
+
+def record(size, seconds):
+    return {"param_values": ["l1d_size", size], "results": ["simSeconds", seconds], "stats": {"simSeconds": seconds}}
+
+def test_numeric_values():
+    assert numericValue("16kB") == 16384
+    assert numericValue("2MB") == 2 << 20
+    assert numericValue("3") == 3
+    assert numericValue(4) == 4
+    assert numericValue("TIMING") is None
+
+def test_newest_row_wins(tmp_path):
+    path = tmp_path / "trials.db"
+    appendTrial("trial_1_0", record("16kB", 2.0), path)
+    appendTrial("trial_1_1", dict(record("32kB", 1.5), note="first"), path)
+    appendTrial("trial_1_0", record("16kB", 1.0), path)
+    assert trialCount(path) == 2
+    trials = getTrials(path=path)
+    assert list(trials) == ["trial_1_0", "trial_1_1"]
+    assert trials["trial_1_0"]["stats"] == {"simSeconds": 1.0}
+    assert getTrial(1, 1, path)["note"] == "first"
+    assert getTrial(2, 0, path) is None
+
+def test_range_lookup_compares_sizes_in_bytes(tmp_path):
+    path = tmp_path / "trials.db"
+    for t, size in enumerate(["8kB", "16kB", "1MB"]):
+        appendTrial("trial_1_" + str(t), record(size, 1.0), path)
+    assert list(findTrials("l1d_size", low="10kB", high="512kB", path=path)) == ["trial_1_1"]
+    assert list(findTrials("l1d_size", value="1MB", path=path)) == ["trial_1_2"]
+
+def test_migration_skips_stored_keys(tmp_path):
+    path = tmp_path / "trials.db"
+    appendTrial("trial_1_0", record("16kB", 1.0), path)
+    raw_trials = {
+        "trial_template": {"param_values": [], "results": []},
+        "trial_1_0": record("16kB", 9.0),
+        "trial_1_1": record("32kB", 0.5),
+    }
+    assert migrateRawTrials(raw_trials, path) == {"trial_template": raw_trials["trial_template"]}
+    trials = getTrials(path=path)
+    assert trials["trial_1_0"]["stats"] == {"simSeconds": 1.0}
+    assert trials["trial_1_1"]["stats"] == {"simSeconds": 0.5}
+    # Migrating again changes nothing
+    migrateRawTrials(raw_trials, path)
+    assert trialCount(path) == 2
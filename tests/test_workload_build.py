@@ -0,0 +1,56 @@
+import sys
+
+import pytest
+
+import workload_build
+from workload_build import BuildError, buildAll, buildKey, defineFlags
+
+# Stands in for the cross-compiler: logs its defines and writes the output
+FAKE_COMPILER = """
+import sys
+args = sys.argv[1:]
+if "-DN=0" in args:
+    sys.exit("error: N must be positive")
+with open(sys.argv[-1], "w") as f:
+    f.write(" ".join(a for a in args if a.startswith("-D")))
+with open(LOG, "a") as f:
+    f.write(" ".join(a for a in args if a.startswith("-DN")) + "\\n")
+"""
+
+@pytest.fixture
+def builder(tmp_path, monkeypatch):
+    source = tmp_path / "uarch_stressor.c"
+    source.write_text("int main(void) { return N; }\n")
+    compiler = tmp_path / "fake_gcc.py"
+    log = tmp_path / "builds.log"
+    compiler.write_text("LOG = " + repr(str(log)) + "\n" + FAKE_COMPILER)
+    monkeypatch.setattr(workload_build, "SOURCE_FILE", source)
+    monkeypatch.setattr(workload_build, "BUILD_DIR", tmp_path / "build_cache")
+    monkeypatch.setattr(workload_build, "COMPILER", [sys.executable, str(compiler)])
+    # The output path is the compiler's last argument
+    monkeypatch.setattr(workload_build, "LIBS", [])
+    return log
+
+def test_defines_are_sorted_and_skip_cflags():
+    assert defineFlags({"N": 100, "A": 1, "cflags": ["-O3"]}) == ["-DA=1", "-DN=100"]
+
+def test_each_n_is_built_once(builder):
+    specs = [{"N": 100}, {"N": 4096}, {"N": 100}]
+    binaries = buildAll(specs)
+    assert len(binaries) == 2
+    assert binaries[buildKey({"N": 100})].read_text() == "-DN=100"
+    assert sorted(builder.read_text().split()) == ["-DN=100", "-DN=4096"]
+    # A second phase with the same sizes compiles nothing
+    buildAll([{"N": 4096}, {"N": 100}])
+    assert len(builder.read_text().split()) == 2
+
+def test_key_changes_with_source_and_flags(builder):
+    key = buildKey({"N": 100})
+    assert key != buildKey({"N": 100, "cflags": ["-O3"]})
+    workload_build.SOURCE_FILE.write_text("int main(void) { return N + 1; }\n")
+    assert key != buildKey({"N": 100})
+
+def test_failed_builds_raise(builder):
+    with pytest.raises(BuildError):
+        buildAll([{"N": 0}])
+    assert workload_build.cacheStats()["entries"] == 0
@@ -0,0 +1,407 @@
+# -------------------------------------------------------------------
+# PARALLEL GEM5 TRIAL EXECUTION
+# -------------------------------------------------------------------
+# Runs the trials of a phase side by side on a process pool. Every trial
+# gets its own config file and its own gem5 --outdir, so concurrent
+# simulations never share params.json or /gem5/m5out.
+
+import json
+import os
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import cache_sim
+import sampling
+import sim_cache
+import workload_build
+from gem5_stats import finalStats, parseStatsFile, regionStats, TRIAL_STATS
+
+GEM5_ROOT = Path("/gem5")
+GEM5_BINARY = "build/ARM/gem5.opt"
+UARCH_SPEC = "configs/example/gem5_library/archai/uarch_spec.py"
+
+# Per-trial config files and gem5 output directories live here
+TRIAL_ROOT = GEM5_ROOT / "m5out" / "archai_trials"
+
+# Number of gem5 processes allowed to run at once (defaults to all cores)
+MAX_TRIAL_WORKERS = int(os.environ.get("ARCHAI_MAX_WORKERS", os.cpu_count() or 1))
+
+# Seconds between checks of a batch's cancel flag while trials run
+CANCEL_POLL = 1.0
+
+# Post-initialization checkpoints, one per workload binary and memory
+# system, are restored by every full trial instead of re-running the
+# stressor's setup code
+CHECKPOINT_ROOT = GEM5_ROOT / "m5out" / "archai_checkpoints"
+USE_CHECKPOINTS = os.environ.get("ARCHAI_CHECKPOINTS", "1") == "1"
+
+# The vars that shape the architectural and memory state a checkpoint
+# holds; cache sizes and the CPU model do not
+CHECKPOINT_VARS = ("num_cores", "DDR_memory_size", "memory_type", "mem_channels", "cache_hierarchy")
+
+# Sampled simulation: simulate only SimPoint intervals in detail and
+# extrapolate whole-program sim time (off by default)
+SIMPOINT_ROOT = GEM5_ROOT / "m5out" / "archai_simpoints"
+USE_SAMPLING = os.environ.get("ARCHAI_SAMPLED", "0") == "1"
+SIMPOINT_INTERVAL = int(os.environ.get("ARCHAI_SIMPOINT_INTERVAL", 1000000))
+SIMPOINT_WARMUP = int(os.environ.get("ARCHAI_SIMPOINT_WARMUP", 100000))
+
+# Memory reference traces for cache_sim.py, one per binary and workload
+TRACE_ROOT = GEM5_ROOT / "m5out" / "archai_traces"
+TRACE_FILE = "memtrace.out"
+# Accesses kept per trace. The capture run stops once it has executed this
+# many instructions after the checkpoint: every instruction fetch is an
+# access, so by then at least this many have been logged
+TRACE_MAX_ACCESSES = int(os.environ.get("ARCHAI_TRACE_MAX_ACCESSES", 20000000))
+
+# Kernels wrapped in m5_work_begin/m5_work_end by uarch_stressor.c, in the
+# order they run; a trial runs the subset named in its "args"
+KERNEL_NAMES = [
+    "bubble_sort", "merge_sort", "quick_sort",
+    "stream_copy", "stream_triad", "pointer_chase",
+    "matmul", "hash_probe",
+]
+DEFAULT_KERNELS = ["bubble_sort", "merge_sort", "quick_sort"]
+
+def jobSimOptions(job):
+    # Jobs are (trial_key, trial_vars) or (trial_key, trial_vars, sim_options);
+    # sim_options are the settings beyond "vars" uarch_spec.py reads from "sim"
+    return dict(job[2]) if len(job) > 2 else {}
+
+
+def runKernels(sim_options):
+    # Kernels a trial runs, in run order
+    selected = sim_options.get("args", {}).get("kernels", DEFAULT_KERNELS)
+    return [name for name in KERNEL_NAMES if name in selected]
+
+def withBinary(job, binaries):
+    # Points a job with a "workload" spec at its built binary
+    sim_options = job[2] if len(job) > 2 else {}
+    if "workload" not in sim_options:
+        return job
+    binary = binaries[workload_build.buildKey(sim_options["workload"])]
+    return (job[0], job[1], dict(sim_options, binary=str(binary)))
+
+
+def trialDir(trial_key):
+    return TRIAL_ROOT / trial_key
+
+def writeTrialConfig(trial_key, trial_vars, sim_options):
+    # Same layout as params.json, but only the "vars" uarch_spec.py reads,
+    # plus the per-trial simulation settings
+    out_dir = trialDir(trial_key)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    config_path = out_dir / "params.json"
+    with open(config_path, "w") as f:
+        json.dump({"vars": trial_vars, "sim": sim_options}, f, indent=2)
+    return config_path
+
+def trialCommand(trial_key, config_path, debug_file=None):
+    # uarch_spec.py turns debug flags on itself; debug_file only says where
+    # their output goes (inside the trial's --outdir)
+    debug = [] if debug_file is None else ["--debug-file=" + debug_file]
+    return [
+        GEM5_BINARY,
+        "--outdir=" + str(trialDir(trial_key)),
+    ] + debug + [
+        UARCH_SPEC,
+        "--params", str(config_path),
+    ]
+
+def runTrialJob(job):
+    """
+    Runs one gem5 simulation in its own output directory.
+
+    job is a (trial_key, trial_vars[, sim_options]) tuple. Returns a dict
+    with the trial key, the gem5 return code and the {stat name: value}
+    mapping of the final stats dump (empty if gem5 failed or did not
+    produce a stats.txt). Sampled runs return the extrapolated whole-program stats.
+
+    Full runs also return "kernels": {kernel name: region stats} from the
+    begin/end dumps around each kernel (empty for sampled runs).
+    """
+    trial_key, trial_vars = job[0], job[1]
+    sim_options = jobSimOptions(job)
+    returncode = runGem5(trial_key, writeTrialConfig(trial_key, trial_vars, sim_options))
+
+    stats_path = trialDir(trial_key) / "stats.txt"
+    stats = {}
+    kernels = {}
+    if returncode == 0 and stats_path.exists():
+        blocks = parseStatsFile(stats_path, TRIAL_STATS)
+        if sim_options.get("mode") == "sampled":
+            stats = sampling.extrapolate(blocks, sim_options["simpoints"])
+        elif len(blocks) > 0:
+            # Kernel begin/end dump pairs come first, the end-of-run dump last
+            stats = blocks[-1]
+            regions = blocks[:-1]
+            for i, name in enumerate(runKernels(sim_options)[:len(regions) // 2]):
+                kernels[name] = regionStats(regions[2 * i], regions[2 * i + 1])
+
+    return {
+        "trial": trial_key,
+        "returncode": returncode,
+        "stats": stats,
+        "kernels": kernels,
+    }
+
+def runGem5(trial_key, config_path, debug_file=None):
+    # Trial keys are reused across runs, so a stats.txt left by an earlier
+    # run must never be read as this run's output
+    (trialDir(trial_key) / "stats.txt").unlink(missing_ok=True)
+    simulation_result = subprocess.run(
+        trialCommand(trial_key, config_path, debug_file),
+        cwd=GEM5_ROOT,
+        capture_output=True,
+        text=True
+    )
+
+    # Keep the simulator output next to the stats instead of printing it,
+    # since several trials write at the same time
+    with open(trialDir(trial_key) / "gem5.log", "w") as f:
+        f.write(simulation_result.stdout)
+        f.write("\n" + "-" * 100 + "\n")
+        f.write(simulation_result.stderr)
+
+    return simulation_result.returncode
+
+def ensureSimpointPlan(trial_vars, binary=None):
+    """
+    Returns the sampling plan for a workload binary (microbench.arm by
+    default), profiling it first if needed: one ATOMIC gem5 run records
+    basic block vectors, which are clustered into weighted representative
+    intervals.
+    """
+    binary_digest = sim_cache.fileDigest(binary or sim_cache.BINARY_FILE)[:16]
+    plan_path = SIMPOINT_ROOT / (binary_digest + ".json")
+    plan = sampling.loadPlan(plan_path)
+    if plan is not None:
+        return plan
+
+    profile_key = "simpoint_profile_" + binary_digest
+    profile_options = {"mode": "profile", "interval_length": SIMPOINT_INTERVAL}
+    if binary is not None:
+        profile_options["binary"] = str(binary)
+    runGem5(profile_key, writeTrialConfig(profile_key, trial_vars, profile_options))
+
+    total_insts = finalStats(trialDir(profile_key) / "stats.txt", ["simInsts"]).get("simInsts", 0)
+    plan = sampling.buildPlan(
+        trialDir(profile_key) / "simpoint.bb.gz",
+        SIMPOINT_INTERVAL,
+        SIMPOINT_WARMUP,
+        total_insts
+    )
+    SIMPOINT_ROOT.mkdir(parents=True, exist_ok=True)
+    sampling.savePlan(plan, plan_path)
+    return plan
+
+def checkpointPath(job):
+    trial_vars = job[1]
+    sim_options = jobSimOptions(job)
+    checkpoint_key = sim_cache.cacheKey(
+        {name: trial_vars.get(name) for name in CHECKPOINT_VARS},
+        sim_cache.fileDigest(sim_options.get("binary", sim_cache.BINARY_FILE)),
+        "",
+        {"args": sim_options.get("args", {})}
+    )[:16]
+    return CHECKPOINT_ROOT / checkpoint_key
+
+def ensureCheckpoint(job):
+    """
+    Returns the post-initialization checkpoint of a job's workload and
+    memory system, saving it first if needed: one gem5 run simulates the
+    stressor's setup code up to its m5_checkpoint() and exits there. None if
+    that run did not produce a checkpoint.
+    """
+    checkpoint_path = checkpointPath(job)
+    if not checkpoint_path.exists():
+        save_key = "checkpoint_" + checkpoint_path.name
+        save_options = dict(jobSimOptions(job), mode="checkpoint", checkpoint=str(checkpoint_path))
+        runGem5(save_key, writeTrialConfig(save_key, job[1], save_options))
+    return checkpoint_path if checkpoint_path.exists() else None
+
+def ensureTrace(job):
+    """
+    Returns the memory reference trace of a job's workload (binary, workload
+    arguments and core count), capturing it first if needed: one ATOMIC,
+    cache-less gem5 run logs every access after the stressor's checkpoint.
+    """
+    trial_vars = job[1]
+    sim_options = jobSimOptions(job)
+    binary = sim_options.get("binary", sim_cache.BINARY_FILE)
+    trace_key = sim_cache.cacheKey(
+        {"num_cores": trial_vars["num_cores"]},
+        sim_cache.fileDigest(binary),
+        "",
+        {"args": sim_options.get("args", {})}
+    )[:16]
+    trace_path = TRACE_ROOT / (trace_key + ".npz")
+    trace = cache_sim.loadTrace(trace_path)
+    if trace is not None:
+        return trace
+
+    capture_key = "memtrace_" + trace_key
+    capture_options = {
+        "mode": "trace",
+        "binary": str(binary),
+        "args": sim_options.get("args", {}),
+        "max_insts": TRACE_MAX_ACCESSES,
+    }
+    runGem5(capture_key, writeTrialConfig(capture_key, trial_vars, capture_options), TRACE_FILE)
+    trace = cache_sim.parseTrace(trialDir(capture_key) / TRACE_FILE, TRACE_MAX_ACCESSES)
+    TRACE_ROOT.mkdir(parents=True, exist_ok=True)
+    cache_sim.saveTrace(trace, trace_path)
+    # The text trace is large and fully represented by the array
+    (trialDir(capture_key) / TRACE_FILE).unlink(missing_ok=True)
+    return trace
+
+def resolveWorkloads(jobs):
+    # Builds every workload variant the jobs need and points them at it
+    specs = [job[2]["workload"] for job in jobs if len(job) > 2 and "workload" in job[2]]
+    if len(specs) == 0:
+        return jobs
+    binaries = workload_build.buildAll(specs)
+    return [withBinary(job, binaries) for job in jobs]
+
+def traceTrials(jobs):
+    """
+    Evaluates the cache geometry of (trial_key, trial_vars[, sim_options])
+    jobs on their workload's memory trace instead of running gem5. Returns
+    one cache_sim stats dict per job, in job order.
+    """
+    jobs = resolveWorkloads(jobs)
+    groups = {}
+    for i, job in enumerate(jobs):
+        workload = json.dumps([job[1]["num_cores"], jobSimOptions(job).get("binary"), jobSimOptions(job).get("args", {})], sort_keys=True)
+        groups.setdefault(workload, []).append(i)
+    results = [None] * len(jobs)
+    for indices in groups.values():
+        trace = ensureTrace(jobs[indices[0]])
+        for i, stats in zip(indices, cache_sim.evaluate(trace, [jobs[i][1] for i in indices])):
+            results[i] = stats
+    return results
+
+def runTrials(jobs, max_workers=MAX_TRIAL_WORKERS, use_cache=True, on_result=None, cancel=None):
+    """
+    Runs a list of (trial_key, trial_vars[, sim_options]) jobs on a process
+    pool of at most max_workers gem5 processes. Results are returned in job
+    order. Jobs whose sim_options carry a "workload" spec run the matching
+    stressor variant; all variants are built before the first trial starts.
+
+    With use_cache, configurations already in the simulation result cache are
+    returned right away, and duplicate configurations inside the batch are
+    simulated only once.
+
+    on_result(index, result), if given, is called in this process as soon as
+    each job finishes (in completion order), so callers can persist trials
+    one by one instead of losing the whole batch on a crash.
+
+    cancel, if given, is a threading.Event: once it is set, jobs that have
+    not started yet are dropped (their results stay None) and runTrials
+    returns within CANCEL_POLL seconds. Simulations already running are
+    left to finish in the background and their results are discarded.
+    """
+    if len(jobs) == 0:
+        return []
+
+    jobs = list(resolveWorkloads(jobs))
+
+    if USE_SAMPLING:
+        # One sampling plan per workload binary in the batch
+        plans = {}
+        sampledJobs = []
+        for job in jobs:
+            binary = jobSimOptions(job).get("binary")
+            if binary not in plans:
+                plans[binary] = ensureSimpointPlan(job[1], binary)
+            if len(plans[binary]["points"]) > 0:
+                sampled = {"mode": "sampled", "simpoints": plans[binary]}
+                job = (job[0], job[1], dict(job[2] if len(job) > 2 else {}, **sampled))
+            sampledJobs.append(job)
+        jobs = sampledJobs
+
+    results = [None] * len(jobs)
+    keys = [None] * len(jobs)
+    pending = {}
+
+    def finish(i, result):
+        results[i] = result
+        if on_result is not None:
+            on_result(i, result)
+
+    if use_cache:
+        binary_digest, spec_digest = sim_cache.currentDigests()
+        digests = {None: binary_digest}
+
+    for i, job in enumerate(jobs):
+        trial_key, trial_vars = job[0], job[1]
+        if use_cache:
+            binary = jobSimOptions(job).get("binary")
+            if binary not in digests:
+                digests[binary] = sim_cache.fileDigest(binary)
+            keys[i] = sim_cache.cacheKey(trial_vars, digests[binary], spec_digest, jobSimOptions(job))
+            cached = sim_cache.lookup(keys[i])
+            if cached is not None:
+                finish(i, dict(cached, trial=trial_key, returncode=0, cached=True))
+                continue
+            if keys[i] in pending:
+                pending[keys[i]].append(i)
+                continue
+        pending[keys[i] if use_cache else i] = [i]
+
+    def collect(indices, result):
+        first = indices[0]
+        if use_cache and result["returncode"] == 0 and len(result["stats"]) > 0:
+            measurement = {"stats": result["stats"], "kernels": result.get("kernels", {})}
+            sim_cache.store(keys[first], jobs[first][1], measurement)
+        for i in indices:
+            finish(i, dict(result, trial=jobs[i][0], cached=(i != first)))
+
+    # Only the first job of every duplicate group is simulated
+    groups = list(pending.values())
+
+    # Full runs restore the checkpoint of their workload, saved up front so
+    # every trial of the batch starts from the same cold state. Simpoint
+    # offsets count from program start, so sampled runs never restore one.
+    if USE_CHECKPOINTS:
+        checkpoints = {}
+        for indices in groups:
+            job = jobs[indices[0]]
+            if jobSimOptions(job).get("mode", "full") != "full":
+                continue
+            checkpoint_path = checkpointPath(job)
+            if checkpoint_path not in checkpoints:
+                checkpoints[checkpoint_path] = ensureCheckpoint(job)
+            if checkpoints[checkpoint_path] is not None:
+                jobs[indices[0]] = (job[0], job[1], dict(jobSimOptions(job), checkpoint=str(checkpoint_path)))
+    workers = max(1, min(max_workers, len(groups)))
+    def cancelled():
+        return cancel is not None and cancel.is_set()
+
+    if workers == 1:
+        for indices in groups:
+            if cancelled():
+                break
+            collect(indices, runTrialJob(jobs[indices[0]]))
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        waiting = list(groups)
+        running = {}
+        try:
+            while len(waiting) > 0 or len(running) > 0:
+                # Jobs only go to the pool once a worker is free, so a
+                # cancelled batch leaves nothing queued behind the running ones
+                while len(waiting) > 0 and len(running) < workers and not cancelled():
+                    indices = waiting.pop(0)
+                    running[pool.submit(runTrialJob, jobs[indices[0]])] = indices
+                if cancelled():
+                    break
+                done, _ = wait(running, timeout=CANCEL_POLL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(running.pop(future), future.result())
+        finally:
+            # Nothing is left to collect here, so never wait for discarded runs
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return results
@@ -0,0 +1,234 @@
+# -------------------------------------------------------------------
+# APPEND-ONLY TRIAL STORE
+# -------------------------------------------------------------------
+# Trials live in a SQLite database next to params.json instead of inside
+# params["runtime"]["raw_trials"], so recording a trial is one INSERT rather
+# than a rewrite of the whole experiment state. Rows are never updated: if a
+# trial key is recorded again (e.g. a re-run after a crash) the newest row
+# wins on read.
+
+import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+
+STORE_FILE = Path(__file__).parent / "trials.db"
+
+# Snapshot written by saveCurrent() and restored by loadPrev()
+SAVED_STORE_FILE = Path(__file__).parent / "loadtrials.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    phase INTEGER NOT NULL,
+    trial INTEGER NOT NULL,
+    param_values TEXT NOT NULL,
+    results TEXT NOT NULL,
+    stats TEXT NOT NULL,
+    extra TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trials_by_key ON trials (key);
+CREATE INDEX IF NOT EXISTS trials_by_phase ON trials (phase, trial);
+
+CREATE TABLE IF NOT EXISTS trial_params (
+    trial_id INTEGER NOT NULL REFERENCES trials (id),
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    num REAL
+);
+CREATE INDEX IF NOT EXISTS trial_params_by_value ON trial_params (name, value);
+CREATE INDEX IF NOT EXISTS trial_params_by_num ON trial_params (name, num);
+
+-- Newest row per trial key
+CREATE VIEW IF NOT EXISTS latest_trials AS
+    SELECT * FROM trials WHERE id IN (SELECT MAX(id) FROM trials GROUP BY key);
+"""
+
+SIZE_UNITS = {"B": 1, "kB": 1 << 10, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30, "TB": 1 << 40}
+
+
+def connect(path=STORE_FILE):
+    conn = sqlite3.connect(str(path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def numericValue(value):
+    """Parameter value as a number for range lookups ("16kB" -> 16384)."""
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value).strip()
+    for unit in sorted(SIZE_UNITS, key=len, reverse=True):
+        if text.endswith(unit) and text[:-len(unit)].strip().replace(".", "", 1).isdigit():
+            return float(text[:-len(unit)]) * SIZE_UNITS[unit]
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+def splitTrialKey(key):
+    # "trial_3_7" -> (3, 7)
+    _, p, t = key.split("_")
+    return int(p), int(t)
+
+def insertTrial(conn, key, record):
+    phase, trial = splitTrialKey(key)
+    param_values = record.get("param_values", [])
+    extra = {k: v for k, v in record.items() if k not in ("param_values", "results", "stats")}
+    cur = conn.execute(
+        "INSERT INTO trials (key, phase, trial, param_values, results, stats, extra, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            key, phase, trial,
+            json.dumps(param_values),
+            json.dumps(record.get("results", [])),
+            json.dumps(record.get("stats", {})),
+            json.dumps(extra),
+            time.time(),
+        )
+    )
+    # param_values alternates names and values: [name1, value1, name2, value2, ...]
+    conn.executemany(
+        "INSERT INTO trial_params (trial_id, name, value, num) VALUES (?, ?, ?, ?)",
+        [
+            (cur.lastrowid, str(param_values[i]), str(param_values[i + 1]), numericValue(param_values[i + 1]))
+            for i in range(0, len(param_values) - 1, 2)
+        ]
+    )
+
+def appendTrials(records, path=STORE_FILE):
+    """
+    Appends {trial_key: record} entries in one transaction. A record has the
+    same shape as a raw_trials entry ("param_values", "results", "stats");
+    any other keys are kept as extra metadata.
+    """
+    with closing(connect(path)) as conn:
+        with conn:
+            for key, record in records.items():
+                insertTrial(conn, key, record)
+
+def appendTrial(key, record, path=STORE_FILE):
+    appendTrials({key: record}, path)
+
+def rowToRecord(row):
+    record = {
+        "param_values": json.loads(row[4]),
+        "results": json.loads(row[5]),
+        "stats": json.loads(row[6]),
+    }
+    record.update(json.loads(row[7]))
+    return row[1], record
+
+def getTrials(phase=None, path=STORE_FILE):
+    """
+    Returns {trial_key: record} ordered by phase and trial, in the same
+    shape raw_trials used to have. Pass phase to only read one phase.
+    """
+    query = "SELECT * FROM latest_trials"
+    args = ()
+    if phase is not None:
+        query += " WHERE phase = ?"
+        args = (phase,)
+    query += " ORDER BY phase, trial"
+    with closing(connect(path)) as conn:
+        return dict(rowToRecord(row) for row in conn.execute(query, args))
+
+def getTrial(phase, trial, path=STORE_FILE):
+    with closing(connect(path)) as conn:
+        row = conn.execute(
+            "SELECT * FROM latest_trials WHERE phase = ? AND trial = ?", (phase, trial)
+        ).fetchone()
+    return None if row is None else rowToRecord(row)[1]
+
+def findTrials(name, value=None, low=None, high=None, path=STORE_FILE):
+    """
+    Trials where parameter name equals value, or lies in [low, high]
+    (sizes compare in bytes).
+    """
+    query = "SELECT DISTINCT t.* FROM latest_trials t JOIN trial_params p ON p.trial_id = t.id WHERE p.name = ?"
+    args = [name]
+    if value is not None:
+        query += " AND p.value = ?"
+        args.append(str(value))
+    if low is not None:
+        query += " AND p.num >= ?"
+        args.append(numericValue(low))
+    if high is not None:
+        query += " AND p.num <= ?"
+        args.append(numericValue(high))
+    query += " ORDER BY t.phase, t.trial"
+    with closing(connect(path)) as conn:
+        return dict(rowToRecord(row) for row in conn.execute(query, args))
+
+def trialCount(path=STORE_FILE):
+    with closing(connect(path)) as conn:
+        return conn.execute("SELECT COUNT(*) FROM latest_trials").fetchone()[0]
+
+def clearStore(path=STORE_FILE):
+    with closing(connect(path)) as conn:
+        with conn:
+            conn.execute("DELETE FROM trial_params")
+            conn.execute("DELETE FROM trials")
+
+def copyStore(src, dst):
+    """Consistent copy of one store file into another (used for save/load)."""
+    with closing(connect(src)) as source, closing(connect(dst)) as target:
+        source.backup(target)
+
+def migrateRawTrials(raw_trials, path=STORE_FILE):
+    """
+    Moves trials from a legacy params["runtime"]["raw_trials"] dict into the
+    store (keys already stored are skipped) and returns the dict stripped
+    down to its template entry.
+    """
+    existing = getTrials(path=path)
+    legacy = {
+        k: v for k, v in raw_trials.items()
+        if k != "trial_template" and k not in existing
+    }
+    if len(legacy) > 0:
+        appendTrials(legacy, path)
+    return {k: v for k, v in raw_trials.items() if k == "trial_template"}
+
+# -------------------------------------------------------------------
+# BULK EXPORT
+# -------------------------------------------------------------------
+def exportFrame(phase=None, path=STORE_FILE):
+    """
+    All trials as a pandas DataFrame: one row per trial with phase/trial,
+    one column per changed parameter, the summary results and every stat.
+    """
+    import pandas as pd
+
+    rows = []
+    for key, record in getTrials(phase, path).items():
+        p, t = splitTrialKey(key)
+        row = {"key": key, "phase": p, "trial": t}
+        pv = record["param_values"]
+        for i in range(0, len(pv) - 1, 2):
+            row[pv[i]] = pv[i + 1]
+        res = record["results"]
+        for i in range(0, len(res) - 1, 2):
+            row[res[i]] = res[i + 1]
+        row.update(record["stats"])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def exportArrays(columns, phase=None, path=STORE_FILE):
+    """
+    NumPy float arrays for the requested columns of exportFrame(), with
+    sizes converted to bytes and missing values as NaN.
+    """
+    import numpy as np
+
+    frame = exportFrame(phase, path)
+    arrays = {}
+    for col in columns:
+        values = frame[col] if col in frame else []
+        arrays[col] = np.array(
+            [np.nan if numericValue(v) is None else numericValue(v) for v in values],
+            dtype=float
+        )
+    return arrays
@@ -4,24 +4,35 @@
 # This file configures and runs a gem5 simulation using
 # parameterized microarchitecture settings loaded from JSON.
 
+import argparse
 import json
+import os
+import shutil
 from pathlib import Path
 
+import m5
+import m5.debug
+
 # gem5 imports for ISA checking and simulation components
 from gem5.isas import ISA
 from gem5.utils.requires import requires
 from gem5.resources.resource import CustomResource
 
 # Memory system components
-from gem5.components.memory import SingleChannelDDR3_1600
+from gem5.components.memory.memory import ChanneledMemory
+from m5.objects import DDR3_1600_8x8, DDR4_2400_8x8, LPDDR5_6400_1x16_BG_BL32
 
 # Processor-related imports
 from gem5.components.processors.cpu_types import CPUTypes
 from gem5.components.processors.simple_processor import SimpleProcessor
+from gem5.components.processors.simple_switchable_processor import (
+    SimpleSwitchableProcessor,
+)
 
 # Board and simulation control
 from gem5.components.boards.simple_board import SimpleBoard
 from gem5.simulate.simulator import Simulator
+from gem5.simulate.exit_event import ExitEvent
 
 # Cache hierarchy (private L1, shared L2)
 from gem5.components.cachehierarchies.classic.private_l1_shared_l2_cache_hierarchy import (
@@ -33,7 +44,20 @@ from gem5.components.cachehierarchies.classic.private_l1_shared_l2_cache_hierarc
 # ---------------------------------------------------------------------
 
 # Path to the JSON file containing architectural parameters
-PARAM_FILE = Path(__file__).parent / "params.json"
+# Defaults to params.json next to this script; parallel trials pass their own
+# per-trial copy with --params
+parser = argparse.ArgumentParser(
+    description="Run a gem5 simulation with ARCHAI microarchitecture parameters."
+)
+parser.add_argument(
+    "--params",
+    type=str,
+    default=str(Path(__file__).parent / "params.json"),
+    help="JSON file with the \"vars\" to simulate.",
+)
+args = parser.parse_args()
+
+PARAM_FILE = Path(args.params)
 
 # Load parameter values from JSON
 # Expected format:
@@ -46,11 +70,43 @@ PARAM_FILE = Path(__file__).parent / "params.json"
 #       "l2_size": "...",
 #       "l2_assoc": ...,
 #       "DDR_memory_size": "...",
-#       "num_cores": ...
+#       "num_cores": ...,
+#       "cpu_type": "TIMING",                       # ATOMIC, TIMING, MINOR or O3
+#       "clk_mhz": 3000,                            # core clock
+#       "memory_type": "DDR3_1600",                 # DDR3_1600, DDR4_2400 or LPDDR5_6400
+#       "mem_channels": 1,                          # rounded down to a power of two
+#       "cache_hierarchy": "private_l1_shared_l2",  # or "mesi_three_level" (Ruby)
+#       "l3_size": "...",                           # mesi_three_level only
+#       "l3_assoc": ...
+#   }
+# }
+#
+# Keys after num_cores are optional; the defaults reproduce the original
+# TIMING / 3GHz / single-channel DDR3 / two-level classic system.
+#
+# Per-trial config files may also carry a "sim" section with simulation
+# settings that are not microarchitecture parameters:
+# {
+#   "sim": {
+#       "checkpoint": "...",      # post-initialization checkpoint to restore
+#                                 # (or, in "checkpoint" mode, to save)
+#       "mode": "full",           # "full", "checkpoint", "profile", "sampled"
+#                                 # or "trace"
+#       "cpu_type": "TIMING",     # full: "ATOMIC" for cheap screening runs
+#       "binary": "...",          # workload variant (default microbench.arm)
+#       "args": {...},            # stressor arguments: kernels, n, footprint, ...
+#       "workload": {...},        # spec the binary was built from
+#       "interval_length": ...,   # profile: instructions per BBV interval
+#       "max_insts": ...,         # trace: stop this many instructions after
+#                                 # logging starts
+#       "simpoints": {...}        # sampled: plan built by sampling.py
 #   }
 # }
 with open(PARAM_FILE) as f:
-    params = json.load(f)["vars"]
+    config = json.load(f)
+params = config["vars"]
+sim_options = config.get("sim", {})
+sim_mode = sim_options.get("mode", "full")
 
 # ---------------------------------------------------------------------
 # ISA Requirement Check
@@ -66,37 +122,92 @@ requires(isa_required=ISA.ARM)
 # Create a cache hierarchy with:
 # - Private L1 instruction and data caches per core
 # - A shared L2 cache across all cores
-cache_hierarchy = PrivateL1SharedL2CacheHierarchy(
-    l1i_size=params["l1i_size"],
-    l1i_assoc=params["l1i_assoc"],
-    l1d_size=params["l1d_size"],
-    l1d_assoc=params["l1d_assoc"],
-    l2_size=params["l2_size"],
-    l2_assoc=params["l2_assoc"],
-)
+# or, with cache_hierarchy "mesi_three_level", a Ruby MESI hierarchy with
+# private L1/L2 and a shared L3 (needs gem5 built with
+# PROTOCOL=MESI_Three_Level)
+cache_hierarchy_name = params.get("cache_hierarchy", "private_l1_shared_l2")
+if sim_mode == "trace":
+    # Memory trace capture: every CPU access has to reach memory, where the
+    # MemoryAccess debug flag logs it
+    from gem5.components.cachehierarchies.classic.no_cache import NoCache
+
+    cache_hierarchy = NoCache()
+elif cache_hierarchy_name == "mesi_three_level":
+    from gem5.coherence_protocol import CoherenceProtocol
+    from gem5.components.cachehierarchies.ruby.mesi_three_level_cache_hierarchy import (
+        MESIThreeLevelCacheHierarchy,
+    )
+
+    requires(coherence_protocol_required=CoherenceProtocol.MESI_THREE_LEVEL)
+    cache_hierarchy = MESIThreeLevelCacheHierarchy(
+        l1i_size=params["l1i_size"],
+        l1i_assoc=params["l1i_assoc"],
+        l1d_size=params["l1d_size"],
+        l1d_assoc=params["l1d_assoc"],
+        l2_size=params["l2_size"],
+        l2_assoc=params["l2_assoc"],
+        l3_size=params.get("l3_size", "2MB"),
+        l3_assoc=params.get("l3_assoc", 16),
+        num_l3_banks=1,
+    )
+else:
+    cache_hierarchy = PrivateL1SharedL2CacheHierarchy(
+        l1i_size=params["l1i_size"],
+        l1i_assoc=params["l1i_assoc"],
+        l1d_size=params["l1d_size"],
+        l1d_assoc=params["l1d_assoc"],
+        l2_size=params["l2_size"],
+        l2_assoc=params["l2_assoc"],
+    )
 
 # ---------------------------------------------------------------------
 # Memory System Configuration
 # ---------------------------------------------------------------------
 
-# Create a single-channel DDR3 memory system
+# DRAM technology and channel count (64-byte interleaving across channels)
 # The memory size is parameterized via params.json
-memory = SingleChannelDDR3_1600(
-    size=params["DDR_memory_size"]
+DRAM_INTERFACES = {
+    "DDR3_1600": DDR3_1600_8x8,
+    "DDR4_2400": DDR4_2400_8x8,
+    "LPDDR5_6400": LPDDR5_6400_1x16_BG_BL32,
+}
+# Address interleaving needs a power-of-two number of channels
+mem_channels = 1 << (max(1, int(params.get("mem_channels", 1))).bit_length() - 1)
+memory = ChanneledMemory(
+    DRAM_INTERFACES[params.get("memory_type", "DDR3_1600")],
+    mem_channels,
+    64,
+    size=params["DDR_memory_size"],
 )
 
 # ---------------------------------------------------------------------
 # Processor Configuration
 # ---------------------------------------------------------------------
 
-# Create a simple timing CPU model
-# - TIMING CPU models cache and memory latency
+# CPU model from "cpu_type" (TIMING by default)
+# - TIMING models cache and memory latency; MINOR (in-order pipeline) and
+#   O3 (out-of-order) add core timing on top
 # - Number of cores is configurable
-processor = SimpleProcessor(
-    cpu_type=CPUTypes.TIMING,
-    isa=ISA.ARM,
-    num_cores=params["num_cores"],
-)
+cpu_type_name = params.get("cpu_type", "TIMING")
+# Profiling runs only need basic block counts and trace captures only the
+# access stream, so they use the fast ATOMIC CPU. Sampled runs fast-forward
+# on ATOMIC and switch to the trial's CPU model for the selected intervals.
+if sim_mode == "sampled":
+    processor = SimpleSwitchableProcessor(
+        starting_core_type=CPUTypes.ATOMIC,
+        switch_core_type=CPUTypes[cpu_type_name],
+        isa=ISA.ARM,
+        num_cores=params["num_cores"],
+    )
+else:
+    # Full runs use the trial's cpu_type; multi-fidelity searches screen
+    # configurations on ATOMIC first
+    cpu_type = CPUTypes.ATOMIC if sim_mode in ("profile", "trace") else CPUTypes[sim_options.get("cpu_type", cpu_type_name)]
+    processor = SimpleProcessor(
+        cpu_type=cpu_type,
+        isa=ISA.ARM,
+        num_cores=params["num_cores"],
+    )
 
 # ---------------------------------------------------------------------
 # Board Configuration
@@ -108,7 +219,7 @@ processor = SimpleProcessor(
 # - Memory system
 # - Cache hierarchy
 board = SimpleBoard(
-    clk_freq="3GHz",
+    clk_freq=str(params.get("clk_mhz", 3000)) + "MHz",
     processor=processor,
     memory=memory,
     cache_hierarchy=cache_hierarchy,
@@ -119,20 +230,168 @@ board = SimpleBoard(
 # ---------------------------------------------------------------------
 
 # Load the ARM binary to be executed by gem5
-# This binary is typically compiled using aarch64-linux-gnu-gcc
+# This binary is typically compiled using aarch64-linux-gnu-gcc; trials of
+# a workload variant pass the one workload_build.py built for them
+binary_path = Path(sim_options.get("binary", Path(__file__).parent / "microbench.arm"))
 binary = CustomResource(
-    local_path=str(Path(__file__).parent / "microbench.arm")
+    local_path=str(binary_path)
 )
 
+# The stressor's key=value arguments select its kernels and their sizes
+# ("kernels" is a list, passed comma-separated). Its kernels run on one
+# thread per core unless "threads" says otherwise; SE mode places every
+# thread the stressor clones on a free core, so there can be at most
+# num_cores of them.
+workload_args = dict(sim_options.get("args", {}))
+workload_args["threads"] = min(int(workload_args.get("threads", params["num_cores"])), params["num_cores"])
+# The SimPoint probe and the instruction-count stops only see core 0, while
+# sampling.extrapolate() scales by the instructions of all cores, so
+# profiling and sampled runs keep the kernels on a single thread
+if sim_mode in ("profile", "sampled"):
+    workload_args["threads"] = 1
+arguments = [
+    k + "=" + (",".join(v) if isinstance(v, list) else str(v))
+    for k, v in sorted(workload_args.items())
+]
+
 # Set the binary as the workload for the board
-board.set_se_binary_workload(binary)
+# m5_work_begin/m5_work_end in the stressor mark each kernel and exit the
+# simulation loop so the handlers below can dump per-kernel stats
+board.set_se_binary_workload(binary, arguments=arguments, exit_on_work_items=True)
 
 # ---------------------------------------------------------------------
 # Simulation Execution
 # ---------------------------------------------------------------------
 
+# The stressor calls m5_checkpoint() once its input arrays are set up.
+# Everything before that point is identical for every trial of a binary, so
+# trial_executor.py simulates it once per workload and memory system in a
+# dedicated "checkpoint" run, which saves the checkpoint there and exits.
+# Full trials then all restore it with their own cache and memory
+# parameters and start measuring from the same cold state.
+checkpoint_path = None
+if "checkpoint" in sim_options:
+    checkpoint_path = Path(sim_options["checkpoint"])
+
+def checkpoint_handler():
+    while True:
+        if sim_mode == "checkpoint":
+            # Save under a private name and rename, so an interrupted run
+            # never leaves a partial checkpoint behind
+            checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = checkpoint_path.with_name(
+                checkpoint_path.name + ".tmp" + str(os.getpid())
+            )
+            simulator.save_checkpoint(tmp_path)
+            try:
+                os.rename(tmp_path, checkpoint_path)
+            except OSError:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            yield True
+        # Trials without a checkpoint measure from here on, exactly like
+        # restored trials do (sampled runs reset stats per interval instead)
+        if sim_mode == "full":
+            m5.stats.reset()
+        # Trace captures log memory accesses from here on, written to the
+        # --debug-file the runner passed, until the access cap is covered
+        if sim_mode == "trace":
+            m5.debug.flags["MemoryAccess"].enable()
+            if "max_insts" in sim_options:
+                simulator.schedule_max_insts(sim_options["max_insts"])
+        yield False
+
+# Trace captures end at their instruction cap instead of running the rest
+# of the program with every access logged
+def trace_limit_handler():
+    m5.debug.flags["MemoryAccess"].disable()
+    yield True
+
+# Per-kernel regions of interest: dump (without resetting) the cumulative
+# stats at each kernel's work-begin and work-end, so stats.txt holds a
+# begin/end block pair per kernel followed by the end-of-simulation block.
+# Sampled and profiling runs use their own dumps and ignore the markers.
+def work_item_handler():
+    while True:
+        if sim_mode == "full":
+            m5.stats.dump()
+        yield False
+
+# ---------------------------------------------------------------------
+# Sampled Simulation
+# ---------------------------------------------------------------------
+
+# Profiling: record a basic block vector every interval_length instructions
+# (written to simpoint.bb.gz in the output directory)
+if sim_mode == "profile":
+    processor.get_cores()[0].core.addSimPointProbe(sim_options["interval_length"])
+
+# Sampled: walk the representative intervals in program order. For each one,
+# fast-forward on ATOMIC to its warmup start, switch to TIMING, warm caches,
+# reset stats, simulate the interval and dump its stats block, then switch
+# back. sampling.extrapolate() combines the dumped blocks afterwards.
+def sampled_schedule():
+    plan = sim_options["simpoints"]
+    length = plan["interval_length"]
+    position = 0
+    steps = []
+    for point in sorted(plan["points"], key=lambda p: p["interval"]):
+        start = point["interval"] * length
+        warmup = min(plan["warmup_length"], start - position)
+        steps.append((start - warmup - position, warmup))
+        position = start + length
+    return steps
+
+def sampled_handler(steps):
+    for i, (_, warmup) in enumerate(steps):
+        processor.switch()
+        if warmup > 0:
+            simulator.schedule_max_insts(warmup)
+            yield False
+        m5.stats.reset()
+        simulator.schedule_max_insts(sim_options["simpoints"]["interval_length"])
+        yield False
+        m5.stats.dump()
+        processor.switch()
+        if i + 1 < len(steps):
+            simulator.schedule_max_insts(max(steps[i + 1][0], 1))
+            yield False
+    # All representative intervals measured; skip the rest of the program
+    yield True
+
 # Create the simulator with the configured board
-simulator = Simulator(board=board)
+if sim_mode == "full" and checkpoint_path is not None and checkpoint_path.exists():
+    # Restore the post-initialization state and simulate only the measured region
+    simulator = Simulator(
+        board=board,
+        checkpoint_path=str(checkpoint_path),
+        on_exit_event={
+            ExitEvent.WORKBEGIN: work_item_handler(),
+            ExitEvent.WORKEND: work_item_handler(),
+        },
+    )
+elif sim_mode == "sampled":
+    steps = sampled_schedule()
+    simulator = Simulator(
+        board=board,
+        on_exit_event={
+            ExitEvent.CHECKPOINT: checkpoint_handler(),
+            ExitEvent.MAX_INSTS: sampled_handler(steps),
+            ExitEvent.WORKBEGIN: work_item_handler(),
+            ExitEvent.WORKEND: work_item_handler(),
+        },
+    )
+    # First stop: the warmup start of the earliest representative interval
+    simulator.schedule_max_insts(max(steps[0][0], 1))
+else:
+    simulator = Simulator(
+        board=board,
+        on_exit_event={
+            ExitEvent.CHECKPOINT: checkpoint_handler(),
+            ExitEvent.MAX_INSTS: trace_limit_handler(),
+            ExitEvent.WORKBEGIN: work_item_handler(),
+            ExitEvent.WORKEND: work_item_handler(),
+        },
+    )
 
 # Run the simulation until completion
 simulator.run()
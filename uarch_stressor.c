@@ -1,8 +1,121 @@
+#include <pthread.h>
+#include <stdint.h>
 #include <stdio.h>
 #include <stdlib.h>
+#include <string.h>
 #include <time.h>
 
-#define N 100   // Change this to scale the experiment
+// Default workload size; workload_build.py passes -DN=... from
+// params["stressor_c"], and a run can override it with the n= argument
+#ifndef N
+#define N 100
+#endif
+
+// ---------- gem5 m5 ops ----------
+// Built with -DARCHAI_M5OPS (and libm5) for gem5 runs; the hooks compile
+// away otherwise so the program still builds with a plain compiler.
+#ifdef ARCHAI_M5OPS
+#include <gem5/m5ops.h>
+// Post-initialization checkpoint: everything before it is identical across
+// trials, so uarch_spec.py saves/restores the simulator state here
+#define ARCHAI_CHECKPOINT() m5_checkpoint(0, 0)
+// Region of interest around one kernel; uarch_spec.py dumps stats at both
+// ends so every kernel gets its own stat block
+#define ARCHAI_ROI_BEGIN(id) m5_work_begin(id, 0)
+#define ARCHAI_ROI_END(id) m5_work_end(id, 0)
+#else
+#define ARCHAI_CHECKPOINT()
+#define ARCHAI_ROI_BEGIN(id)
+#define ARCHAI_ROI_END(id)
+#endif
+
+// Work item ids, in the order the kernels run (see KERNEL_NAMES in
+// trial_executor.py)
+enum {
+    KERNEL_BUBBLE_SORT, KERNEL_MERGE_SORT, KERNEL_QUICK_SORT,
+    KERNEL_STREAM_COPY, KERNEL_STREAM_TRIAD, KERNEL_POINTER_CHASE,
+    KERNEL_MATMUL, KERNEL_HASH_PROBE, NUM_KERNELS
+};
+
+static const char *kernel_names[NUM_KERNELS] = {
+    "bubble_sort", "merge_sort", "quick_sort",
+    "stream_copy", "stream_triad", "pointer_chase",
+    "matmul", "hash_probe"
+};
+
+// ---------- Run-time workload arguments ----------
+// uarch_spec.py passes key=value arguments from params["workload"]:
+//   kernels=a,b,...   kernels to run (default: the three sorts)
+//   n=...             elements for sorts, streams and hash probing
+//   footprint=...     bytes walked by pointer_chase
+//   stride=...        bytes between pointer_chase nodes
+//   dim=... block=... matmul size and tile size
+//   threads=...       threads every kernel's work is split across (one
+//                     per simulated core; uarch_spec.py sets num_cores)
+struct workload {
+    int enabled[NUM_KERNELS];
+    long n;
+    long footprint;
+    long stride;
+    long dim;
+    long block;
+    long threads;
+};
+
+static void parse_kernels(struct workload *w, const char *list) {
+    memset(w->enabled, 0, sizeof(w->enabled));
+    char *copy = strdup(list);
+    for (char *name = strtok(copy, ","); name != NULL; name = strtok(NULL, ",")) {
+        int found = 0;
+        for (int k = 0; k < NUM_KERNELS; k++) {
+            if (strcmp(name, kernel_names[k]) == 0) {
+                w->enabled[k] = 1;
+                found = 1;
+            }
+        }
+        if (!found) {
+            fprintf(stderr, "Unknown kernel: %s\n", name);
+            exit(2);
+        }
+    }
+    free(copy);
+}
+
+static void parse_args(struct workload *w, int argc, char **argv) {
+    parse_kernels(w, "bubble_sort,merge_sort,quick_sort");
+    w->n = N;
+    w->footprint = 1 << 20;
+    w->stride = 64;
+    w->dim = 64;
+    w->block = 16;
+    w->threads = 1;
+    for (int i = 1; i < argc; i++) {
+        char *eq = strchr(argv[i], '=');
+        if (eq == NULL) {
+            fprintf(stderr, "Expected key=value argument: %s\n", argv[i]);
+            exit(2);
+        }
+        *eq = '\0';
+        const char *value = eq + 1;
+        if (strcmp(argv[i], "kernels") == 0) parse_kernels(w, value);
+        else if (strcmp(argv[i], "n") == 0) w->n = atol(value);
+        else if (strcmp(argv[i], "footprint") == 0) w->footprint = atol(value);
+        else if (strcmp(argv[i], "stride") == 0) w->stride = atol(value);
+        else if (strcmp(argv[i], "dim") == 0) w->dim = atol(value);
+        else if (strcmp(argv[i], "block") == 0) w->block = atol(value);
+        else if (strcmp(argv[i], "threads") == 0) w->threads = atol(value);
+        else {
+            fprintf(stderr, "Unknown argument: %s\n", argv[i]);
+            exit(2);
+        }
+    }
+    if (w->stride < (long)sizeof(void *))
+        w->stride = sizeof(void *);
+    if (w->block < 1)
+        w->block = 1;
+    if (w->threads < 1)
+        w->threads = 1;
+}
 
 // ---------- Utility ----------
 void copy_array(int *src, int *dst, int n) {
@@ -86,45 +199,292 @@ void quick_sort(int *arr, int low, int high) {
     }
 }
 
+// ---------- Streaming Copy / Triad ----------
+// Sequential bandwidth: every element is touched once per pass
+void stream_copy(const double *a, double *c, long n) {
+    for (long i = 0; i < n; i++)
+        c[i] = a[i];
+}
+
+void stream_triad(double *a, const double *b, const double *c, double scalar, long n) {
+    for (long i = 0; i < n; i++)
+        a[i] = b[i] + scalar * c[i];
+}
+
+// ---------- Pointer Chasing ----------
+// One node every stride bytes of a footprint-byte buffer, linked in a
+// random cycle (Sattolo's algorithm) so every load depends on the last
+// and hardware prefetchers cannot help
+void **build_chase(long footprint, long stride, long *nodes) {
+    *nodes = footprint / stride > 1 ? footprint / stride : 2;
+    char *buf = malloc(*nodes * stride);
+    long *order = malloc(*nodes * sizeof(long));
+    for (long i = 0; i < *nodes; i++)
+        order[i] = i;
+    for (long i = *nodes - 1; i > 0; i--) {
+        long j = rand() % i;
+        long tmp = order[i];
+        order[i] = order[j];
+        order[j] = tmp;
+    }
+    for (long i = 0; i < *nodes; i++)
+        *(void **)(buf + order[i] * stride) = buf + order[(i + 1) % *nodes] * stride;
+    free(order);
+    return (void **)buf;
+}
+
+void *pointer_chase(void **start, long steps) {
+    void **p = start;
+    for (long i = 0; i < steps; i++)
+        p = (void **)*p;
+    return p;
+}
+
+// ---------- Blocked Matrix Multiply ----------
+// Rows [row_lo, row_hi) of C, so threads can split the product by rows
+void matmul(const double *A, const double *B, double *C, long dim, long block,
+            long row_lo, long row_hi) {
+    for (long ii = row_lo; ii < row_hi; ii += block)
+        for (long kk = 0; kk < dim; kk += block)
+            for (long jj = 0; jj < dim; jj += block)
+                for (long i = ii; i < ii + block && i < row_hi; i++)
+                    for (long k = kk; k < kk + block && k < dim; k++) {
+                        double a = A[i * dim + k];
+                        for (long j = jj; j < jj + block && j < dim; j++)
+                            C[i * dim + j] += a * B[k * dim + j];
+                    }
+}
+
+// ---------- Hash-Table Probing ----------
+// Open addressing with linear probing at a load factor of at most 1/2;
+// half of the probed keys are present
+long hash_slots(long n) {
+    long slots = 1;
+    while (slots < 2 * n)
+        slots <<= 1;
+    return slots;
+}
+
+static inline uint64_t hash_key(uint64_t key) {
+    key ^= key >> 33;
+    key *= 0xff51afd7ed558ccdULL;
+    key ^= key >> 33;
+    return key;
+}
+
+void hash_insert(uint64_t *table, long slots, uint64_t key) {
+    long i = hash_key(key) & (slots - 1);
+    while (table[i] != 0 && table[i] != key)
+        i = (i + 1) & (slots - 1);
+    table[i] = key;
+}
+
+long hash_probe(const uint64_t *table, long slots, const uint64_t *keys, long n) {
+    long hits = 0;
+    for (long q = 0; q < n; q++) {
+        long i = hash_key(keys[q]) & (slots - 1);
+        while (table[i] != 0) {
+            if (table[i] == keys[q]) {
+                hits++;
+                break;
+            }
+            i = (i + 1) & (slots - 1);
+        }
+    }
+    return hits;
+}
+
+// ---------- Threads ----------
+// Kernels are split across a pool of w.threads threads (the main thread is
+// thread 0). Every thread works on its own slice of the input; the sorts
+// then merge the sorted slices on the main thread. The pool is started
+// after the checkpoint, and each kernel's region of interest spans the
+// dispatch and both barriers, so it measures all cores together.
+static struct workload w;
+static pthread_barrier_t start_barrier, end_barrier;
+static int current_kernel;
+
+static int *original, *arr;
+static double *a, *b, *c;
+static void **chase;
+static long chase_nodes;
+static double *A, *B, *C;
+static uint64_t *table, *queries;
+static long slots;
+static void *chase_ends[1024];
+static long probe_hits[1024];
+
+// [lo, hi) of thread tid's share of n items
+static long slice_lo(long n, long tid) { return n * tid / w.threads; }
+static long slice_hi(long n, long tid) { return n * (tid + 1) / w.threads; }
+
+static void run_slice(int id, long tid) {
+    long lo = slice_lo(w.n, tid), hi = slice_hi(w.n, tid);
+    switch (id) {
+    case KERNEL_BUBBLE_SORT:
+        bubble_sort(arr + lo, hi - lo);
+        break;
+    case KERNEL_MERGE_SORT:
+        merge_sort(arr, lo, hi - 1);
+        break;
+    case KERNEL_QUICK_SORT:
+        quick_sort(arr, lo, hi - 1);
+        break;
+    case KERNEL_STREAM_COPY:
+        stream_copy(a + lo, c + lo, hi - lo);
+        break;
+    case KERNEL_STREAM_TRIAD:
+        stream_triad(a + lo, b + lo, c + lo, 3.0, hi - lo);
+        break;
+    case KERNEL_POINTER_CHASE: {
+        // Every thread enters the shared cycle at a different node; together
+        // they walk it twice (the first lap warms what fits in cache)
+        long node = slice_lo(chase_nodes, tid);
+        void **start = (void **)((char *)chase + node * w.stride);
+        chase_ends[tid] = pointer_chase(start, 2 * (slice_hi(chase_nodes, tid) - node));
+        break;
+    }
+    case KERNEL_MATMUL:
+        matmul(A, B, C, w.dim, w.block, slice_lo(w.dim, tid), slice_hi(w.dim, tid));
+        break;
+    case KERNEL_HASH_PROBE:
+        probe_hits[tid] = hash_probe(table, slots, queries + lo, hi - lo);
+        break;
+    }
+}
+
+static void *worker(void *arg) {
+    long tid = (long)arg;
+    for (;;) {
+        pthread_barrier_wait(&start_barrier);
+        if (current_kernel < 0)
+            return NULL;
+        run_slice(current_kernel, tid);
+        pthread_barrier_wait(&end_barrier);
+    }
+}
+
 // ---------- Main ----------
-int main() {
+static clock_t roi_start;
+
+static void begin_kernel(int id) {
+    ARCHAI_ROI_BEGIN(id);
+    roi_start = clock();
+}
+
+static void end_kernel(int id) {
+    clock_t end = clock();
+    ARCHAI_ROI_END(id);
+    printf("%s time: %.6f seconds\n", kernel_names[id],
+           (double)(end - roi_start) / CLOCKS_PER_SEC);
+}
+
+static void run_kernel(int id) {
+    if (id <= KERNEL_QUICK_SORT)
+        copy_array(original, arr, w.n);
+    begin_kernel(id);
+    current_kernel = id;
+    pthread_barrier_wait(&start_barrier);
+    run_slice(id, 0);
+    pthread_barrier_wait(&end_barrier);
+    if (id <= KERNEL_QUICK_SORT) {
+        // Merge the sorted slices into one sorted array
+        for (long t = 1; t < w.threads; t++)
+            merge(arr, 0, slice_lo(w.n, t) - 1, slice_hi(w.n, t) - 1);
+    }
+    end_kernel(id);
+}
+
+int main(int argc, char **argv) {
+    parse_args(&w, argc, argv);
+    if (w.threads > 1024)
+        w.threads = 1024;
     srand(time(NULL));
 
-    int *original = malloc(N * sizeof(int));
-    int *arr = malloc(N * sizeof(int));
-
-    // Generate random array
-    for (int i = 0; i < N; i++)
-        original[i] = rand();
-
-    clock_t start, end;
-
-    // Bubble Sort
-    copy_array(original, arr, N);
-    start = clock();
-    bubble_sort(arr, N);
-    end = clock();
-    printf("Bubble Sort Time: %.6f seconds\n",
-           (double)(end - start) / CLOCKS_PER_SEC);
-
-    // Merge Sort
-    copy_array(original, arr, N);
-    start = clock();
-    merge_sort(arr, 0, N - 1);
-    end = clock();
-    printf("Merge Sort Time: %.6f seconds\n",
-           (double)(end - start) / CLOCKS_PER_SEC);
-
-    // Quick Sort
-    copy_array(original, arr, N);
-    start = clock();
-    quick_sort(arr, 0, N - 1);
-    end = clock();
-    printf("Quick Sort Time: %.6f seconds\n",
-           (double)(end - start) / CLOCKS_PER_SEC);
+    // Inputs of every selected kernel are set up before the checkpoint
+    int sorts = w.enabled[KERNEL_BUBBLE_SORT] || w.enabled[KERNEL_MERGE_SORT] || w.enabled[KERNEL_QUICK_SORT];
+    int streams = w.enabled[KERNEL_STREAM_COPY] || w.enabled[KERNEL_STREAM_TRIAD];
+
+    if (sorts) {
+        original = malloc(w.n * sizeof(int));
+        arr = malloc(w.n * sizeof(int));
+        for (long i = 0; i < w.n; i++)
+            original[i] = rand();
+    }
+    if (streams) {
+        a = malloc(w.n * sizeof(double));
+        b = malloc(w.n * sizeof(double));
+        c = malloc(w.n * sizeof(double));
+        for (long i = 0; i < w.n; i++) {
+            a[i] = 1.0;
+            b[i] = 2.0;
+            c[i] = 0.0;
+        }
+    }
+    if (w.enabled[KERNEL_POINTER_CHASE])
+        chase = build_chase(w.footprint, w.stride, &chase_nodes);
+    if (w.enabled[KERNEL_MATMUL]) {
+        A = malloc(w.dim * w.dim * sizeof(double));
+        B = malloc(w.dim * w.dim * sizeof(double));
+        C = calloc(w.dim * w.dim, sizeof(double));
+        for (long i = 0; i < w.dim * w.dim; i++) {
+            A[i] = (double)rand() / RAND_MAX;
+            B[i] = (double)rand() / RAND_MAX;
+        }
+    }
+    if (w.enabled[KERNEL_HASH_PROBE]) {
+        slots = hash_slots(w.n);
+        table = calloc(slots, sizeof(uint64_t));
+        queries = malloc(w.n * sizeof(uint64_t));
+        for (long i = 0; i < w.n; i++) {
+            hash_insert(table, slots, 2 * (uint64_t)i + 2);
+            // Even keys are in the table, odd keys are misses
+            queries[i] = (uint64_t)(rand() % (2 * w.n)) + 1;
+        }
+    }
+
+    // Setup done: the measured region starts here
+    ARCHAI_CHECKPOINT();
+
+    pthread_barrier_init(&start_barrier, NULL, w.threads);
+    pthread_barrier_init(&end_barrier, NULL, w.threads);
+    pthread_t *workers = malloc(w.threads * sizeof(pthread_t));
+    for (long t = 1; t < w.threads; t++)
+        pthread_create(&workers[t], NULL, worker, (void *)t);
+
+    for (int id = 0; id < NUM_KERNELS; id++) {
+        if (w.enabled[id])
+            run_kernel(id);
+    }
+
+    current_kernel = -1;
+    pthread_barrier_wait(&start_barrier);
+    for (long t = 1; t < w.threads; t++)
+        pthread_join(workers[t], NULL);
+
+    if (w.enabled[KERNEL_POINTER_CHASE])
+        printf("pointer_chase end: %p\n", chase_ends[0]);
+    if (w.enabled[KERNEL_MATMUL])
+        printf("matmul checksum: %f\n", C[w.dim * w.dim - 1]);
+    if (w.enabled[KERNEL_HASH_PROBE]) {
+        long hits = 0;
+        for (long t = 0; t < w.threads; t++)
+            hits += probe_hits[t];
+        printf("hash_probe hits: %ld of %ld\n", hits, w.n);
+    }
 
+    free(workers);
     free(original);
     free(arr);
+    free(a);
+    free(b);
+    free(c);
+    free(chase);
+    free(A);
+    free(B);
+    free(C);
+    free(table);
+    free(queries);
 
     return 0;
 }
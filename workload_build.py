@@ -0,0 +1,117 @@
+# -------------------------------------------------------------------
+# CONTENT-ADDRESSED WORKLOAD BUILD CACHE
+# -------------------------------------------------------------------
+# Builds uarch_stressor.c variants from a workload spec such as
+# {"N": 4096, "cflags": ["-O2"]}: every key except "cflags" becomes a
+# -DKEY=VALUE define. Binaries are stored under a hash of the source, the
+# compile command and the spec, so a variant is only ever compiled once,
+# and all variants a phase needs are compiled in parallel before its first
+# trial starts.
+#
+# Usage:
+#   python workload_build.py stats    # binary count and size
+#   python workload_build.py clear    # remove every built binary
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ARCHAI_DIR = Path(__file__).parent
+SOURCE_FILE = ARCHAI_DIR / "uarch_stressor.c"
+BUILD_DIR = Path(os.environ.get("ARCHAI_BUILD_DIR", ARCHAI_DIR / "build_cache"))
+
+# Cross-compile command without the source, defines and output
+COMPILER = [
+    "aarch64-linux-gnu-gcc", "-static", "-pthread", "-DARCHAI_M5OPS", "-I/gem5/include",
+    "-L/gem5/util/m5/build/arm64/out",
+]
+LIBS = ["-lm5"]
+
+# Compiler processes allowed to run at once
+MAX_BUILD_WORKERS = int(os.environ.get("ARCHAI_BUILD_WORKERS", os.cpu_count() or 1))
+
+
+class BuildError(RuntimeError):
+    """Raised when the cross-compiler rejects a workload variant."""
+
+
+def defineFlags(spec):
+    # Sorted so equal specs always produce the same command line
+    return ["-D" + str(k) + "=" + str(v) for k, v in sorted(spec.items()) if k != "cflags"]
+
+def buildCommand(spec, out_path):
+    return COMPILER + list(spec.get("cflags", [])) + defineFlags(spec) + [str(SOURCE_FILE), "-o", str(out_path)] + LIBS
+
+def buildKey(spec):
+    h = hashlib.sha256()
+    with open(SOURCE_FILE, "rb") as f:
+        h.update(f.read())
+    h.update(json.dumps(buildCommand(spec, ""), sort_keys=True).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def binaryPath(spec):
+    return BUILD_DIR / (buildKey(spec) + ".arm")
+
+def buildBinary(spec):
+    """Path of the binary for spec, compiling it first if it is not cached."""
+    path = binaryPath(spec)
+    if path.exists():
+        return path
+    BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    # Compile under a private name and rename, since a speculative batch may
+    # build the same variant at the same time
+    tmp_path = path.with_name(path.name + ".tmp" + str(os.getpid()) + "_" + str(id(spec)))
+    result = subprocess.run(buildCommand(spec, tmp_path), capture_output=True, text=True)
+    if result.returncode != 0:
+        tmp_path.unlink(missing_ok=True)
+        raise BuildError("Building " + json.dumps(spec) + " failed:\n" + result.stderr)
+    os.replace(tmp_path, path)
+    return path
+
+def buildAll(specs, max_workers=MAX_BUILD_WORKERS):
+    """
+    Builds every distinct spec in parallel. Returns {buildKey(spec): path}.
+    """
+    unique = {}
+    for spec in specs:
+        unique.setdefault(buildKey(spec), spec)
+    missing = [spec for key, spec in unique.items() if not (BUILD_DIR / (key + ".arm")).exists()]
+    if len(missing) > 0:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as pool:
+            list(pool.map(buildBinary, missing))
+    return {key: BUILD_DIR / (key + ".arm") for key in unique}
+
+def cacheEntries():
+    if not BUILD_DIR.exists():
+        return []
+    return [p for p in BUILD_DIR.glob("*.arm") if p.is_file()]
+
+def clear():
+    removed = 0
+    for p in cacheEntries():
+        p.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+def cacheStats():
+    entries = cacheEntries()
+    return {
+        "entries": len(entries),
+        "bytes": sum(p.stat().st_size for p in entries),
+        "dir": str(BUILD_DIR),
+    }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "clear":
+        print("Removed " + str(clear()) + " built binaries")
+    elif command == "stats":
+        print(json.dumps(cacheStats(), indent=2))
+    else:
+        print("Usage: python workload_build.py [stats|clear]")
+        sys.exit(1)